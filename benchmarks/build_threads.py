@@ -0,0 +1,81 @@
+"""
+Measure build_request throughput with an increasing number of threads
+
+Usage: python benchmarks/build_threads.py [--duration SECONDS]
+
+Builds only scale with threads on free-threaded Python builds (eg.
+python3.13t); with the GIL, throughput stays flat.
+"""
+
+import argparse
+import io
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from textwrap import dedent
+
+from requestfile.builder import build_request
+from requestfile.builder.filter_cache import FilterCache
+from requestfile.parser import parse_requestfile
+
+REQUESTFILE = parse_requestfile(
+    io.StringIO(
+        dedent("""\
+        %SET: token "secret-${id}"|interpolate
+        POST "https://api.example.com/items/${id}"|interpolate
+        Accept: application/json
+        %HEADER: Authorization "Bearer ${token}"|interpolate
+        %HEADER: X-Token-Digest $token|sha256
+        %PARAM: page "1"
+        %PARAM: size "100"
+
+        %FIELD: id "${id}"|interpolate
+        %FIELD: name "item ${id}"|interpolate|urlquote
+        %FIELD: data "${token}"|interpolate|base64
+        """)
+    )
+)
+
+
+def run(threads: int, duration: float) -> float:
+    """Returns requests built per second"""
+
+    # Don't let memoization hide the cost of filters
+    cache = FilterCache(max_bytes=0)
+    deadline = time.perf_counter() + duration
+
+    def _worker(n: int) -> int:
+        count = 0
+        while time.perf_counter() < deadline:
+            variables = {"id": f"{n}-{count}"}
+            build_request(REQUESTFILE, variables=variables, filter_cache=cache)
+            count += 1
+        return count
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(threads) as pool:
+        total = sum(pool.map(_worker, range(threads)))
+    return total / (time.perf_counter() - start)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--duration", type=float, default=2.0)
+    parser.add_argument("--max-threads", type=int, default=os.cpu_count() or 1)
+    args = parser.parse_args()
+
+    gil = getattr(sys, "_is_gil_enabled", lambda: True)()
+    print(f"Python {sys.version.split()[0]}, GIL {'enabled' if gil else 'disabled'}")
+
+    baseline = None
+    threads = 1
+    while threads <= args.max_threads:
+        rate = run(threads, args.duration)
+        baseline = baseline or rate
+        print(f"{threads:3d} threads: {rate:10.0f} req/s  ({rate / baseline:.2f}x)")
+        threads *= 2
+
+
+if __name__ == "__main__":
+    main()
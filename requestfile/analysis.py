@@ -0,0 +1,164 @@
+"""
+Static analysis of a Requestfile
+
+Inspect the AST without evaluating it, to find out which files it
+includes and which variables it references or defines.
+"""
+
+from dataclasses import dataclass, field
+from typing import Iterable, Iterator
+
+from .ast import (
+    Argument,
+    Command,
+    Heredoc,
+    IncludedFile,
+    QuotedValue,
+    Requestfile,
+    Symbol,
+    Variable,
+)
+from .utils.interpolation import RE_VARIABLE
+
+# Commands whose first argument is the name of a variable being defined
+DEFINING_COMMANDS = ("set", "set-default", "foreach")
+
+# Commands whose first argument is the name of a variable extracted
+# from the response
+EXTRACTING_COMMANDS = ("extract",)
+
+
+@dataclass(slots=True)
+class RequestfileAnalysis:
+    # Paths of files referenced via <path, in the order they appear.
+    # Duplicates are removed.
+    includes: list[str] = field(default_factory=list)
+
+    # Names of variables holding paths of included files, via <$name
+    include_variables: list[str] = field(default_factory=list)
+
+    # Names of variables referenced via $name, or inside a literal
+    # value passed through the |interpolate filter.
+    variables_used: set[str] = field(default_factory=set)
+
+    # Names of variables defined via %SET or %SET-DEFAULT
+    variables_defined: set[str] = field(default_factory=set)
+
+    # Names of variables extracted from the response via %EXTRACT
+    variables_extracted: set[str] = field(default_factory=set)
+
+    # True if some variable definition uses a name that can only be
+    # known at evaluation time (eg. %SET: $name value)
+    dynamic_definitions: bool = False
+
+    # True if some variable references can only be known at
+    # evaluation time (eg. an included file being interpolated)
+    dynamic_references: bool = False
+
+    def undefined_variables(self, provided: Iterable[str] = ()) -> set[str]:
+        """
+        Find variables that are used, but never defined.
+
+        Variables in ``provided`` are assumed to be passed in by the
+        caller. Note the result is only conclusive if
+        ``dynamic_definitions`` is False.
+        """
+        return self.variables_used - self.variables_defined - set(provided)
+
+
+def analyze_requestfile(requestfile: Requestfile) -> RequestfileAnalysis:
+    """
+    Collect includes and variables referenced by a Requestfile.
+    """
+
+    result = RequestfileAnalysis()
+    includes = {}
+    include_variables = {}
+
+    for _cmd, arg in iter_arguments(requestfile):
+        match arg.value:
+            case IncludedFile(Variable(name)):
+                result.variables_used.add(name)
+                include_variables.setdefault(name, None)
+                if _is_interpolated(arg):
+                    result.dynamic_references = True
+
+            case IncludedFile(path):
+                includes.setdefault(path.value, None)
+                if _is_interpolated(arg):
+                    result.dynamic_references = True
+
+            case Variable(name):
+                result.variables_used.add(name)
+                if _is_interpolated(arg):
+                    result.dynamic_references = True
+
+            case Symbol(value) | QuotedValue(value) | Heredoc(_, value):
+                if _is_interpolated(arg):
+                    if arg.filters[0].name == "interpolate":
+                        result.variables_used.update(_find_variables(value or ""))
+                    else:
+                        # Value is transformed before interpolation
+                        result.dynamic_references = True
+
+    for cmd in iter_commands(requestfile):
+        if not cmd.arguments:
+            continue
+        name_arg = cmd.arguments[0]
+        is_literal = (
+            isinstance(name_arg.value, (Symbol, QuotedValue)) and not name_arg.filters
+        )
+        if cmd.name in DEFINING_COMMANDS:
+            if is_literal:
+                result.variables_defined.add(name_arg.value.value)
+            else:
+                result.dynamic_definitions = True
+        elif cmd.name in EXTRACTING_COMMANDS and is_literal:
+            result.variables_extracted.add(name_arg.value.value)
+
+    result.includes = list(includes)
+    result.include_variables = list(include_variables)
+    return result
+
+
+def iter_commands(requestfile: Requestfile) -> Iterator[Command]:
+    """Iterate all commands in a Requestfile, in file order"""
+    for section in (requestfile.preamble, requestfile.headers, requestfile.body):
+        for item in section:
+            if isinstance(item, Command):
+                yield item
+
+
+def iter_arguments(
+    requestfile: Requestfile,
+) -> Iterator[tuple[Command | None, Argument]]:
+    """
+    Iterate all arguments in a Requestfile, in file order.
+
+    Yields (command, argument) tuples; command is None for the
+    request line URL.
+    """
+    for item in requestfile.preamble:
+        if isinstance(item, Command):
+            for arg in item.arguments:
+                yield item, arg
+
+    if requestfile.requestline is not None:
+        yield None, requestfile.requestline.url_arg
+
+    for section in (requestfile.headers, requestfile.body):
+        for item in section:
+            if isinstance(item, Command):
+                for arg in item.arguments:
+                    yield item, arg
+
+
+def _is_interpolated(arg: Argument) -> bool:
+    return any(f.name == "interpolate" for f in arg.filters)
+
+
+def _find_variables(text: str) -> set[str]:
+    names = set()
+    for mo in RE_VARIABLE.finditer(text.encode()):
+        names.add(mo.group(mo.lastindex).decode())
+    return names
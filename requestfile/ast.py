@@ -31,12 +31,20 @@ class Requestline:
     method: str
     url_arg: Argument
 
+    # Position in the source file: first and last line, counting from 1
+    line: int | None = field(default=None, compare=False, repr=False)
+    end_line: int | None = field(default=None, compare=False, repr=False)
+
 
 @dataclass(slots=True)
 class Command:
     name: str
     arguments: list
 
+    # Position in the source file
+    line: int | None = field(default=None, compare=False, repr=False)
+    end_line: int | None = field(default=None, compare=False, repr=False)
+
 
 @dataclass(slots=True)
 class Argument:
@@ -63,7 +71,8 @@ class Heredoc:
 
 @dataclass(slots=True)
 class IncludedFile:
-    value: Symbol | QuotedValue
+    # Path of the file, or variable holding it
+    value: Symbol | QuotedValue | Variable
 
 
 @dataclass(slots=True)
@@ -84,12 +93,24 @@ class Header:
     name: str
     value: str
 
+    # Position in the source file
+    line: int | None = field(default=None, compare=False, repr=False)
+    end_line: int | None = field(default=None, compare=False, repr=False)
+
 
 @dataclass(slots=True)
 class RawData:
     value: str
 
+    # Position in the source file
+    line: int | None = field(default=None, compare=False, repr=False)
+    end_line: int | None = field(default=None, compare=False, repr=False)
+
 
 @dataclass(slots=True)
 class Comment:
     value: str
+
+    # Position in the source file
+    line: int | None = field(default=None, compare=False, repr=False)
+    end_line: int | None = field(default=None, compare=False, repr=False)
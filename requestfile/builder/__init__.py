@@ -1,3 +1,15 @@
-from .builder import build_request
+from .builder import (
+    build_request,
+    build_request_async,
+    build_requests_parallel,
+    expand_foreach,
+    iter_build_requests,
+)
 
-__all__ = ["build_request"]
+__all__ = [
+    "build_request",
+    "build_request_async",
+    "build_requests_parallel",
+    "expand_foreach",
+    "iter_build_requests",
+]
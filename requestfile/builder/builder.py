@@ -2,14 +2,25 @@
 Build a Request from a Requestfile
 """
 
+import asyncio
+import glob
 import io
+import itertools
 import os
 from collections import OrderedDict
+from concurrent.futures import Executor, ThreadPoolExecutor
+from datetime import datetime, timezone
 from mimetypes import guess_type as guess_file_type
+from typing import Iterable, Iterator
 from urllib.parse import parse_qsl
 
 from multidict import CIMultiDict
 
+from requestfile.analysis import (
+    RequestfileAnalysis,
+    analyze_requestfile,
+    iter_arguments,
+)
 from requestfile.ast import (
     Argument,
     ArgValue,
@@ -27,32 +38,86 @@ from requestfile.parser import _parse_header_line
 from requestfile.utils.registry import Registry
 
 from .context import BuilderContext, get_builder_context, set_builder_context
-from .filters import get_filter
-from .request import Field, PartData, Request, RequestContentType
-from .resource_loader import BaseResourceLoader, ResourceLoader
+from .filter_cache import FilterCache, default_filter_cache
+from .filters import get_filter, get_incremental_filter, is_pure_filter
+from .request import Extraction, Field, PartData, Request, RequestContentType
+from .resource_loader import (
+    AsyncBaseResourceLoader,
+    AsyncResourceLoader,
+    BaseResourceLoader,
+    BlockingResourceLoader,
+    PrefetchedResourceLoader,
+    ResourceLoader,
+    ThreadedResourceLoader,
+    prefetch_resources,
+    prefetch_resources_async,
+)
+from .signing import (
+    aws4_authorization_header,
+    content_digest_header,
+    hmac_header,
+    payload_hash_header,
+    resolve_deferred_headers,
+)
+from .streaming import StreamedValue
 
 
 def build_request(
     requestfile: Requestfile,
     variables: dict[str, str | bytes] | None = None,
     resource_loader: BaseResourceLoader | None = None,
+    prefetch: bool = True,
+    filter_cache: FilterCache | None = None,
+    stream: bool = False,
 ) -> Request:
     """
     Create a Request object by evaluating a Requestfile.
+
+    Unless ``prefetch`` is False, all included files are read
+    concurrently before evaluation starts.
+
+    If ``stream`` is True, files included in the request body (via
+    %INCLUDE or %PART) are not read at build time; if all their
+    filters support incremental processing, they're represented as a
+    StreamedValue instead, to be read one chunk at a time when the
+    request is sent.
+
+    Output of pure filters is memoized in ``filter_cache``, or in a
+    process-wide cache if not specified.
+
+    Raises ValueError if the Requestfile references variables that
+    are neither passed in, nor defined anywhere in the file.
+
+    Safe to call from multiple threads at once, even on the same
+    Requestfile: all state lives in a per-call context, and
+    ``variables`` is copied rather than updated by %SET commands.
     """
 
+    variables = dict(variables or {})
+
     if resource_loader is None:
-        resource_loader = ResourceLoader(
-            os.path.dirname(requestfile.source_filename)
-            if requestfile.source_filename is not None
-            else os.getcwd()
+        resource_loader = ResourceLoader(get_resource_root(requestfile))
+
+    analysis = analyze_requestfile(requestfile)
+    check_undefined_variables(analysis, variables)
+
+    includes = get_include_paths(analysis, variables)
+    if stream:
+        includes = find_materialized_includes(requestfile)
+
+    if prefetch and len(includes) > 1:
+        resource_loader = PrefetchedResourceLoader(
+            resource_loader,
+            prefetch_resources(resource_loader, includes),
         )
 
     ctx = BuilderContext(
         requestfile=requestfile,
         request=None,
-        variables=variables or {},
+        variables=variables,
         resource_loader=resource_loader,
+        filter_cache=filter_cache or default_filter_cache,
+        stream=stream,
     )
 
     with set_builder_context(ctx):
@@ -66,10 +131,213 @@ def build_request(
         process_header_items(requestfile)
         process_body_items(requestfile)
         process_body_data(ctx.request)
+        resolve_deferred_headers(ctx.request)
+
+    ctx.request.extractions = ctx.extractions
 
     return ctx.request
 
 
+async def build_request_async(
+    requestfile: Requestfile,
+    variables: dict[str, str | bytes] | None = None,
+    resource_loader: AsyncBaseResourceLoader | BaseResourceLoader | None = None,
+    filter_cache: FilterCache | None = None,
+) -> Request:
+    """
+    Create a Request object by evaluating a Requestfile, from asyncio
+    code.
+
+    All included files are read concurrently, without blocking the
+    event loop; evaluation then runs on the prefetched data.
+
+    Synchronous resource loaders are accepted too: their reads are
+    offloaded to worker threads.
+    """
+
+    variables = variables or {}
+
+    if resource_loader is None:
+        resource_loader = AsyncResourceLoader(get_resource_root(requestfile))
+    elif isinstance(resource_loader, BaseResourceLoader):
+        resource_loader = ThreadedResourceLoader(resource_loader)
+
+    analysis = analyze_requestfile(requestfile)
+    check_undefined_variables(analysis, variables)
+
+    files = await prefetch_resources_async(
+        resource_loader, get_include_paths(analysis, variables)
+    )
+
+    if all(name in variables for name in analysis.include_variables):
+        return build_request(
+            requestfile,
+            variables=variables,
+            resource_loader=PrefetchedResourceLoader(None, files),
+            prefetch=False,
+            filter_cache=filter_cache,
+        )
+
+    # Some paths are only known during evaluation (eg. set via %SET):
+    # evaluate in a worker thread, reading them through the event loop
+    fallback = BlockingResourceLoader(resource_loader, asyncio.get_running_loop())
+    return await asyncio.to_thread(
+        build_request,
+        requestfile,
+        variables=variables,
+        resource_loader=PrefetchedResourceLoader(fallback, files),
+        prefetch=False,
+        filter_cache=filter_cache,
+    )
+
+
+def build_requests_parallel(
+    items: Iterable[tuple[Requestfile, dict[str, str | bytes] | None]],
+    executor: Executor | None = None,
+    max_workers: int | None = None,
+    **kwargs,
+) -> list[Request]:
+    """
+    Build many requests concurrently, using a thread pool.
+
+    ``items`` are (requestfile, variables) tuples; other arguments are
+    passed to build_request(). Returns requests in the same order as
+    ``items``. Errors raised while building any of them are
+    propagated.
+
+    Threads only speed things up on free-threaded Python builds, or
+    when building is dominated by reading included files.
+    """
+
+    def _build(item):
+        requestfile, variables = item
+        return build_request(requestfile, variables=variables, **kwargs)
+
+    if executor is not None:
+        return list(executor.map(_build, items))
+
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        return list(pool.map(_build, items))
+
+
+def expand_foreach(
+    requestfile: Requestfile,
+    variables: dict[str, str | bytes] | None = None,
+) -> Iterator[dict[str, str]]:
+    """
+    Find the variable bindings for each request a Requestfile expands
+    to, via %FOREACH.
+
+    Each ``%FOREACH: <name> <pattern>`` binds ``name`` to the path of
+    every file matching the glob ``pattern``, relative to the
+    Requestfile, in sorted order; several of them expand to all the
+    combinations. Yields a single empty dict if there are none.
+
+    Patterns can reference ``variables``, but not variables set in
+    the Requestfile itself.
+    """
+
+    root = get_resource_root(requestfile)
+    ctx = BuilderContext(
+        requestfile=requestfile,
+        request=None,
+        variables=dict(variables or {}),
+        resource_loader=ResourceLoader(root),
+    )
+
+    loops = []
+    with set_builder_context(ctx):
+        for item in requestfile.preamble:
+            if isinstance(item, Command) and item.name == "foreach":
+                loops.append(_eval_foreach(ctx, item))
+
+    names = [name for name, _ in loops]
+    matches = [_glob_files(root, pattern) for _, pattern in loops]
+    for values in itertools.product(*matches):
+        yield dict(zip(names, values))
+
+
+def iter_build_requests(
+    requestfile: Requestfile,
+    variables: dict[str, str | bytes] | None = None,
+    **kwargs,
+) -> Iterator[Request]:
+    """
+    Build all the requests a Requestfile expands to, via %FOREACH.
+
+    Requests are built lazily, one at a time, as this is iterated.
+    Other arguments are passed to build_request().
+    """
+    for bindings in expand_foreach(requestfile, variables):
+        yield build_request(
+            requestfile, variables={**(variables or {}), **bindings}, **kwargs
+        )
+
+
+def _glob_files(root: str, pattern: str) -> list[str]:
+    """Files matching a pattern, relative to ``root`` unless absolute"""
+    paths = glob.iglob(pattern, root_dir=root, recursive=True)
+    return sorted(path for path in paths if os.path.isfile(os.path.join(root, path)))
+
+
+def get_resource_root(requestfile: Requestfile) -> str:
+    """Directory included files are relative to"""
+    if requestfile.source_filename is not None:
+        return os.path.dirname(requestfile.source_filename)
+    return os.getcwd()
+
+
+def get_include_paths(
+    analysis: RequestfileAnalysis, variables: dict[str, str | bytes]
+) -> list[str]:
+    """
+    Paths of all files included, including the ones referenced via
+    variables, if defined in ``variables``.
+    """
+    paths = dict.fromkeys(analysis.includes)
+    for name in analysis.include_variables:
+        if name in variables:
+            paths.setdefault(_ensure_str(variables[name]), None)
+    return list(paths)
+
+
+def find_materialized_includes(requestfile: Requestfile) -> list[str]:
+    """
+    Find included files that need to be read in full when streaming.
+
+    Files included via variables are left out, and read when needed.
+    """
+    paths = {}
+    for cmd, arg in iter_arguments(requestfile):
+        match arg.value:
+            case IncludedFile(Symbol(path) | QuotedValue(path)):
+                if not _is_streamable(cmd, arg):
+                    paths.setdefault(path, None)
+    return list(paths)
+
+
+def _is_streamable(cmd: Command | None, arg: Argument) -> bool:
+    if cmd is None or cmd.name not in STREAMING_COMMANDS:
+        return False
+    if arg is not cmd.arguments[STREAMING_COMMANDS[cmd.name]]:
+        return False
+    return all(get_incremental_filter(f.name) for f in arg.filters)
+
+
+def check_undefined_variables(
+    analysis: RequestfileAnalysis, variables: dict[str, str | bytes]
+):
+    """
+    Fail early if some variables are referenced but never defined.
+    """
+    if analysis.dynamic_definitions:
+        # Cannot tell for sure until evaluation
+        return
+    if undefined := analysis.undefined_variables(variables):
+        names = ", ".join(sorted(undefined))
+        raise ValueError(f"Undefined variables: {names}")
+
+
 def process_preamble_items(requestfile: Requestfile):
     ctx = get_builder_context()
     for item in requestfile.preamble:
@@ -131,17 +399,95 @@ def eval_arguments(
     return [(arg.name, eval_argument(ctx, arg)) for arg in cmd.arguments]
 
 
-def eval_argument(ctx: BuilderContext, arg: Argument) -> str | bytes:
+def eval_argument(
+    ctx: BuilderContext, arg: Argument, stream: bool = False
+) -> str | bytes | StreamedValue:
+    """
+    Evaluate an argument, applying its filters.
+
+    If ``stream`` is True and streaming is enabled on the context,
+    included files might be returned as a StreamedValue.
+    """
+    if stream and ctx.stream and isinstance(arg.value, IncludedFile):
+        if (streamed := stream_argument(ctx, arg)) is not None:
+            return streamed
+
     value = eval_argument_value(ctx, arg.value)
+    return apply_filters(ctx, value, [f.name for f in arg.filters])
+
+
+def stream_argument(ctx: BuilderContext, arg: Argument) -> StreamedValue | None:
+    """
+    Evaluate an included file argument lazily.
+
+    Returns None if any of the filters doesn't support incremental
+    processing.
+    """
+
+    assert isinstance(arg.value, IncludedFile)
+    path = get_include_path(ctx, arg.value)
+    loader = ctx.resource_loader
+
+    factories = []
+    text = False
+    size = loader.get_size(path)
 
-    # Apply filters
     for filter_def in arg.filters:
-        filter_fn = get_filter(filter_def.name)
-        value = filter_fn(value)
+        filter_cls = get_incremental_filter(filter_def.name)
+        if filter_cls is None:
+            return None
+        factories.append(filter_cls.bind(ctx))
+        if filter_cls.output_text is not None:
+            text = filter_cls.output_text
+        if size is not None:
+            size = filter_cls.output_size(size)
+
+    return StreamedValue(
+        lambda: loader.iter_chunks(path),
+        filters=factories,
+        text=text,
+        size=size,
+    )
+
+
+def apply_filters(
+    ctx: BuilderContext, value: str | bytes, names: list[str]
+) -> str | bytes:
+    """
+    Apply a chain of filters to a value.
+
+    Runs of consecutive pure filters are memoized via the context
+    filter cache, if any.
+    """
+
+    pos = 0
+    while pos < len(names):
+        end = pos
+        while end < len(names) and is_pure_filter(names[end]):
+            end += 1
+
+        if end == pos or ctx.filter_cache is None:
+            # Impure filter, or caching disabled
+            value = get_filter(names[pos])(value)
+            pos += 1
+            continue
+
+        chain = tuple(names[pos:end])
+        value = ctx.filter_cache.apply(chain, value, _make_chain_fn(chain))
+        pos = end
 
     return value
 
 
+def _make_chain_fn(chain: tuple[str, ...]):
+    def _run_chain(value: str | bytes) -> str | bytes:
+        for name in chain:
+            value = get_filter(name)(value)
+        return value
+
+    return _run_chain
+
+
 def eval_argument_value(ctx: BuilderContext, argvalue: ArgValue) -> str | bytes:
     if isinstance(argvalue, (Symbol, QuotedValue, Heredoc)):
         if argvalue.value is None:
@@ -149,8 +495,7 @@ def eval_argument_value(ctx: BuilderContext, argvalue: ArgValue) -> str | bytes:
         return argvalue.value
 
     if isinstance(argvalue, IncludedFile):
-        filename = argvalue.value.value
-        return ctx.resource_loader.read_bytes(filename)
+        return ctx.resource_loader.read_bytes(get_include_path(ctx, argvalue))
 
     if isinstance(argvalue, Variable):
         return ctx.variables[argvalue.value]
@@ -159,6 +504,13 @@ def eval_argument_value(ctx: BuilderContext, argvalue: ArgValue) -> str | bytes:
     raise TypeError(f"Unsupported argument value type: {argvalue}")
 
 
+def get_include_path(ctx: BuilderContext, included: IncludedFile) -> str:
+    """Path of an included file, possibly held in a variable"""
+    if isinstance(included.value, Variable):
+        return _ensure_str(ctx.variables[included.value.value])
+    return included.value.value
+
+
 def determine_content_type(req: Request) -> RequestContentType:
     """
     Determine content type for a request.
@@ -180,6 +532,11 @@ def determine_content_type(req: Request) -> RequestContentType:
                 capabilities["text_data"] = True
             case bytes():
                 capabilities["binary_data"] = True
+            case StreamedValue():
+                if item.text:
+                    capabilities["text_data"] = True
+                else:
+                    capabilities["binary_data"] = True
             case Field(_):
                 capabilities["form_data"] = True
             case PartData(_):
@@ -258,6 +615,24 @@ def process_body_data(req: Request):
         Raw str/bytes will be parsed as form data.
     """
 
+    streamed = any(isinstance(item, StreamedValue) for item in req.body_data)
+
+    if req.content_type == RequestContentType.TEXT and streamed:
+        parts = []
+        for item in req.body_data:
+            if not isinstance(item, (str, StreamedValue)):
+                raise TypeError("Bad body_data for TEXT")
+            parts.extend((item, "\n"))
+        req.raw_body = StreamedValue.concat(parts, text=True)
+        return
+
+    if req.content_type == RequestContentType.BYTES and streamed:
+        for item in req.body_data:
+            if not isinstance(item, (str, bytes, StreamedValue)):
+                raise TypeError("Bad body_data for BYTES")
+        req.raw_body = StreamedValue.concat(req.body_data)
+        return
+
     if req.content_type == RequestContentType.TEXT:
         result = io.StringIO()
         for item in req.body_data:
@@ -298,6 +673,10 @@ def process_body_data(req: Request):
                     for key, val in parse_qsl(item):
                         req.fields.add(key.decode(), val)
 
+                case StreamedValue():
+                    for key, val in parse_qsl(item.read()):
+                        req.fields.add(key.decode(), val)
+
                 case _:
                     # Unreachable
                     raise TypeError(f"Unsupported item: {item}")
@@ -310,6 +689,15 @@ PREAMBLE_COMMANDS = Registry()
 HEADER_COMMANDS = Registry()
 BODY_COMMANDS = Registry()
 
+EXTRACTION_SOURCES = ("json", "header", "regex")
+
+# Commands accepting a streamed value, and the position of the
+# argument being streamed.
+STREAMING_COMMANDS = {
+    "include": 0,
+    "part": -1,
+}
+
 
 @PREAMBLE_COMMANDS.declare("set")
 @HEADER_COMMANDS.declare("set")
@@ -336,6 +724,48 @@ def command_set_default(ctx: BuilderContext, cmd: Command):
     ctx.variables.setdefault(_ensure_str(name), value)
 
 
+@PREAMBLE_COMMANDS.declare("extract")
+@HEADER_COMMANDS.declare("extract")
+@BODY_COMMANDS.declare("extract")
+def command_extract(ctx: BuilderContext, cmd: Command):
+    if len(cmd.arguments) != 2:
+        raise ValueError(
+            "Invalid syntax. Expected: %EXTRACT: <name> json|header|regex=<expr>"
+        )
+    args = eval_arguments(ctx, cmd)
+    [(_, name), (source, expression)] = args
+
+    if source not in EXTRACTION_SOURCES:
+        raise ValueError(
+            f"Invalid extraction source: {source}. "
+            f"Expected one of: {', '.join(EXTRACTION_SOURCES)}"
+        )
+
+    extraction = Extraction(_ensure_str(name), source, _ensure_str(expression))
+    ctx.extractions.append(extraction)
+
+
+@PREAMBLE_COMMANDS.declare("foreach")
+def command_foreach(ctx: BuilderContext, cmd: Command):
+    if len(cmd.arguments) != 2:
+        raise ValueError("Invalid syntax. Expected: %FOREACH: <name> <pattern>")
+    name = _ensure_str(eval_argument(ctx, cmd.arguments[0]))
+
+    # Bound by expand_foreach()
+    if name not in ctx.variables:
+        raise ValueError(
+            f"Unbound %FOREACH variable: {name}. "
+            "Use iter_build_requests() to expand the Requestfile"
+        )
+
+
+def _eval_foreach(ctx: BuilderContext, cmd: Command) -> tuple[str, str]:
+    if len(cmd.arguments) != 2:
+        raise ValueError("Invalid syntax. Expected: %FOREACH: <name> <pattern>")
+    [(_, name), (_, pattern)] = eval_arguments(ctx, cmd)
+    return _ensure_str(name), _ensure_str(pattern)
+
+
 @PREAMBLE_COMMANDS.declare("param")
 @HEADER_COMMANDS.declare("param")
 def command_param(ctx: BuilderContext, cmd: Command):
@@ -371,8 +801,7 @@ def command_cookie(ctx: BuilderContext, cmd: Command):
 def command_include(ctx: BuilderContext, cmd: Command):
     if len(cmd.arguments) != 1:
         raise ValueError("Invalid syntax. Expected: %INCLUDE: <value>")
-    args = eval_arguments(ctx, cmd)
-    [(_, value)] = args
+    value = eval_argument(ctx, cmd.arguments[0], stream=True)
 
     ctx.request.body_data.append(value)
 
@@ -392,40 +821,12 @@ def command_field(ctx: BuilderContext, cmd: Command):
 def command_part(ctx: BuilderContext, cmd: Command):
     if len(cmd.arguments) < 2:
         raise ValueError("Invalid syntax. Expected: %PART: <name> [<args> ...] <value>")
-    args = eval_arguments(ctx, cmd)
+    args = [(arg.name, eval_argument(ctx, arg)) for arg in cmd.arguments[:-1]]
 
     (_, name) = args[0]
-    (_, value) = args[-1]
-
-    extra: dict[str, str | bytes | None] = OrderedDict(
-        [
-            ("mimetype", None),
-            ("filename", None),
-            ("headers", None),
-        ]
-    )
+    value = eval_argument(ctx, cmd.arguments[-1], stream=True)
 
-    # Assign command arguments to the correct argument.
-    # TODO: make this into a generic function
-    for argname, argvalue in args[1:-1]:
-        if argname is None:
-            # Positional argument: assign to the first free argument
-            for k, v in extra.items():
-                if v is None:
-                    extra[k] = argvalue
-                    break
-            else:
-                # Did not break -> all parameters are full
-                raise ValueError("Too many arguments to %PART")
-        else:
-            # Named argument
-            if argname not in extra:
-                raise ValueError(f"Unknown argument to %PART: {argname}")
-            if extra[argname] is not None:
-                raise ValueError(
-                    f"Argument to %PART specified multiple times: {argname}"
-                )
-            extra[argname] = argvalue
+    extra = _assign_arguments("%PART", args[1:], ["mimetype", "filename", "headers"])
 
     mimetype = extra["mimetype"]
     filename = extra["filename"]
@@ -435,7 +836,7 @@ def command_part(ctx: BuilderContext, cmd: Command):
         # Try and guess mime type and file name from the original file
         value_argument = cmd.arguments[-1]
         if isinstance(obj := value_argument.value, IncludedFile):
-            path = obj.value.value
+            path = get_include_path(ctx, obj)
             if filename is None:
                 filename = os.path.basename(path)
             if mimetype is None:
@@ -460,6 +861,101 @@ def command_part(ctx: BuilderContext, cmd: Command):
     ctx.request.body_data.append(part)
 
 
+@HEADER_COMMANDS.declare("content-digest")
+def command_content_digest(ctx: BuilderContext, cmd: Command):
+    if len(cmd.arguments) > 1:
+        raise ValueError("Invalid syntax. Expected: %CONTENT-DIGEST: [<algorithm>]")
+    algorithm = "sha-256"
+    if cmd.arguments:
+        [(_, algorithm)] = eval_arguments(ctx, cmd)
+
+    header = content_digest_header(_ensure_str(algorithm))
+    ctx.request.headers.add("Content-Digest", header)
+
+
+@HEADER_COMMANDS.declare("sign-hmac")
+def command_sign_hmac(ctx: BuilderContext, cmd: Command):
+    if len(cmd.arguments) < 2:
+        raise ValueError(
+            "Invalid syntax. Expected: %SIGN-HMAC: <header> <key> [<args> ...]"
+        )
+    args = eval_arguments(ctx, cmd)
+
+    (_, name) = args[0]
+    (_, key) = args[1]
+    extra = _assign_arguments("%SIGN-HMAC", args[2:], ["algorithm", "encoding"])
+
+    header = hmac_header(
+        _ensure_bytes(key),
+        algorithm=_ensure_str(extra["algorithm"] or "sha256"),
+        encoding=_ensure_str(extra["encoding"] or "hex"),
+    )
+    ctx.request.headers.add(_ensure_str(name), header)
+
+
+@HEADER_COMMANDS.declare("sign-aws4")
+def command_sign_aws4(ctx: BuilderContext, cmd: Command):
+    if len(cmd.arguments) != 4:
+        raise ValueError(
+            "Invalid syntax. Expected: "
+            "%SIGN-AWS4: <access_key> <secret_key> <region> <service>"
+        )
+    args = eval_arguments(ctx, cmd)
+    [(_, access_key), (_, secret_key), (_, region), (_, service)] = args
+
+    amz_date = datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%SZ")
+
+    ctx.request.headers.add("X-Amz-Date", amz_date)
+    ctx.request.headers.add("X-Amz-Content-Sha256", payload_hash_header())
+    ctx.request.headers.add(
+        "Authorization",
+        aws4_authorization_header(
+            access_key=_ensure_str(access_key),
+            secret_key=_ensure_str(secret_key),
+            region=_ensure_str(region),
+            service=_ensure_str(service),
+            amz_date=amz_date,
+        ),
+    )
+
+
+def _assign_arguments(
+    cmd_name: str,
+    args: list[tuple[str | None, str | bytes]],
+    names: list[str],
+) -> dict[str, str | bytes | None]:
+    """
+    Assign command arguments to the correct parameter.
+
+    Positional arguments are assigned to the first free parameter;
+    named arguments to the parameter with the same name.
+    """
+
+    extra: dict[str, str | bytes | None] = OrderedDict((name, None) for name in names)
+
+    for argname, argvalue in args:
+        if argname is None:
+            # Positional argument: assign to the first free argument
+            for k, v in extra.items():
+                if v is None:
+                    extra[k] = argvalue
+                    break
+            else:
+                # Did not break -> all parameters are full
+                raise ValueError(f"Too many arguments to {cmd_name}")
+        else:
+            # Named argument
+            if argname not in extra:
+                raise ValueError(f"Unknown argument to {cmd_name}: {argname}")
+            if extra[argname] is not None:
+                raise ValueError(
+                    f"Argument to {cmd_name} specified multiple times: {argname}"
+                )
+            extra[argname] = argvalue
+
+    return extra
+
+
 def _ensure_str(text: str | bytes) -> str:
     if not isinstance(text, str):
         return text.decode()
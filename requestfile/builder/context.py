@@ -1,10 +1,11 @@
 from contextlib import contextmanager
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 
 from requestfile.ast import Requestfile
 from contextvars import ContextVar
 
-from .request import Request
+from .filter_cache import FilterCache
+from .request import Extraction, Request
 from .resource_loader import BaseResourceLoader
 
 
@@ -14,6 +15,13 @@ class BuilderContext:
     request: Request
     variables: dict[str, str | bytes]
     resource_loader: BaseResourceLoader
+    filter_cache: FilterCache | None = None
+
+    # Whether included files can be streamed into the request body
+    stream: bool = False
+
+    # Values to extract from the response
+    extractions: list[Extraction] = field(default_factory=list)
 
 
 _current_builder_context = ContextVar[BuilderContext]("_current_builder_context")
@@ -0,0 +1,113 @@
+"""
+Memoize the output of pure filter chains
+"""
+
+import hashlib
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Callable
+
+
+@dataclass(slots=True)
+class FilterCacheStats:
+    hits: int = 0
+    misses: int = 0
+    evictions: int = 0
+    entries: int = 0
+    total_bytes: int = 0
+
+
+class FilterCache:
+    """
+    Bounded cache for the output of pure filter chains.
+
+    Entries are keyed by the names of the filters in the chain, plus a
+    digest of the input value. Least recently used entries are evicted
+    once the total size of cached outputs goes over ``max_bytes``.
+
+    Inputs smaller than ``min_input_size`` are not cached, as running
+    the filters is cheaper than hashing and bookkeeping.
+    """
+
+    def __init__(self, max_bytes: int = 64 * 1024 * 1024, min_input_size: int = 1024):
+        self.max_bytes = max_bytes
+        self.min_input_size = min_input_size
+        self._entries: OrderedDict[tuple, tuple[str | bytes, int]] = OrderedDict()
+        self._stats = FilterCacheStats()
+        self._lock = threading.Lock()
+
+    def apply(
+        self,
+        chain: tuple[str, ...],
+        value: str | bytes,
+        compute: Callable[[str | bytes], str | bytes],
+    ) -> str | bytes:
+        """
+        Return the cached output of ``chain`` for ``value``, running
+        ``compute(value)`` on cache misses.
+        """
+
+        if len(value) < self.min_input_size or self.max_bytes <= 0:
+            return compute(value)
+
+        key = (chain, isinstance(value, str), _digest(value))
+
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                self._stats.hits += 1
+                return entry[0]
+            self._stats.misses += 1
+
+        result = compute(value)
+        size = _sizeof(result)
+
+        if size > self.max_bytes:
+            return result  # Would evict everything else
+
+        with self._lock:
+            if key not in self._entries:
+                self._entries[key] = (result, size)
+                self._stats.total_bytes += size
+                self._evict()
+        return result
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._stats.total_bytes = 0
+
+    @property
+    def stats(self) -> FilterCacheStats:
+        with self._lock:
+            return FilterCacheStats(
+                hits=self._stats.hits,
+                misses=self._stats.misses,
+                evictions=self._stats.evictions,
+                entries=len(self._entries),
+                total_bytes=self._stats.total_bytes,
+            )
+
+    def _evict(self):
+        while self._stats.total_bytes > self.max_bytes:
+            _, (_, size) = self._entries.popitem(last=False)
+            self._stats.total_bytes -= size
+            self._stats.evictions += 1
+
+
+def _digest(value: str | bytes) -> bytes:
+    if isinstance(value, str):
+        value = value.encode("utf-8", "surrogatepass")
+    return hashlib.blake2b(value, digest_size=20).digest()
+
+
+def _sizeof(value: str | bytes) -> int:
+    if isinstance(value, str):
+        # Rough estimate, good enough for accounting purposes
+        return len(value) * 2
+    return len(value)
+
+
+default_filter_cache = FilterCache()
@@ -1,10 +1,22 @@
 import base64
+import hashlib
 from urllib.parse import quote as urlquote
 from urllib.parse import unquote as urlunquote
 
 from requestfile.utils.interpolation import interpolate_vars
 
 from .context import get_builder_context
+from .streaming import (
+    Base64Decoder,
+    Base64Encoder,
+    IncrementalFilter,
+    Interpolator,
+    Sha256Digest,
+    Sha512Digest,
+    TextDecoder,
+    UrlQuoteDecoder,
+    UrlQuoteEncoder,
+)
 from requestfile.utils.registry import Registry
 
 FILTERS = Registry()
@@ -14,7 +26,24 @@ def get_filter(name):
     return FILTERS.get(name)
 
 
-@FILTERS.declare("base64")
+def is_pure_filter(name) -> bool:
+    """
+    Check whether a filter is pure.
+
+    Pure filters only depend on their input, so their output can be
+    safely memoized.
+    """
+    return FILTERS.get_options(name).get("pure", False)
+
+
+def get_incremental_filter(name) -> type[IncrementalFilter] | None:
+    """
+    Get the incremental version of a filter, if it has one.
+    """
+    return FILTERS.get_options(name).get("incremental")
+
+
+@FILTERS.declare("base64", pure=True, incremental=Base64Encoder)
 def filter_base64(text: str | bytes) -> str:
     """Encode string or binary data to a base64 string"""
     if isinstance(text, str):
@@ -22,7 +51,7 @@ def filter_base64(text: str | bytes) -> str:
     return base64.b64encode(text).decode()
 
 
-@FILTERS.declare("from-base64")
+@FILTERS.declare("from-base64", pure=True, incremental=Base64Decoder)
 def filter_from_base64(data: str | bytes) -> bytes:
     """Decode a base64 string to binary data"""
     if isinstance(data, str):
@@ -30,19 +59,19 @@ def filter_from_base64(data: str | bytes) -> bytes:
     return base64.b64decode(data)
 
 
-@FILTERS.declare("urlquote")
+@FILTERS.declare("urlquote", pure=True, incremental=UrlQuoteEncoder)
 def filter_urlquote(text: str) -> str:
     """URL-quote a string"""
     return urlquote(text)
 
 
-@FILTERS.declare("urlunquote")
+@FILTERS.declare("urlunquote", pure=True, incremental=UrlQuoteDecoder)
 def filter_urlunquote(text: str) -> str:
     """Unquote a URL-quoted string"""
     return urlunquote(text)
 
 
-@FILTERS.declare("text")
+@FILTERS.declare("text", pure=True, incremental=TextDecoder)
 def filter_text(text: str | bytes) -> str:
     """Decode binary data as unicode text"""
     if isinstance(text, str):
@@ -50,8 +79,24 @@ def filter_text(text: str | bytes) -> str:
     return text.decode()
 
 
-@FILTERS.declare("interpolate")
+@FILTERS.declare("interpolate", incremental=Interpolator)
 def filter_interpolate(text: str | bytes) -> str | bytes:
     """Interpolate ${variables} in a chunk of text"""
     ctx = get_builder_context()
     return interpolate_vars(text, ctx.variables)
+
+
+@FILTERS.declare("sha256", pure=True, incremental=Sha256Digest)
+def filter_sha256(data: str | bytes) -> str:
+    """Compute the SHA-256 hex digest of string or binary data"""
+    if isinstance(data, str):
+        data = data.encode()
+    return hashlib.sha256(data).hexdigest()
+
+
+@FILTERS.declare("sha512", pure=True, incremental=Sha512Digest)
+def filter_sha512(data: str | bytes) -> str:
+    """Compute the SHA-512 hex digest of string or binary data"""
+    if isinstance(data, str):
+        data = data.encode()
+    return hashlib.sha512(data).hexdigest()
@@ -0,0 +1,90 @@
+"""
+Stable fingerprints for built requests
+
+Two requests with the same fingerprint are expected to get the same
+response; used as a key for caching and recording responses.
+"""
+
+import hashlib
+from typing import Iterable
+
+from .request import Request, RequestContentType
+from .signing import iter_body_chunks
+from .streaming import StreamedValue
+
+
+def fingerprint_request(request: Request, ignore_headers: Iterable[str] = ()) -> str:
+    """
+    Compute a stable hash over a Request.
+
+    Covers method, URL, query parameters, headers, cookies and body.
+    Headers listed in ``ignore_headers`` (case-insensitive) are left
+    out, eg. for headers containing timestamps or tracing IDs.
+
+    Parameters, headers and cookies are sorted by name, so their
+    relative order doesn't matter; multiple values for the same name
+    keep their order.
+    """
+
+    ignored = {name.lower() for name in ignore_headers}
+    hasher = hashlib.sha256()
+
+    def _update(*parts: str | bytes):
+        for part in parts:
+            if isinstance(part, str):
+                part = part.encode()
+            # Length prefix, to avoid ambiguities between fields
+            hasher.update(len(part).to_bytes(8, "big"))
+            hasher.update(part)
+
+    _update("method", (request.method or "").upper())
+    _update("url", request.url or "")
+
+    for section, items in (
+        ("params", request.params.items()),
+        ("headers", ((k.lower(), v) for k, v in request.headers.items())),
+        ("cookies", request.cookies.items()),
+    ):
+        _update(section)
+        for name, value in _sorted_items(items):
+            if section == "headers" and name in ignored:
+                continue
+            _update(name, value)
+
+    _update("body", (request.content_type or RequestContentType.TEXT).value)
+
+    if request.content_type in (RequestContentType.FORM, RequestContentType.MULTIPART):
+        for name, value in _sorted_items(request.fields.items()):
+            _update("field", name, value)
+        for part in request.files.values():
+            _update("part", part.name, part.filename or "", part.mimetype or "")
+            for name, value in _sorted_items(part.headers.items()):
+                _update(name, value)
+            _update(_digest_value(part.body))
+    else:
+        body_hasher = hashlib.sha256()
+        for chunk in iter_body_chunks(request):
+            body_hasher.update(chunk)
+        _update(body_hasher.digest())
+
+    return hasher.hexdigest()
+
+
+def _sorted_items(items: Iterable[tuple[str, str | bytes]]) -> list[tuple]:
+    # Stable sort: values for the same name keep their order
+    return sorted(items, key=lambda item: item[0])
+
+
+def _digest_value(value: str | bytes | StreamedValue | None) -> bytes:
+    hasher = hashlib.sha256()
+    match value:
+        case None:
+            pass
+        case str():
+            hasher.update(value.encode())
+        case bytes():
+            hasher.update(value)
+        case StreamedValue():
+            for chunk in value:
+                hasher.update(chunk)
+    return hasher.digest()
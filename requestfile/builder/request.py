@@ -6,6 +6,8 @@ from typing import TypeAlias
 
 from multidict import CIMultiDict, MultiDict
 
+from .streaming import StreamedValue
+
 
 @dataclass(slots=True)
 class Request:
@@ -31,11 +33,14 @@ class Request:
     body_data: list[BodyItem] = field(default_factory=list)
 
     # Raw body data
-    raw_body: str | bytes | None = None
+    raw_body: str | bytes | StreamedValue | None = None
 
     # Guessed content type for the request
     content_type: RequestContentType | None = None
 
+    # Values to extract from the response, once sent
+    extractions: list[Extraction] = field(default_factory=list)
+
 
 class RequestContentType(Enum):
     # Binary data (any content-type)
@@ -67,7 +72,21 @@ class PartData:
     mimetype: str | bytes | None = None
     filename: str | bytes | None = None
     headers: CIMultiDict[str | bytes] = field(default_factory=CIMultiDict)
-    body: str | bytes | None = None
+    body: str | bytes | StreamedValue | None = None
+
+
+@dataclass(slots=True)
+class Extraction:
+    """Extract a value from the response into a variable"""
+
+    # Name of the variable to set
+    name: str
+
+    # Where to look for the value: "json", "header" or "regex"
+    source: str
+
+    # JSON path, header name or regular expression
+    expression: str
 
 
-BodyItem: TypeAlias = str | bytes | Field | PartData
+BodyItem: TypeAlias = str | bytes | StreamedValue | Field | PartData
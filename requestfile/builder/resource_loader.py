@@ -1,5 +1,11 @@
+import asyncio
+import mmap
 import os
 from abc import ABCMeta, abstractmethod
+from concurrent.futures import Executor, ThreadPoolExecutor
+from typing import Iterable, Iterator
+
+from .streaming import DEFAULT_CHUNK_SIZE
 
 
 class BaseResourceLoader(metaclass=ABCMeta):
@@ -7,6 +13,16 @@ class BaseResourceLoader(metaclass=ABCMeta):
     def read_bytes(self, path: str) -> bytes:
         pass
 
+    def iter_chunks(
+        self, path: str, chunk_size: int = DEFAULT_CHUNK_SIZE
+    ) -> Iterator[bytes]:
+        """Read a file one chunk at a time"""
+        yield self.read_bytes(path)
+
+    def get_size(self, path: str) -> int | None:
+        """Get the size of a file, if it can be known without reading it"""
+        return None
+
 
 class ResourceLoader(BaseResourceLoader):
     """Load data from files"""
@@ -15,10 +31,23 @@ class ResourceLoader(BaseResourceLoader):
         self.root = root
 
     def read_bytes(self, path: str):
+        with open(self._get_path(path), "rb") as fp:
+            return fp.read()
+
+    def iter_chunks(
+        self, path: str, chunk_size: int = DEFAULT_CHUNK_SIZE
+    ) -> Iterator[bytes]:
+        with open(self._get_path(path), "rb") as fp:
+            while chunk := fp.read(chunk_size):
+                yield chunk
+
+    def get_size(self, path: str) -> int:
+        return os.path.getsize(self._get_path(path))
+
+    def _get_path(self, path: str) -> str:
         if not os.path.isabs(path):
             path = os.path.join(self.root, path)
-        with open(path, "rb") as fp:
-            return fp.read()
+        return path
 
 
 class TestingResourceLoader(BaseResourceLoader):
@@ -27,3 +56,191 @@ class TestingResourceLoader(BaseResourceLoader):
 
     def read_bytes(self, path: str) -> bytes:
         return self.files[path]
+
+    def get_size(self, path: str) -> int:
+        return len(self.files[path])
+
+
+class PrefetchedResourceLoader(BaseResourceLoader):
+    """
+    Serve files that were loaded ahead of time.
+
+    Paths that were not prefetched are read from the wrapped loader,
+    if any.
+    """
+
+    def __init__(self, loader: BaseResourceLoader | None, files: dict[str, bytes]):
+        self.loader = loader
+        self.files = files
+
+    def read_bytes(self, path: str) -> bytes:
+        try:
+            return self.files[path]
+        except KeyError:
+            if self.loader is None:
+                raise
+            return self.loader.read_bytes(path)
+
+    def iter_chunks(
+        self, path: str, chunk_size: int = DEFAULT_CHUNK_SIZE
+    ) -> Iterator[bytes]:
+        if path in self.files or self.loader is None:
+            yield self.read_bytes(path)
+        else:
+            yield from self.loader.iter_chunks(path, chunk_size)
+
+    def get_size(self, path: str) -> int | None:
+        if path in self.files:
+            return len(self.files[path])
+        if self.loader is None:
+            return None
+        return self.loader.get_size(path)
+
+
+class SharedResourceLoader(BaseResourceLoader):
+    """
+    Serve files from anonymous shared memory maps.
+
+    Maps created before forking are shared with child processes, so
+    large files are kept in memory only once, no matter how many
+    processes use them. Paths that were not mapped are read from the
+    wrapped loader.
+    """
+
+    def __init__(self, loader: BaseResourceLoader, files: dict[str, mmap.mmap]):
+        self.loader = loader
+        self.files = files
+
+    def read_bytes(self, path: str) -> bytes:
+        if path in self.files:
+            return self.files[path][:]
+        return self.loader.read_bytes(path)
+
+    def iter_chunks(
+        self, path: str, chunk_size: int = DEFAULT_CHUNK_SIZE
+    ) -> Iterator[bytes]:
+        if path not in self.files:
+            yield from self.loader.iter_chunks(path, chunk_size)
+            return
+        mapped = self.files[path]
+        for offset in range(0, len(mapped), chunk_size):
+            yield mapped[offset : offset + chunk_size]
+
+    def get_size(self, path: str) -> int | None:
+        if path in self.files:
+            return len(self.files[path])
+        return self.loader.get_size(path)
+
+
+def map_resources(
+    loader: BaseResourceLoader, paths: Iterable[str]
+) -> dict[str, mmap.mmap]:
+    """
+    Copy files into anonymous shared memory maps.
+
+    Empty files are skipped, as they cannot be mapped.
+    """
+
+    files = {}
+    for path in paths:
+        size = loader.get_size(path)
+        chunks: Iterable[bytes] = loader.iter_chunks(path)
+        if size is None:
+            data = loader.read_bytes(path)
+            size, chunks = len(data), [data]
+        if size == 0:
+            continue
+
+        mapped = mmap.mmap(-1, size)
+        for chunk in chunks:
+            if mapped.tell() + len(chunk) > size:
+                raise ValueError(f"File changed while reading: {path}")
+            mapped.write(chunk)
+        if mapped.tell() != size:
+            raise ValueError(f"File changed while reading: {path}")
+        files[path] = mapped
+    return files
+
+
+class AsyncBaseResourceLoader(metaclass=ABCMeta):
+    @abstractmethod
+    async def read_bytes(self, path: str) -> bytes:
+        pass
+
+
+class ThreadedResourceLoader(AsyncBaseResourceLoader):
+    """
+    Wrap a synchronous loader for use from asyncio code.
+
+    Reads are offloaded to a worker thread, so they don't block the
+    event loop.
+    """
+
+    def __init__(self, loader: BaseResourceLoader):
+        self.loader = loader
+
+    async def read_bytes(self, path: str) -> bytes:
+        return await asyncio.to_thread(self.loader.read_bytes, path)
+
+
+class AsyncResourceLoader(ThreadedResourceLoader):
+    """Load data from files, without blocking the event loop"""
+
+    def __init__(self, root: str):
+        super().__init__(ResourceLoader(root))
+
+
+class BlockingResourceLoader(BaseResourceLoader):
+    """
+    Read through an asyncio loader, from a thread other than the one
+    running the event loop.
+    """
+
+    def __init__(
+        self, loader: AsyncBaseResourceLoader, event_loop: asyncio.AbstractEventLoop
+    ):
+        self.loader = loader
+        self.event_loop = event_loop
+
+    def read_bytes(self, path: str) -> bytes:
+        coro = self.loader.read_bytes(path)
+        return asyncio.run_coroutine_threadsafe(coro, self.event_loop).result()
+
+
+def prefetch_resources(
+    loader: BaseResourceLoader,
+    paths: Iterable[str],
+    executor: Executor | None = None,
+    max_workers: int | None = None,
+) -> dict[str, bytes]:
+    """
+    Read multiple files concurrently, using a thread pool.
+
+    Returns a dict mapping each path to its contents. Errors raised
+    while reading any of the files are propagated.
+    """
+
+    paths = list(dict.fromkeys(paths))
+
+    if len(paths) <= 1 and executor is None:
+        # Not worth spinning up a pool
+        return {path: loader.read_bytes(path) for path in paths}
+
+    if executor is not None:
+        return dict(zip(paths, executor.map(loader.read_bytes, paths)))
+
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        return dict(zip(paths, pool.map(loader.read_bytes, paths)))
+
+
+async def prefetch_resources_async(
+    loader: AsyncBaseResourceLoader,
+    paths: Iterable[str],
+) -> dict[str, bytes]:
+    """
+    Read multiple files concurrently, from asyncio code.
+    """
+
+    paths = list(dict.fromkeys(paths))
+    contents = await asyncio.gather(*(loader.read_bytes(path) for path in paths))
+    return dict(zip(paths, contents))
@@ -0,0 +1,247 @@
+"""
+Digests and signatures computed over the request body
+
+Headers depending on the body are added as placeholders while
+evaluating header commands, and resolved once the body has been
+built. All digests are computed in a single pass over the body, which
+is read one chunk at a time if streamed.
+"""
+
+import base64
+import hashlib
+import hmac
+from dataclasses import dataclass
+from typing import Callable, Iterator
+from urllib.parse import parse_qsl, quote, unquote, urlsplit
+
+from multidict import CIMultiDict
+
+from .request import Request, RequestContentType
+from .streaming import StreamedValue
+
+# Algorithm names used by the Content-Digest header (RFC 9530)
+CONTENT_DIGEST_ALGORITHMS = {
+    "sha-256": "sha256",
+    "sha-512": "sha512",
+}
+
+AWS4_ALGORITHM = "AWS4-HMAC-SHA256"
+
+
+@dataclass(slots=True)
+class DeferredHeader:
+    """
+    Placeholder for a header value depending on the request body.
+    """
+
+    # Create a hash object to be fed with the body data
+    make_hasher: Callable[[], "hashlib._Hash"]
+
+    # Compute the header value, given the request and the body digest
+    compute: Callable[[Request, bytes], str]
+
+    # Late headers are computed after all others have been resolved,
+    # eg. for signatures covering other headers.
+    late: bool = False
+
+
+def resolve_deferred_headers(request: Request):
+    """
+    Replace DeferredHeader placeholders with their actual values.
+    """
+
+    deferred = [
+        value for value in request.headers.values() if isinstance(value, DeferredHeader)
+    ]
+    if not deferred:
+        return
+
+    hashers = [item.make_hasher() for item in deferred]
+    for chunk in iter_body_chunks(request):
+        for hasher in hashers:
+            hasher.update(chunk)
+    digests = {id(item): h.digest() for item, h in zip(deferred, hashers)}
+
+    for late in (False, True):
+        headers = CIMultiDict()
+        for name, value in request.headers.items():
+            if isinstance(value, DeferredHeader) and value.late == late:
+                value = value.compute(request, digests[id(value)])
+            headers.add(name, value)
+        request.headers = headers
+
+
+def iter_body_chunks(request: Request) -> Iterator[bytes]:
+    """
+    Iterate over the raw request body, as bytes.
+
+    Only supported for raw (TEXT or BYTES) bodies, as form and
+    multipart bodies are encoded by the sender.
+    """
+
+    if request.content_type not in (
+        RequestContentType.TEXT,
+        RequestContentType.BYTES,
+        None,
+    ):
+        raise ValueError(
+            f"Cannot compute body digest for {request.content_type.value} requests"
+        )
+
+    match request.raw_body:
+        case None:
+            return
+        case str() as text:
+            yield text.encode()
+        case bytes() as data:
+            yield data
+        case StreamedValue() as value:
+            yield from value
+        case _:
+            # Unreachable
+            raise TypeError(f"Unsupported body: {request.raw_body}")
+
+
+def content_digest_header(algorithm: str) -> DeferredHeader:
+    try:
+        hash_name = CONTENT_DIGEST_ALGORITHMS[algorithm]
+    except KeyError:
+        raise ValueError(f"Unsupported digest algorithm: {algorithm}")
+
+    def _compute(request: Request, digest: bytes) -> str:
+        return f"{algorithm}=:{base64.b64encode(digest).decode()}:"
+
+    return DeferredHeader(lambda: hashlib.new(hash_name), _compute)
+
+
+def hmac_header(key: bytes, algorithm: str, encoding: str) -> DeferredHeader:
+    if algorithm not in hashlib.algorithms_available:
+        raise ValueError(f"Unsupported HMAC algorithm: {algorithm}")
+
+    def _compute(request: Request, digest: bytes) -> str:
+        return encode_digest(digest, encoding)
+
+    return DeferredHeader(lambda: hmac.new(key, digestmod=algorithm), _compute)
+
+
+def encode_digest(digest: bytes, encoding: str) -> str:
+    match encoding:
+        case "hex":
+            return digest.hex()
+        case "base64":
+            return base64.b64encode(digest).decode()
+        case _:
+            raise ValueError(f"Unsupported digest encoding: {encoding}")
+
+
+def payload_hash_header() -> DeferredHeader:
+    def _compute(request: Request, digest: bytes) -> str:
+        return digest.hex()
+
+    return DeferredHeader(hashlib.sha256, _compute)
+
+
+def aws4_authorization_header(
+    access_key: str,
+    secret_key: str,
+    region: str,
+    service: str,
+    amz_date: str,
+) -> DeferredHeader:
+    def _compute(request: Request, digest: bytes) -> str:
+        return sign_aws4(
+            method=request.method,
+            url=request.url,
+            params=list(request.params.items()),
+            headers=request.headers,
+            payload_hash=digest.hex(),
+            access_key=access_key,
+            secret_key=secret_key,
+            region=region,
+            service=service,
+            amz_date=amz_date,
+        )
+
+    return DeferredHeader(hashlib.sha256, _compute, late=True)
+
+
+def sign_aws4(
+    method: str,
+    url: str,
+    params: list[tuple[str, str | bytes]],
+    headers: CIMultiDict,
+    payload_hash: str,
+    access_key: str,
+    secret_key: str,
+    region: str,
+    service: str,
+    amz_date: str,
+) -> str:
+    """
+    Compute an AWS Signature Version 4 Authorization header.
+
+    All headers in ``headers`` are signed, along with the Host (taken
+    from the URL, unless explicitly set).
+    """
+
+    parsed = urlsplit(url)
+
+    # Canonical URI and query string
+    canonical_uri = quote(unquote(parsed.path or "/"), safe="/~")
+    query = parse_qsl(parsed.query, keep_blank_values=True) + [
+        (_ensure_str(k), _ensure_str(v)) for k, v in params
+    ]
+    canonical_query = "&".join(
+        f"{quote(k, safe='~')}={quote(v, safe='~')}" for k, v in sorted(query)
+    )
+
+    # Canonical headers
+    signed: dict[str, list[str]] = {}
+    for name, value in headers.items():
+        if isinstance(value, DeferredHeader) or name.lower() == "authorization":
+            continue
+        value = " ".join(_ensure_str(value).split())
+        signed.setdefault(name.lower(), []).append(value)
+    signed.setdefault("host", [parsed.netloc])
+    signed_headers = ";".join(sorted(signed))
+    canonical_headers = "".join(
+        f"{name}:{','.join(signed[name])}\n" for name in sorted(signed)
+    )
+
+    canonical_request = "\n".join(
+        [
+            method.upper(),
+            canonical_uri,
+            canonical_query,
+            canonical_headers,
+            signed_headers,
+            payload_hash,
+        ]
+    )
+
+    datestamp = amz_date[:8]
+    scope = f"{datestamp}/{region}/{service}/aws4_request"
+    string_to_sign = "\n".join(
+        [
+            AWS4_ALGORITHM,
+            amz_date,
+            scope,
+            hashlib.sha256(canonical_request.encode()).hexdigest(),
+        ]
+    )
+
+    key = f"AWS4{secret_key}".encode()
+    for part in (datestamp, region, service, "aws4_request"):
+        key = hmac.new(key, part.encode(), hashlib.sha256).digest()
+    signature = hmac.new(key, string_to_sign.encode(), hashlib.sha256).hexdigest()
+
+    return (
+        f"{AWS4_ALGORITHM} Credential={access_key}/{scope}, "
+        f"SignedHeaders={signed_headers}, Signature={signature}"
+    )
+
+
+def _ensure_str(text: str | bytes) -> str:
+    if not isinstance(text, str):
+        return text.decode()
+    return text
@@ -0,0 +1,324 @@
+"""
+Incremental filters and lazily-evaluated values
+
+Allows large included files to be passed through a chain of filters
+one chunk at a time, all the way into the request body, without ever
+holding the whole input or output in memory.
+"""
+
+import base64
+import codecs
+import hashlib
+import io
+import re
+from abc import ABCMeta, abstractmethod
+from typing import Callable, Iterable, Iterator
+from urllib.parse import quote as urlquote
+from urllib.parse import unquote_to_bytes as urlunquote_to_bytes
+
+from requestfile.utils.interpolation import interpolate_vars
+
+DEFAULT_CHUNK_SIZE = 64 * 1024
+
+
+class IncrementalFilter(metaclass=ABCMeta):
+    """
+    Filter that processes its input one chunk at a time.
+
+    A new instance is created every time the value is read; the
+    output of ``feed()`` for all chunks, followed by the output of
+    ``flush()``, must be the same as applying the regular filter to
+    the whole input.
+    """
+
+    # Whether output is text (True), binary (False),
+    # or the same as the input (None)
+    output_text: bool | None = None
+
+    @abstractmethod
+    def feed(self, chunk: str | bytes) -> str | bytes:
+        pass
+
+    def flush(self) -> str | bytes:
+        return b""
+
+    @classmethod
+    def bind(cls, ctx) -> Callable[[], "IncrementalFilter"]:
+        """
+        Return a factory for filter instances.
+
+        Called at build time, so filters depending on the builder
+        context can capture the state they need.
+        """
+        return cls
+
+    @classmethod
+    def output_size(cls, input_size: int) -> int | None:
+        """Size of the output for a given input size, if known"""
+        return None
+
+
+class Base64Encoder(IncrementalFilter):
+    output_text = True
+
+    def __init__(self):
+        self.pending = b""
+
+    def feed(self, chunk: str | bytes) -> str:
+        data = self.pending + _to_bytes(chunk)
+        cut = len(data) - len(data) % 3
+        self.pending = data[cut:]
+        return base64.b64encode(data[:cut]).decode()
+
+    def flush(self) -> str:
+        data, self.pending = self.pending, b""
+        return base64.b64encode(data).decode()
+
+    @classmethod
+    def output_size(cls, input_size: int) -> int:
+        return (input_size + 2) // 3 * 4
+
+
+RE_NOT_BASE64 = re.compile(rb"[^A-Za-z0-9+/=]")
+
+
+class Base64Decoder(IncrementalFilter):
+    output_text = False
+
+    def __init__(self):
+        self.pending = b""
+
+    def feed(self, chunk: str | bytes) -> bytes:
+        # Like b64decode(), discard characters outside the alphabet
+        data = self.pending + RE_NOT_BASE64.sub(b"", _to_bytes(chunk))
+        cut = len(data) - len(data) % 4
+        self.pending = data[cut:]
+        return base64.b64decode(data[:cut])
+
+    def flush(self) -> bytes:
+        data, self.pending = self.pending, b""
+        return base64.b64decode(data)
+
+
+class UrlQuoteEncoder(IncrementalFilter):
+    output_text = True
+
+    def feed(self, chunk: str | bytes) -> str:
+        # Each byte is quoted independently, no state needed
+        return urlquote(_to_bytes(chunk))
+
+    def flush(self) -> str:
+        return ""
+
+
+class UrlQuoteDecoder(IncrementalFilter):
+    output_text = True
+
+    def __init__(self):
+        self.pending = b""
+        self.decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+
+    def feed(self, chunk: str | bytes) -> str:
+        data = self.pending + _to_bytes(chunk)
+
+        # Hold back a trailing, incomplete escape sequence
+        cut = len(data)
+        pos = data.rfind(b"%", max(0, len(data) - 2))
+        if pos >= 0:
+            cut = pos
+
+        self.pending = data[cut:]
+        return self.decoder.decode(urlunquote_to_bytes(data[:cut]))
+
+    def flush(self) -> str:
+        data, self.pending = self.pending, b""
+        return self.decoder.decode(urlunquote_to_bytes(data), final=True)
+
+
+class TextDecoder(IncrementalFilter):
+    output_text = True
+
+    def __init__(self, encoding: str = "utf-8"):
+        self.decoder = codecs.getincrementaldecoder(encoding)()
+
+    def feed(self, chunk: str | bytes) -> str:
+        if isinstance(chunk, str):
+            return chunk
+        return self.decoder.decode(chunk)
+
+    def flush(self) -> str:
+        return self.decoder.decode(b"", final=True)
+
+
+class Interpolator(IncrementalFilter):
+    """
+    Interpolate variables, one line at a time.
+
+    Variable references never span multiple lines, so it's safe to
+    process all complete lines received so far.
+    """
+
+    def __init__(self, variables: dict[str, str | bytes]):
+        self.variables = variables
+        self.pending = b""
+
+    def feed(self, chunk: str | bytes) -> bytes:
+        data = self.pending + _to_bytes(chunk)
+        cut = data.rfind(b"\n") + 1
+        self.pending = data[cut:]
+        return _to_bytes(interpolate_vars(data[:cut], self.variables))
+
+    def flush(self) -> bytes:
+        data, self.pending = self.pending, b""
+        return _to_bytes(interpolate_vars(data, self.variables))
+
+    @classmethod
+    def bind(cls, ctx) -> Callable[[], IncrementalFilter]:
+        # Variables might change after this value was evaluated
+        variables = dict(ctx.variables)
+        return lambda: cls(variables)
+
+
+class HashDigest(IncrementalFilter):
+    """Compute the hex digest of the whole input"""
+
+    output_text = True
+    algorithm: str
+
+    def __init__(self):
+        self.hasher = hashlib.new(self.algorithm)
+
+    def feed(self, chunk: str | bytes) -> str:
+        self.hasher.update(_to_bytes(chunk))
+        return ""
+
+    def flush(self) -> str:
+        return self.hasher.hexdigest()
+
+    @classmethod
+    def output_size(cls, input_size: int) -> int:
+        return hashlib.new(cls.algorithm).digest_size * 2
+
+
+class Sha256Digest(HashDigest):
+    algorithm = "sha256"
+
+
+class Sha512Digest(HashDigest):
+    algorithm = "sha512"
+
+
+class StreamedValue:
+    """
+    Lazily evaluated value, produced one chunk at a time.
+
+    Every iteration reads the source again, and passes it through a
+    fresh instance of each filter. Iterating always yields bytes;
+    ``text`` tells whether the value should be considered text (UTF-8
+    encoded), like the output of the equivalent non-streaming filters.
+    """
+
+    def __init__(
+        self,
+        source: Callable[[], Iterable[str | bytes]],
+        filters: Iterable[Callable[[], IncrementalFilter]] = (),
+        text: bool = False,
+        size: int | None = None,
+    ):
+        self.source = source
+        self.filters = list(filters)
+        self.text = text
+
+        # Total size in bytes, if known in advance
+        self.size = size
+
+    def __iter__(self) -> Iterator[bytes]:
+        chunks = self.source()
+        for factory in self.filters:
+            chunks = _apply_incremental(factory(), chunks)
+        for chunk in chunks:
+            if chunk:
+                yield _to_bytes(chunk)
+
+    def __repr__(self):
+        size = "unknown size" if self.size is None else f"{self.size} bytes"
+        kind = "text" if self.text else "binary"
+        return f"<StreamedValue ({kind}, {size})>"
+
+    def read(self) -> bytes:
+        """Read the whole value into memory"""
+        return b"".join(self)
+
+    def as_file(self) -> "StreamedValueReader":
+        """Get a binary file-like object yielding the value"""
+        return StreamedValueReader(self)
+
+    @classmethod
+    def concat(cls, parts: list["str | bytes | StreamedValue"], text: bool = False):
+        """
+        Concatenate multiple values into a single stream.
+        """
+
+        def _source():
+            for part in parts:
+                if isinstance(part, StreamedValue):
+                    yield from part
+                else:
+                    yield part
+
+        sizes = [
+            part.size if isinstance(part, StreamedValue) else len(_to_bytes(part))
+            for part in parts
+        ]
+        size = None if None in sizes else sum(sizes)
+        return cls(_source, text=text, size=size)
+
+
+class StreamedValueReader(io.RawIOBase):
+    """
+    Read-only file object over a StreamedValue.
+
+    Exposes ``len`` when the size is known in advance, so HTTP clients
+    can send a Content-Length instead of using chunked encoding.
+    """
+
+    def __init__(self, value: StreamedValue):
+        self._chunks = iter(value)
+        self._buffer = b""
+        self._position = 0
+        if value.size is not None:
+            self.len = value.size
+
+    def readable(self) -> bool:
+        return True
+
+    def readinto(self, buffer) -> int:
+        while not self._buffer:
+            try:
+                self._buffer = next(self._chunks)
+            except StopIteration:
+                return 0
+        size = min(len(buffer), len(self._buffer))
+        buffer[:size] = self._buffer[:size]
+        self._buffer = self._buffer[size:]
+        self._position += size
+        return size
+
+    def tell(self) -> int:
+        return self._position
+
+
+def _apply_incremental(
+    filter_: IncrementalFilter, chunks: Iterable[str | bytes]
+) -> Iterator[str | bytes]:
+    for chunk in chunks:
+        if output := filter_.feed(chunk):
+            yield output
+    if output := filter_.flush():
+        yield output
+
+
+def _to_bytes(data: str | bytes) -> bytes:
+    if isinstance(data, str):
+        return data.encode()
+    return data
@@ -0,0 +1,350 @@
+"""
+Searchable index of a collection of Requestfiles
+
+The index is a SQLite file with one row per Requestfile (method, URL
+template, content hash, parse error if any), plus one row per
+searchable term: header names, commands, variables used or defined,
+and included files. Queries run against the index only, without
+reading or parsing any Requestfile.
+
+Files are indexed again only if their modification time or size
+changed, and then parsed again only if their content hash changed.
+"""
+
+import fnmatch
+import hashlib
+import io
+import os
+import sqlite3
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
+from typing import Iterable, Iterator
+
+from .analysis import analyze_requestfile, iter_commands
+from .ast import (
+    Argument,
+    Header,
+    Heredoc,
+    IncludedFile,
+    QuotedValue,
+    Symbol,
+    Variable,
+)
+from .parser import parse_requestfile
+
+# Default name for the index file, in the indexed directory
+INDEX_FILENAME = ".requestfile-index"
+
+# Kinds of searchable terms
+TERM_HEADER = "header"
+TERM_COMMAND = "command"
+TERM_USES = "uses"
+TERM_DEFINES = "defines"
+TERM_EXTRACTS = "extracts"
+TERM_INCLUDE = "include"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS files (
+    path TEXT PRIMARY KEY,
+    mtime_ns INTEGER NOT NULL,
+    size INTEGER NOT NULL,
+    sha256 TEXT NOT NULL,
+    method TEXT,
+    url TEXT,
+    error TEXT
+) WITHOUT ROWID;
+
+CREATE TABLE IF NOT EXISTS terms (
+    kind TEXT NOT NULL,
+    value TEXT NOT NULL,
+    path TEXT NOT NULL REFERENCES files (path) ON DELETE CASCADE,
+    PRIMARY KEY (kind, value, path)
+) WITHOUT ROWID;
+
+CREATE INDEX IF NOT EXISTS terms_path ON terms (path);
+"""
+
+
+@dataclass(slots=True)
+class CatalogEntry:
+    # Path of the Requestfile, relative to the indexed directory
+    path: str
+    sha256: str
+    method: str | None = None
+
+    # URL as written in the file, before evaluation
+    url: str | None = None
+
+    # Error raised while parsing the file, if any
+    error: str | None = None
+
+
+@dataclass(slots=True)
+class UpdateStats:
+    added: int = 0
+    updated: int = 0
+    unchanged: int = 0
+    removed: int = 0
+
+    # Files that failed to parse
+    errors: list[str] = field(default_factory=list)
+
+
+class Catalog:
+    """
+    Persistent index of the Requestfiles in a directory.
+
+    Call update() to bring the index up to date, and find() to search
+    it.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._db = sqlite3.connect(path)
+        self._db.execute("PRAGMA foreign_keys = ON")
+        self._db.executescript(SCHEMA)
+        self._db.commit()
+
+    def close(self):
+        self._db.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def __len__(self) -> int:
+        [(count,)] = self._db.execute("SELECT COUNT(*) FROM files")
+        return count
+
+    def update(
+        self,
+        root: str,
+        patterns: Iterable[str] = ("*",),
+        max_workers: int = 1,
+    ) -> UpdateStats:
+        """
+        Index new and changed files under ``root``, whose name matches
+        any of ``patterns``; remove deleted files from the index.
+
+        Changed files are parsed in ``max_workers`` processes.
+        """
+
+        stats = UpdateStats()
+        known = {
+            path: (mtime_ns, size, sha256)
+            for path, mtime_ns, size, sha256 in self._db.execute(
+                "SELECT path, mtime_ns, size, sha256 FROM files"
+            )
+        }
+        ignored = {os.path.abspath(self.path)}
+
+        changed = []
+        seen = set()
+        for path, st in _iter_files(root, tuple(patterns), ignored):
+            seen.add(path)
+            previous = known.get(path)
+            if previous is not None and previous[:2] == (st.st_mtime_ns, st.st_size):
+                stats.unchanged += 1
+                continue
+            changed.append((path, st, previous))
+
+        to_parse = []
+        with self._db:
+            for path in known.keys() - seen:
+                self._db.execute("DELETE FROM files WHERE path = ?", (path,))
+                stats.removed += 1
+
+            for path, st, previous in changed:
+                with open(os.path.join(root, path), "rb") as fp:
+                    data = fp.read()
+                sha256 = hashlib.sha256(data).hexdigest()
+                if previous is not None and previous[2] == sha256:
+                    # Touched, but not modified
+                    self._db.execute(
+                        "UPDATE files SET mtime_ns = ?, size = ? WHERE path = ?",
+                        (st.st_mtime_ns, st.st_size, path),
+                    )
+                    stats.unchanged += 1
+                    continue
+
+                self._db.execute("DELETE FROM files WHERE path = ?", (path,))
+                self._db.execute(
+                    "INSERT INTO files (path, mtime_ns, size, sha256) "
+                    "VALUES (?, ?, ?, ?)",
+                    (path, st.st_mtime_ns, st.st_size, sha256),
+                )
+                to_parse.append(path)
+                if previous is None:
+                    stats.added += 1
+                else:
+                    stats.updated += 1
+
+            self._store_parsed(root, to_parse, max_workers, stats)
+
+        return stats
+
+    def find(
+        self,
+        method: str | None = None,
+        url: str | None = None,
+        header: str | None = None,
+        command: str | None = None,
+        uses: str | None = None,
+        defines: str | None = None,
+        extracts: str | None = None,
+        include: str | None = None,
+        errors: bool = False,
+    ) -> list[CatalogEntry]:
+        """
+        Find indexed files matching all the given criteria.
+
+        ``url`` and ``include`` are glob patterns; header and command
+        names are matched case-insensitively. Files that failed to
+        parse are only returned if ``errors`` is True, and then only
+        those.
+        """
+
+        where = ["error IS NOT NULL" if errors else "error IS NULL"]
+        params: list[str] = []
+
+        if method is not None:
+            where.append("method = ?")
+            params.append(method.upper())
+        if url is not None:
+            where.append("url GLOB ?")
+            params.append(url)
+
+        terms = [
+            (TERM_HEADER, header and header.lower(), "="),
+            (TERM_COMMAND, command and command.lower(), "="),
+            (TERM_USES, uses, "="),
+            (TERM_DEFINES, defines, "="),
+            (TERM_EXTRACTS, extracts, "="),
+            (TERM_INCLUDE, include, "GLOB"),
+        ]
+        for kind, value, op in terms:
+            if value is None:
+                continue
+            where.append(
+                "EXISTS (SELECT 1 FROM terms WHERE terms.path = files.path "
+                f"AND kind = ? AND value {op} ?)"
+            )
+            params.extend((kind, value))
+
+        rows = self._db.execute(
+            "SELECT path, sha256, method, url, error FROM files "
+            f"WHERE {' AND '.join(where)} ORDER BY path",
+            params,
+        )
+        return [CatalogEntry(*row) for row in rows]
+
+    def _store_parsed(
+        self, root: str, paths: list[str], max_workers: int, stats: UpdateStats
+    ):
+        if max_workers > 1 and len(paths) > 1:
+            with ProcessPoolExecutor(max_workers) as pool:
+                results = pool.map(
+                    _index_file,
+                    [os.path.join(root, path) for path in paths],
+                    chunksize=16,
+                )
+                self._store_results(paths, results, stats)
+        else:
+            results = (_index_file(os.path.join(root, path)) for path in paths)
+            self._store_results(paths, results, stats)
+
+    def _store_results(
+        self,
+        paths: list[str],
+        results: Iterable[tuple[str | None, str | None, str | None, list]],
+        stats: UpdateStats,
+    ):
+        for path, (method, url, error, terms) in zip(paths, results):
+            self._db.execute(
+                "UPDATE files SET method = ?, url = ?, error = ? WHERE path = ?",
+                (method, url, error, path),
+            )
+            self._db.executemany(
+                "INSERT OR IGNORE INTO terms (kind, value, path) VALUES (?, ?, ?)",
+                [(kind, value, path) for kind, value in terms],
+            )
+            if error is not None:
+                stats.errors.append(path)
+
+
+def _iter_files(
+    root: str, patterns: tuple[str, ...], ignored: set[str]
+) -> Iterator[tuple[str, os.stat_result]]:
+    """Find matching files, skipping hidden files and directories"""
+    for dirpath, dirnames, filenames in os.walk(root):
+        dirnames[:] = sorted(name for name in dirnames if not name.startswith("."))
+        for name in sorted(filenames):
+            if name.startswith("."):
+                continue
+            if not any(fnmatch.fnmatch(name, pattern) for pattern in patterns):
+                continue
+            full_path = os.path.join(dirpath, name)
+            if os.path.abspath(full_path) in ignored:
+                continue
+            yield os.path.relpath(full_path, root), os.stat(full_path)
+
+
+def _index_file(
+    path: str,
+) -> tuple[str | None, str | None, str | None, list[tuple[str, str]]]:
+    """
+    Parse a Requestfile, and collect its searchable terms.
+
+    Returns (method, url, error, terms). Runs in worker processes.
+    """
+
+    try:
+        with open(path, encoding="utf-8") as fp:
+            requestfile = parse_requestfile(io.StringIO(fp.read()), filename=path)
+    except Exception as exc:
+        return None, None, f"{type(exc).__name__}: {exc}", []
+
+    analysis = analyze_requestfile(requestfile)
+    terms = {(TERM_INCLUDE, include) for include in analysis.includes}
+    terms.update((TERM_USES, name) for name in analysis.variables_used)
+    terms.update((TERM_DEFINES, name) for name in analysis.variables_defined)
+    terms.update((TERM_EXTRACTS, name) for name in analysis.variables_extracted)
+
+    for cmd in iter_commands(requestfile):
+        terms.add((TERM_COMMAND, cmd.name))
+        if cmd.name == "header" and cmd.arguments:
+            if (name := _get_literal(cmd.arguments[0])) is not None:
+                terms.add((TERM_HEADER, name.lower()))
+    for item in requestfile.headers:
+        if isinstance(item, Header):
+            terms.add((TERM_HEADER, item.name.lower()))
+
+    requestline = requestfile.requestline
+    return (
+        requestline.method.upper(),
+        _get_template(requestline.url_arg),
+        None,
+        sorted(terms),
+    )
+
+
+def _get_literal(arg: Argument) -> str | None:
+    if isinstance(arg.value, (Symbol, QuotedValue)) and not arg.filters:
+        return arg.value.value
+    return None
+
+
+def _get_template(arg: Argument) -> str:
+    """Textual form of an argument value, eg. for URL templates"""
+    match arg.value:
+        case Symbol(value) | QuotedValue(value) | Heredoc(_, value):
+            return value or ""
+        case Variable(name):
+            return f"${name}"
+        case IncludedFile(Variable(name)):
+            return f"<${name}"
+        case IncludedFile(path):
+            return f"<{path.value}"
+    return ""
@@ -1,6 +1,15 @@
 import click
+from .batch import cmd_batch
+from .download import cmd_download
+from .export import cmd_export
+from .har import cmd_import_har
+from .index import cmd_find, cmd_index
+from .load import cmd_load
+from .paginate import cmd_paginate
 from .parse import cmd_parse
+from .run import cmd_run
 from .send import cmd_send
+from .stream import cmd_stream
 
 
 @click.group()
@@ -10,3 +19,13 @@ def main():
 
 main.add_command(cmd_parse, name="parse")
 main.add_command(cmd_send, name="send")
+main.add_command(cmd_run, name="run")
+main.add_command(cmd_load, name="load")
+main.add_command(cmd_batch, name="batch")
+main.add_command(cmd_index, name="index")
+main.add_command(cmd_find, name="find")
+main.add_command(cmd_import_har, name="import-har")
+main.add_command(cmd_export, name="export")
+main.add_command(cmd_paginate, name="paginate")
+main.add_command(cmd_download, name="download")
+main.add_command(cmd_stream, name="stream")
@@ -0,0 +1,286 @@
+import itertools
+import sys
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from fnmatch import fnmatch
+
+import click
+from rich.console import Console
+from rich.text import Text
+
+from requestfile.builder import build_requests_parallel, expand_foreach
+from requestfile.ext.policy import HedgePolicy, RetryPolicy
+from requestfile.scheduler import BatchResult, SchedulerConfig, run_batch
+from requestfile.sink import BODY_DIGEST, BODY_MODES, ResultSink
+
+from .utils import get_timeout, load_requestfile, parse_variables
+
+
+@click.command(name="batch")
+@click.argument("inputfiles", type=click.File("r"), nargs=-1, required=True)
+@click.option("-a", "--arg", "arguments_list", multiple=True)
+@click.option("-e", "--env", "env_list", multiple=True)
+@click.option(
+    "-j",
+    "--jobs",
+    type=int,
+    default=8,
+    help="Maximum number of requests to send concurrently",
+)
+@click.option("--rate", type=float, default=None, help="Maximum requests per second")
+@click.option("--burst", type=int, default=1, help="Burst size for --rate")
+@click.option(
+    "--host-rate",
+    type=float,
+    default=None,
+    help="Maximum requests per second, to each host",
+)
+@click.option("--host-burst", type=int, default=1, help="Burst size for --host-rate")
+@click.option(
+    "--host-max-in-flight",
+    type=int,
+    default=None,
+    help="Maximum requests in flight to each host",
+)
+@click.option(
+    "--max-retries",
+    type=int,
+    default=3,
+    help="Times to retry requests getting a 429 or 503 response",
+)
+@click.option(
+    "--timeout",
+    type=float,
+    default=None,
+    help="Timeout for connecting and each read, in seconds",
+)
+@click.option(
+    "--connect-timeout",
+    type=float,
+    default=None,
+    help="Timeout for connecting, in seconds (default: --timeout)",
+)
+@click.option(
+    "--deadline",
+    type=float,
+    default=None,
+    help="Maximum time for each request, including retries, in seconds",
+)
+@click.option(
+    "--batch-deadline",
+    type=float,
+    default=None,
+    help="Maximum time for the whole batch, in seconds",
+)
+@click.option(
+    "--retries",
+    type=int,
+    default=0,
+    help="Times to retry idempotent requests, on errors or 502/504",
+)
+@click.option(
+    "--hedge",
+    is_flag=True,
+    default=False,
+    help="Send a duplicate of idempotent requests slower than usual",
+)
+@click.option(
+    "--hedge-percentile",
+    type=float,
+    default=95.0,
+    help="Latency percentile after which to hedge requests",
+)
+@click.option(
+    "-p",
+    "--priority",
+    "priorities",
+    multiple=True,
+    metavar="GLOB=N",
+    help="Priority for files matching GLOB; higher goes first (default: 0)",
+)
+@click.option(
+    "-o",
+    "--output",
+    "output_file",
+    type=click.Path(dir_okay=False),
+    default=None,
+    help="Append results to this file, as JSON lines (.gz to compress)",
+)
+@click.option(
+    "--output-header",
+    "output_headers",
+    multiple=True,
+    help="Response header to include in the output file",
+)
+@click.option(
+    "--output-body",
+    type=click.Choice(BODY_MODES),
+    default=BODY_DIGEST,
+    show_default=True,
+    help="How to include response bodies in the output file",
+)
+@click.option("-v", "--verbose", is_flag=True, default=False)
+def cmd_batch(
+    inputfiles,
+    arguments_list,
+    env_list,
+    jobs,
+    rate,
+    burst,
+    host_rate,
+    host_burst,
+    host_max_in_flight,
+    max_retries,
+    timeout,
+    connect_timeout,
+    deadline,
+    batch_deadline,
+    retries,
+    hedge,
+    hedge_percentile,
+    priorities,
+    output_file,
+    output_headers,
+    output_body,
+    verbose,
+):
+    """
+    Send many requests, honouring rate limits and priorities.
+    """
+
+    variables = parse_variables(arguments_list, env_list)
+    priority_rules = [_parse_priority(rule) for rule in priorities]
+
+    config = SchedulerConfig(
+        rate=rate,
+        burst=burst,
+        host_rate=host_rate,
+        host_burst=host_burst,
+        host_max_in_flight=host_max_in_flight,
+        max_workers=jobs,
+        max_retries=max_retries,
+        timeout=get_timeout(timeout, connect_timeout),
+        deadline=deadline,
+        batch_deadline=batch_deadline,
+        # 503 is left to the scheduler, which backs off the whole host
+        retry=RetryPolicy(max_attempts=retries + 1, statuses=(502, 504))
+        if retries
+        else None,
+        hedge=HedgePolicy(percentile=hedge_percentile) if hedge else None,
+    )
+
+    # Requestfiles using %FOREACH expand to many requests: these are
+    # expanded and built lazily, a few at a time, as the scheduler
+    # frees up.
+    def _iter_items():
+        # Only a few requests are queued at a time: higher priority
+        # files are read first, so they're not stuck behind the others.
+        for inputfile in sorted(
+            inputfiles, key=lambda f: -_get_priority(f.name, priority_rules)
+        ):
+            requestfile = load_requestfile(inputfile)
+            priority = _get_priority(inputfile.name, priority_rules)
+            for bindings in expand_foreach(requestfile, variables):
+                name = inputfile.name
+                if bindings:
+                    name = f"{name}[{', '.join(bindings.values())}]"
+                yield name, requestfile, {**variables, **bindings}, priority
+
+    def _iter_requests(executor):
+        for chunk in itertools.batched(_iter_items(), jobs * 4):
+            built = build_requests_parallel(
+                [(requestfile, item_vars) for _, requestfile, item_vars, _ in chunk],
+                executor=executor,
+            )
+            for (name, _, item_vars, priority), request in zip(chunk, built):
+                yield name, request, priority, item_vars
+
+    console = Console(highlight=False, markup=False, stderr=True)
+    sink = None
+    if output_file is not None:
+        sink = ResultSink(output_file, headers=output_headers, body=output_body)
+
+    failed = 0
+    lock = threading.Lock()
+
+    def _on_result(result: BatchResult):
+        nonlocal failed
+        if not result.ok:
+            with lock:
+                failed += 1
+        console.print(_format_result(result, verbose))
+        if sink is not None:
+            sink.write(
+                result.name,
+                request=result.request,
+                response=result.response,
+                error=result.error,
+                elapsed=result.elapsed,
+                variables=result.variables,
+                attempts=result.attempts,
+                waited=result.waited,
+            )
+
+    try:
+        with ThreadPoolExecutor(max_workers=jobs) as executor:
+            # Results are not kept: only failures are counted
+            run_batch(
+                _iter_requests(executor),
+                config=config,
+                on_result=_on_result,
+                max_pending=jobs * 4,
+                collect=False,
+            )
+    finally:
+        if sink is not None:
+            sink.close()
+
+    sys.exit(0 if failed == 0 else 1)
+
+
+def _parse_priority(rule: str) -> tuple[str, int]:
+    pattern, sep, value = rule.rpartition("=")
+    if not sep:
+        raise click.BadParameter(f"Expected GLOB=N, got: {rule}")
+    try:
+        return pattern, int(value)
+    except ValueError:
+        raise click.BadParameter(f"Priority must be an integer: {rule}")
+
+
+def _get_priority(name: str, rules: list[tuple[str, int]]) -> int:
+    for pattern, priority in rules:
+        if fnmatch(name, pattern):
+            return priority
+    return 0
+
+
+def _format_result(result: BatchResult, verbose: bool = False) -> Text:
+    text = Text()
+    if result.ok:
+        text.append("OK   ", style="bold green")
+    else:
+        text.append("FAIL ", style="bold red")
+
+    text.append(result.name)
+
+    if result.response is not None:
+        text.append(f" {result.response.status_code} {result.response.reason}")
+    if result.error is not None:
+        text.append(f" {type(result.error).__name__}: {result.error}")
+    text.append(f" ({result.elapsed * 1000:.0f} ms)", style="dim")
+
+    if verbose:
+        text.append(
+            f" attempts={result.attempts} waited={result.waited * 1000:.0f}ms",
+            style="dim",
+        )
+        outcome = result.outcome
+        if outcome is not None and (outcome.retries or outcome.hedged):
+            text.append(
+                f" retries={outcome.retries} hedged={outcome.hedged}"
+                f" hedge_won={outcome.hedge_won}",
+                style="dim",
+            )
+
+    return text
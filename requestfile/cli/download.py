@@ -0,0 +1,94 @@
+import click
+from rich.console import Console
+from rich.text import Text
+from urllib3.exceptions import HTTPError
+
+from requestfile.builder import build_request
+from requestfile.download import DownloadResult, download
+from requestfile.workflow import make_session
+
+from .utils import get_timeout, load_requestfile, parse_variables
+
+
+@click.command(name="download")
+@click.argument("inputfile", type=click.File("r"))
+@click.argument("output", type=click.Path(dir_okay=False))
+@click.option("-a", "--arg", "arguments_list", multiple=True)
+@click.option("-e", "--env", "env_list", multiple=True)
+@click.option(
+    "-c",
+    "--connections",
+    type=click.IntRange(min=1),
+    default=8,
+    show_default=True,
+    help="Ranges to fetch concurrently, if the server supports it",
+)
+@click.option(
+    "--retries",
+    type=click.IntRange(min=0),
+    default=3,
+    show_default=True,
+    help="Retries for each range, resuming where it stopped",
+)
+@click.option(
+    "--timeout",
+    type=float,
+    default=None,
+    help="Timeout for connecting and each read, in seconds",
+)
+@click.option(
+    "--connect-timeout",
+    type=float,
+    default=None,
+    help="Timeout for connecting, in seconds (default: --timeout)",
+)
+def cmd_download(
+    inputfile,
+    output,
+    arguments_list,
+    env_list,
+    connections,
+    retries,
+    timeout,
+    connect_timeout,
+):
+    """
+    Send a request, and download the response body to a file.
+
+    Large responses are fetched as concurrent byte ranges, if the
+    server supports it. Interrupted downloads are resumed when running
+    the same command again.
+    """
+
+    variables = parse_variables(arguments_list, env_list)
+    request = build_request(load_requestfile(inputfile), variables=variables)
+
+    console = Console(highlight=False, markup=False, stderr=True)
+    try:
+        result = download(
+            request,
+            output,
+            session=make_session(connections),
+            parts=connections,
+            retries=retries,
+            timeout=get_timeout(timeout, connect_timeout),
+        )
+    except (OSError, HTTPError, ValueError) as exc:
+        raise click.ClickException(f"{exc} (run again to resume)")
+
+    console.print(_format_result(result))
+
+
+def _format_result(result: DownloadResult) -> Text:
+    text = Text()
+    text.append("OK   ", style="bold green")
+    text.append(f"{result.path} ({result.size} bytes")
+    if result.parts:
+        text.append(f", {result.parts} ranges")
+    else:
+        text.append(", ranges not supported")
+    if result.resumed:
+        text.append(f", resumed at {result.resumed} bytes")
+    text.append(")")
+    text.append(f" ({result.elapsed * 1000:.0f} ms)", style="dim")
+    return text
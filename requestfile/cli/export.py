@@ -0,0 +1,118 @@
+import json
+import os
+import sys
+
+import click
+from rich.console import Console
+from rich.text import Text
+
+from requestfile.export import (
+    DEFAULT_INLINE_LIMIT,
+    FORMAT_HAR,
+    FORMATS,
+    CurlWriter,
+    HarWriter,
+    export_requestfiles,
+)
+
+from .utils import parse_variables
+
+
+@click.command(name="export")
+@click.argument(
+    "inputfiles", type=click.Path(exists=True, dir_okay=False), nargs=-1, required=True
+)
+@click.option("-a", "--arg", "arguments_list", multiple=True)
+@click.option("-e", "--env", "env_list", multiple=True)
+@click.option(
+    "--vars",
+    "vars_files",
+    type=click.File("r"),
+    multiple=True,
+    help="JSON file with a set of variables; export each request once per set",
+)
+@click.option(
+    "-f",
+    "--format",
+    "output_format",
+    type=click.Choice(FORMATS),
+    default=FORMAT_HAR,
+    show_default=True,
+)
+@click.option(
+    "-o",
+    "--output",
+    "output_file",
+    type=click.Path(dir_okay=False, allow_dash=True),
+    default="-",
+    help="Output file (default: standard output)",
+)
+@click.option(
+    "--body-dir",
+    type=click.Path(file_okay=False),
+    default=None,
+    help="Directory for bodies too large to inline (default: OUTPUT.bodies)",
+)
+@click.option(
+    "--inline-limit",
+    type=click.IntRange(min=0),
+    default=DEFAULT_INLINE_LIMIT,
+    show_default=True,
+    help="Write bodies larger than this (in bytes) to separate files",
+)
+@click.option(
+    "-j",
+    "--jobs",
+    type=click.IntRange(min=1),
+    default=os.cpu_count() or 1,
+    help="Number of processes used to build requests",
+)
+def cmd_export(
+    inputfiles,
+    arguments_list,
+    env_list,
+    vars_files,
+    output_format,
+    output_file,
+    body_dir,
+    inline_limit,
+    jobs,
+):
+    """
+    Export requests as a HAR document, or as a curl script.
+
+    Requests are written as they're built, so the output can be
+    arbitrarily large.
+    """
+
+    variables = parse_variables(arguments_list, env_list)
+    variable_sets = [{**variables, **json.load(fp)} for fp in vars_files]
+
+    if output_file == "-":
+        base_dir = os.getcwd()
+        body_dir = body_dir or "export.bodies"
+    else:
+        base_dir = os.path.dirname(os.path.abspath(output_file))
+        body_dir = body_dir or f"{output_file}.bodies"
+
+    writer_class = HarWriter if output_format == FORMAT_HAR else CurlWriter
+    with click.open_file(output_file, "w", encoding="utf-8") as stream:
+        with writer_class(stream) as writer:
+            try:
+                count = export_requestfiles(
+                    inputfiles,
+                    writer,
+                    variable_sets=variable_sets or [variables],
+                    body_dir=body_dir,
+                    base_dir=base_dir,
+                    inline_limit=inline_limit,
+                    max_workers=jobs,
+                )
+            except ValueError as exc:
+                raise click.ClickException(str(exc)) from exc
+
+    console = Console(highlight=False, markup=False, stderr=True)
+    console.print(Text("Exported: ", style="bold").append(f"{count} requests"))
+    if output_file != "-" and output_format != FORMAT_HAR:
+        os.chmod(output_file, 0o755)
+    sys.exit(0)
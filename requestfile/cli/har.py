@@ -0,0 +1,37 @@
+import click
+from rich.console import Console
+from rich.text import Text
+
+from requestfile.har import DEFAULT_INLINE_LIMIT, import_har
+
+
+@click.command(name="import-har")
+@click.argument("harfile", type=click.File("r", encoding="utf-8"))
+@click.argument("output_dir", type=click.Path(file_okay=False))
+@click.option(
+    "--inline-limit",
+    type=click.IntRange(min=0),
+    default=DEFAULT_INLINE_LIMIT,
+    show_default=True,
+    help="Write bodies larger than this (in bytes) to separate files",
+)
+@click.option("-v", "--verbose", is_flag=True, default=False)
+def cmd_import_har(harfile, output_dir, inline_limit, verbose):
+    """
+    Convert each request in a HAR file to a Requestfile.
+
+    The HAR file is read incrementally, so captures of any size can
+    be converted.
+    """
+
+    console = Console(highlight=False, markup=False, stderr=True)
+    count = 0
+    try:
+        for path in import_har(harfile, output_dir, inline_limit=inline_limit):
+            count += 1
+            if verbose:
+                click.echo(path)
+    except (ValueError, KeyError) as exc:
+        raise click.ClickException(f"Invalid HAR file: {exc!r}") from exc
+
+    console.print(Text("Imported: ", style="bold").append(f"{count} requests"))
@@ -0,0 +1,127 @@
+import os
+import sys
+
+import click
+from rich.console import Console
+from rich.text import Text
+
+from requestfile.catalog import INDEX_FILENAME, Catalog
+
+
+@click.command(name="index")
+@click.argument("directory", type=click.Path(exists=True, file_okay=False), default=".")
+@click.option(
+    "--index",
+    "index_file",
+    type=click.Path(dir_okay=False),
+    default=None,
+    help=f"Index file (default: {INDEX_FILENAME} in DIRECTORY)",
+)
+@click.option(
+    "-p",
+    "--pattern",
+    "patterns",
+    multiple=True,
+    default=["*"],
+    help="Only index files whose name matches this glob",
+)
+@click.option(
+    "-j",
+    "--jobs",
+    type=click.IntRange(min=1),
+    default=os.cpu_count() or 1,
+    help="Number of processes used to parse changed files",
+)
+def cmd_index(directory, index_file, patterns, jobs):
+    """
+    Index Requestfiles in a directory, for use with "find".
+
+    Only new or changed files are parsed.
+    """
+
+    console = Console(highlight=False, markup=False, stderr=True)
+    with Catalog(index_file or os.path.join(directory, INDEX_FILENAME)) as catalog:
+        stats = catalog.update(directory, patterns=patterns, max_workers=jobs)
+        total = len(catalog)
+
+    console.print(
+        Text("Indexed: ", style="bold").append(
+            f"{total} files ({stats.added} added, {stats.updated} updated, "
+            f"{stats.removed} removed, {stats.unchanged} unchanged)"
+        )
+    )
+    for path in stats.errors:
+        console.print(Text("Failed to parse: ", style="bold red").append(path))
+
+
+@click.command(name="find")
+@click.argument("directory", type=click.Path(exists=True, file_okay=False), default=".")
+@click.option(
+    "--index",
+    "index_file",
+    type=click.Path(dir_okay=False, exists=True),
+    default=None,
+    help=f"Index file (default: {INDEX_FILENAME} in DIRECTORY)",
+)
+@click.option("-m", "--method", default=None, help="HTTP method")
+@click.option("-u", "--url", default=None, help="Glob matching the URL, as written")
+@click.option("-H", "--header", default=None, help="Name of a header being set")
+@click.option("-c", "--command", default=None, help="Name of a %COMMAND used")
+@click.option("--uses", default=None, help="Name of a variable referenced")
+@click.option("--defines", default=None, help="Name of a variable set")
+@click.option("--extracts", default=None, help="Name of a variable extracted")
+@click.option("--includes", default=None, help="Glob matching an included path")
+@click.option(
+    "--errors",
+    is_flag=True,
+    default=False,
+    help="Find files that failed to parse instead",
+)
+@click.option("-v", "--verbose", is_flag=True, default=False)
+def cmd_find(
+    directory,
+    index_file,
+    method,
+    url,
+    header,
+    command,
+    uses,
+    defines,
+    extracts,
+    includes,
+    errors,
+    verbose,
+):
+    """
+    Find indexed Requestfiles matching all the given criteria.
+
+    Run "index" first to create or update the index.
+    """
+
+    index_file = index_file or os.path.join(directory, INDEX_FILENAME)
+    if not os.path.exists(index_file):
+        raise click.ClickException(f"Index not found: {index_file}")
+
+    with Catalog(index_file) as catalog:
+        entries = catalog.find(
+            method=method,
+            url=url,
+            header=header,
+            command=command,
+            uses=uses,
+            defines=defines,
+            extracts=extracts,
+            include=includes,
+            errors=errors,
+        )
+
+    for entry in entries:
+        path = os.path.normpath(os.path.join(directory, entry.path))
+        if entry.error is not None and verbose:
+            click.echo(f"{path}\t{entry.error.splitlines()[0]}")
+        elif verbose:
+            click.echo(f"{path}\t{entry.method} {entry.url}")
+        else:
+            click.echo(path)
+
+    sys.exit(0 if entries else 1)
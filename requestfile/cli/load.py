@@ -0,0 +1,179 @@
+import sys
+
+import click
+from rich.console import Console
+from rich.text import Text
+
+from requestfile.builder import build_request
+from requestfile.loadgen import LoadStats, run_load, run_load_processes
+
+from .utils import load_requestfile, parse_variables
+
+PERCENTILES = (50, 90, 99, 99.9)
+
+# Warn if more than this fraction of requests were sent late
+LATE_WARNING_RATIO = 0.01
+
+
+@click.command(name="load")
+@click.argument("inputfile", type=click.File("r"))
+@click.option("-a", "--arg", "arguments_list", multiple=True)
+@click.option("-e", "--env", "env_list", multiple=True)
+@click.option(
+    "-r",
+    "--rate",
+    type=float,
+    required=True,
+    help="Requests to send per second",
+)
+@click.option(
+    "-d",
+    "--duration",
+    type=click.FloatRange(min=0, min_open=True),
+    default=10.0,
+    help="Duration of the run, in seconds",
+)
+@click.option(
+    "--ramp-to",
+    "end_rate",
+    type=float,
+    default=None,
+    help="Ramp the rate linearly up (or down) to this, over the run",
+)
+@click.option(
+    "--max-in-flight",
+    type=int,
+    default=10_000,
+    help="Don't send more requests while this many are pending",
+)
+@click.option(
+    "--timeout",
+    type=float,
+    default=30.0,
+    help="Timeout for each request, in seconds",
+)
+@click.option(
+    "--interval",
+    type=float,
+    default=1.0,
+    help="Report progress every this many seconds",
+)
+@click.option(
+    "-P",
+    "--processes",
+    type=click.IntRange(min=1),
+    default=1,
+    help="Number of processes to generate load from",
+)
+def cmd_load(
+    inputfile,
+    arguments_list,
+    env_list,
+    rate,
+    duration,
+    end_rate,
+    max_in_flight,
+    timeout,
+    interval,
+    processes,
+):
+    """
+    Send a request at a constant (or ramping) rate, and report latency.
+
+    Latency is measured from when each request was scheduled to be
+    sent, even if the generator was late sending it.
+    """
+
+    variables = parse_variables(arguments_list, env_list)
+    requestfile = load_requestfile(inputfile)
+    console = Console(highlight=False, markup=False, stderr=True)
+
+    load_kwargs = dict(
+        end_rate=end_rate,
+        max_in_flight=max_in_flight,
+        timeout=timeout,
+        interval=interval,
+        on_interval=lambda stats: console.print(format_interval(stats)),
+    )
+
+    if processes > 1:
+        stats = run_load_processes(
+            requestfile,
+            processes,
+            rate,
+            duration,
+            variables=variables,
+            **load_kwargs,
+        )
+    else:
+        request = build_request(requestfile, variables=variables)
+        stats = run_load(request, rate, duration, **load_kwargs)
+
+    console.rule()
+    print_summary(console, stats)
+    sys.exit(0 if stats.failed == 0 and stats.dropped == 0 else 1)
+
+
+def format_interval(stats: LoadStats) -> Text:
+    latency = stats.latency
+    text = Text()
+    text.append(f"{stats.elapsed:7.1f}s", style="bold")
+    text.append(f"  sent {stats.sent:6d}  done {stats.completed:6d}")
+    text.append(f"  fail {stats.failed:4d}", style="red" if stats.failed else "")
+    text.append(
+        f"  p50 {_ms(latency.percentile(50))}"
+        f"  p99 {_ms(latency.percentile(99))}"
+        f"  max {_ms(latency.max or 0)}"
+    )
+    if stats.late or stats.dropped:
+        text.append(
+            f"  late {stats.late} dropped {stats.dropped}",
+            style="bold yellow",
+        )
+    return text
+
+
+def print_summary(console: Console, stats: LoadStats):
+    latency = stats.latency
+
+    console.print(
+        Text("Requests: ", style="bold").append(
+            f"{stats.sent} sent, {stats.completed} completed, {stats.failed} failed"
+        )
+    )
+    if stats.elapsed:
+        console.print(
+            Text("Throughput: ", style="bold").append(
+                f"{stats.completed / stats.elapsed:.1f} req/s"
+            )
+        )
+
+    for status, count in sorted(stats.statuses.items()):
+        console.print(Text(f"  {status}: ", style="bold").append(str(count)))
+    for error, count in sorted(stats.errors.items()):
+        console.print(Text(f"  {error}: ", style="bold red").append(str(count)))
+
+    console.print(
+        Text("Latency: ", style="bold").append(
+            f"min {_ms(latency.min or 0)}  mean {_ms(latency.mean)}  "
+            + "  ".join(f"p{p:g} {_ms(latency.percentile(p))}" for p in PERCENTILES)
+            + f"  max {_ms(latency.max or 0)}"
+        )
+    )
+
+    if stats.late or stats.dropped:
+        console.print(
+            Text("Generator: ", style="bold").append(
+                f"{stats.late} requests sent late "
+                f"(max lag {stats.max_lag * 1000:.1f}ms), {stats.dropped} dropped"
+            )
+        )
+    if stats.dropped or stats.late > stats.sent * LATE_WARNING_RATIO:
+        console.print(
+            "Warning: the generator could not keep up with the target rate",
+            style="bold yellow",
+        )
+
+
+def _ms(microseconds: float) -> str:
+    return f"{microseconds / 1000:.1f}ms"
@@ -0,0 +1,173 @@
+import sys
+from functools import partial
+
+import click
+from rich.console import Console
+from rich.text import Text
+
+from requestfile.builder import build_request
+from requestfile.ext.requests import send as send_request
+from requestfile.pagination import Page, paginate, parse_pagination_rule
+from requestfile.sink import BODY_FULL, BODY_MODES, ResultSink
+from requestfile.workflow import make_session
+
+from .utils import get_timeout, load_requestfile, parse_variables
+
+
+@click.command(name="paginate")
+@click.argument("inputfile", type=click.File("r"))
+@click.option("-a", "--arg", "arguments_list", multiple=True)
+@click.option("-e", "--env", "env_list", multiple=True)
+@click.option(
+    "-r",
+    "--rule",
+    required=True,
+    help=(
+        "How to find the next page: link, next:JSONPATH, cursor:PARAM=JSONPATH, "
+        "page:PARAM[=START] or offset:PARAM=SIZE[,START]"
+    ),
+)
+@click.option(
+    "--items",
+    default=None,
+    help="JSON path of the items in each page; an empty page ends the collection",
+)
+@click.option(
+    "--max-pages",
+    type=click.IntRange(min=1),
+    default=None,
+    help="Stop after this many pages",
+)
+@click.option(
+    "--prefetch",
+    type=click.IntRange(min=1),
+    default=4,
+    show_default=True,
+    help="Pages to fetch concurrently, for page numbers and offsets",
+)
+@click.option(
+    "--timeout",
+    type=float,
+    default=None,
+    help="Timeout for connecting and each read, in seconds",
+)
+@click.option(
+    "--connect-timeout",
+    type=float,
+    default=None,
+    help="Timeout for connecting, in seconds (default: --timeout)",
+)
+@click.option(
+    "-o",
+    "--output",
+    "output_file",
+    type=click.Path(dir_okay=False),
+    default=None,
+    help="Append pages to this file, as JSON lines (default: print bodies)",
+)
+@click.option(
+    "--output-header",
+    "output_headers",
+    multiple=True,
+    help="Response header to include in the output file",
+)
+@click.option(
+    "--output-body",
+    type=click.Choice(BODY_MODES),
+    default=BODY_FULL,
+    show_default=True,
+    help="How to include response bodies in the output file",
+)
+@click.option("-v", "--verbose", is_flag=True, default=False)
+def cmd_paginate(
+    inputfile,
+    arguments_list,
+    env_list,
+    rule,
+    items,
+    max_pages,
+    prefetch,
+    timeout,
+    connect_timeout,
+    output_file,
+    output_headers,
+    output_body,
+    verbose,
+):
+    """
+    Send a request, and follow pagination to fetch all the pages.
+
+    Pages are printed, or written to the output file, as they arrive.
+    """
+
+    try:
+        pagination_rule = parse_pagination_rule(rule, items=items)
+    except ValueError as exc:
+        raise click.BadParameter(str(exc), param_hint="--rule")
+
+    variables = parse_variables(arguments_list, env_list)
+    request = build_request(load_requestfile(inputfile), variables=variables)
+
+    send = partial(
+        send_request,
+        session=make_session(prefetch),
+        timeout=get_timeout(timeout, connect_timeout),
+    )
+
+    console = Console(highlight=False, markup=False, stderr=True)
+    sink = None
+    if output_file is not None:
+        sink = ResultSink(output_file, headers=output_headers, body=output_body)
+
+    ok = True
+    try:
+        for page in paginate(
+            request, pagination_rule, send, max_pages=max_pages, prefetch=prefetch
+        ):
+            ok = page.ok
+            if verbose or not ok:
+                console.print(_format_page(page))
+            if sink is not None:
+                extra = {}
+                if page.response is not None:
+                    # Including the query string, which differs by page
+                    extra["url"] = page.response.url
+                sink.write(
+                    inputfile.name,
+                    request=page.request,
+                    response=page.response,
+                    error=page.error,
+                    elapsed=page.elapsed,
+                    variables=variables,
+                    page=page.number,
+                    **extra,
+                )
+            elif page.response is not None:
+                sys.stdout.write(page.response.text)
+                if not page.response.text.endswith("\n"):
+                    sys.stdout.write("\n")
+                sys.stdout.flush()
+    except ValueError as exc:
+        raise click.ClickException(str(exc))
+    finally:
+        if sink is not None:
+            sink.close()
+
+    sys.exit(0 if ok else 1)
+
+
+def _format_page(page: Page) -> Text:
+    text = Text()
+    if page.ok:
+        text.append("OK   ", style="bold green")
+    else:
+        text.append("FAIL ", style="bold red")
+
+    text.append(f"page {page.number}")
+    if page.response is not None:
+        text.append(f" {page.response.url}")
+        text.append(f" {page.response.status_code} {page.response.reason}")
+    if page.error is not None:
+        text.append(f" {type(page.error).__name__}: {page.error}")
+    text.append(f" ({page.elapsed * 1000:.0f} ms)", style="dim")
+    return text
@@ -0,0 +1,156 @@
+import sys
+from functools import partial
+
+import click
+from rich.console import Console
+from rich.text import Text
+
+from requestfile.ext.cassette import MODE_RECORD, MODE_REPLAY, Cassette
+from requestfile.sink import BODY_DIGEST, BODY_MODES, ResultSink
+from requestfile.workflow import StepResult, make_session, run_workflow
+
+from .utils import load_requestfile, parse_variables
+
+
+@click.command(name="run")
+@click.argument("inputfiles", type=click.File("r"), nargs=-1, required=True)
+@click.option("-a", "--arg", "arguments_list", multiple=True)
+@click.option("-e", "--env", "env_list", multiple=True)
+@click.option(
+    "-j",
+    "--jobs",
+    type=int,
+    default=8,
+    help="Maximum number of requests to send concurrently",
+)
+@click.option(
+    "--record",
+    "record_file",
+    type=click.Path(dir_okay=False),
+    default=None,
+    help="Record responses to a cassette file",
+)
+@click.option(
+    "--replay",
+    "replay_file",
+    type=click.Path(dir_okay=False, exists=True),
+    default=None,
+    help="Serve responses from a cassette file, without sending requests",
+)
+@click.option(
+    "--ignore-header",
+    "ignore_headers",
+    multiple=True,
+    help="Header to ignore when matching requests in the cassette",
+)
+@click.option(
+    "-o",
+    "--output",
+    "output_file",
+    type=click.Path(dir_okay=False),
+    default=None,
+    help="Append results to this file, as JSON lines (.gz to compress)",
+)
+@click.option(
+    "--output-header",
+    "output_headers",
+    multiple=True,
+    help="Response header to include in the output file",
+)
+@click.option(
+    "--output-body",
+    type=click.Choice(BODY_MODES),
+    default=BODY_DIGEST,
+    show_default=True,
+    help="How to include response bodies in the output file",
+)
+@click.option("-v", "--verbose", is_flag=True, default=False)
+def cmd_run(
+    inputfiles,
+    arguments_list,
+    env_list,
+    jobs,
+    record_file,
+    replay_file,
+    ignore_headers,
+    output_file,
+    output_headers,
+    output_body,
+    verbose,
+):
+    """
+    Run multiple requests, passing extracted values between them.
+    """
+
+    variables = parse_variables(arguments_list, env_list)
+    requestfiles = {
+        inputfile.name: load_requestfile(inputfile) for inputfile in inputfiles
+    }
+
+    if record_file is not None and replay_file is not None:
+        raise click.UsageError("--record and --replay are mutually exclusive")
+
+    send = None
+    if record_file is not None:
+        cassette = Cassette(record_file, MODE_RECORD, ignore_headers=ignore_headers)
+        session = make_session(jobs)
+        send = partial(cassette.send, session=session)
+    elif replay_file is not None:
+        cassette = Cassette(replay_file, MODE_REPLAY, ignore_headers=ignore_headers)
+        send = cassette.send
+
+    console = Console(highlight=False, markup=False, stderr=True)
+    sink = None
+    if output_file is not None:
+        sink = ResultSink(output_file, headers=output_headers, body=output_body)
+
+    def _print_result(result: StepResult):
+        console.print(_format_result(result))
+        if verbose:
+            for key, value in result.extracted.items():
+                console.print(Text(f"    {key}: ", style="bold").append(value))
+        if sink is not None and not result.skipped:
+            sink.write(
+                result.step.name,
+                request=result.request,
+                response=result.response,
+                error=result.error,
+                elapsed=result.elapsed,
+                variables=variables,
+                extracted=result.extracted,
+            )
+
+    try:
+        results = run_workflow(
+            requestfiles,
+            variables=variables,
+            max_workers=jobs,
+            send=send,
+            on_result=_print_result,
+        )
+    finally:
+        if sink is not None:
+            sink.close()
+
+    sys.exit(0 if all(result.ok for result in results) else 1)
+
+
+def _format_result(result: StepResult) -> Text:
+    text = Text()
+    if result.ok:
+        text.append("OK   ", style="bold green")
+    elif result.skipped:
+        text.append("SKIP ", style="bold yellow")
+    else:
+        text.append("FAIL ", style="bold red")
+
+    text.append(result.step.name)
+
+    if result.response is not None:
+        text.append(f" {result.response.status_code} {result.response.reason}")
+    if result.error is not None:
+        text.append(f" {type(result.error).__name__}: {result.error}")
+    if not result.skipped:
+        text.append(f" ({result.elapsed * 1000:.0f} ms)", style="dim")
+
+    return text
@@ -1,20 +1,33 @@
-import os
 import sys
+import time
 
 import click
 from rich.console import Console
+from rich.progress import (
+    BarColumn,
+    DownloadColumn,
+    Progress,
+    TransferSpeedColumn,
+)
 from rich.text import Text
 
 from requestfile.builder import build_request
+from requestfile.ext.cache import HttpCache, send_cached
+from requestfile.ext.cassette import MODE_RECORD, MODE_REPLAY, Cassette
+from requestfile.ext.policy import HedgePolicy, RetryPolicy, send_with_policy
 from requestfile.ext.requests import (
     build_requests_request,
     dump_request_text,
-    dump_response,
+    dump_response_head,
     dump_response_text,
     send,
+    write_response_body,
 )
-from requestfile.parser import parse_requestfile
 from requestfile.printing import print_requestfile
+from requestfile.watch import RequestfileWatcher
+from requestfile.workflow import make_session
+
+from .utils import get_timeout, load_requestfile, parse_variables
 
 
 @click.command(name="send")
@@ -23,32 +36,148 @@ from requestfile.printing import print_requestfile
 @click.option("-i", "--show-headers", is_flag=True, default=False)
 @click.option("-a", "--arg", "arguments_list", multiple=True)
 @click.option("-e", "--env", "env_list", multiple=True)
-def cmd_send(inputfile, verbose, show_headers, arguments_list, env_list):
-    variables = {}
-
-    for argspec in arguments_list:
-        key, value = argspec.split("=", 1)
-        variables[key] = value
-
-    for envspec in env_list:
-        parts = envspec.split(":", 1)
-        match parts:
-            case (key, envname):
-                variables[key] = os.environ[envname]
-            case (envname,):
-                variables[envname] = os.environ[envname]
-            case _:
-                raise ValueError(f"Bad env spec: {envspec}")
-
+@click.option(
+    "-o",
+    "--output",
+    type=click.File("wb"),
+    default=None,
+    help="Write the response body to a file, instead of stdout",
+)
+@click.option(
+    "--progress/--no-progress",
+    default=None,
+    help="Show download progress (default: when writing to a file)",
+)
+@click.option(
+    "--cache",
+    "cache_dir",
+    type=click.Path(file_okay=False),
+    default=None,
+    help="Cache responses in this directory, using conditional requests",
+)
+@click.option(
+    "--cache-max-size",
+    type=int,
+    default=256 * 1024 * 1024,
+    help="Maximum total size of cached responses, in bytes",
+)
+@click.option(
+    "--record",
+    "record_file",
+    type=click.Path(dir_okay=False),
+    default=None,
+    help="Record the response to a cassette file",
+)
+@click.option(
+    "--replay",
+    "replay_file",
+    type=click.Path(dir_okay=False, exists=True),
+    default=None,
+    help="Serve the response from a cassette file, without sending the request",
+)
+@click.option(
+    "--ignore-header",
+    "ignore_headers",
+    multiple=True,
+    help="Header to ignore when matching requests in the cache or cassette",
+)
+@click.option(
+    "--timeout",
+    type=float,
+    default=None,
+    help="Timeout for connecting and each read, in seconds",
+)
+@click.option(
+    "--connect-timeout",
+    type=float,
+    default=None,
+    help="Timeout for connecting, in seconds (default: --timeout)",
+)
+@click.option(
+    "--deadline",
+    type=float,
+    default=None,
+    help="Maximum time for the request, including retries, in seconds",
+)
+@click.option(
+    "--retries",
+    type=int,
+    default=0,
+    help="Times to retry idempotent requests, on errors or 502/503/504",
+)
+@click.option(
+    "--hedge-after",
+    type=float,
+    default=None,
+    help="Send a duplicate idempotent request, if no response after this",
+)
+@click.option(
+    "-w",
+    "--watch",
+    is_flag=True,
+    default=False,
+    help="Send the request again whenever the file, or its includes, change",
+)
+@click.option(
+    "--watch-interval",
+    type=float,
+    default=0.2,
+    help="How often to check for changes, in seconds",
+)
+def cmd_send(
+    inputfile,
+    verbose,
+    show_headers,
+    arguments_list,
+    env_list,
+    output,
+    progress,
+    cache_dir,
+    cache_max_size,
+    record_file,
+    replay_file,
+    ignore_headers,
+    timeout,
+    connect_timeout,
+    deadline,
+    retries,
+    hedge_after,
+    watch,
+    watch_interval,
+):
+    variables = parse_variables(arguments_list, env_list)
     console = Console(highlight=False, markup=False)
 
-    filename = inputfile.name
-    if filename == "<stdin>":
-        filename = None
-    else:
-        filename = os.path.abspath(filename)
+    if watch:
+        if inputfile.name == "<stdin>":
+            raise click.UsageError("--watch needs a file, not stdin")
+        for flag, value in (
+            ("--output", output),
+            ("--progress", progress),
+            ("--cache", cache_dir),
+            ("--record", record_file),
+            ("--replay", replay_file),
+        ):
+            if value:
+                raise click.UsageError(f"{flag} can't be used with --watch")
+        _watch_and_send(
+            console,
+            RequestfileWatcher(
+                inputfile.name, interval=watch_interval, variables=variables
+            ),
+            variables=variables,
+            timeout=get_timeout(timeout, connect_timeout),
+            deadline=deadline,
+            retry=RetryPolicy(max_attempts=retries + 1) if retries else None,
+            hedge=HedgePolicy(initial_delay=hedge_after)
+            if hedge_after is not None
+            else None,
+            verbose=verbose,
+            show_headers=show_headers,
+        )
+        return
 
-    requestfile = parse_requestfile(inputfile, filename=filename)
+    requestfile = load_requestfile(inputfile)
 
     if verbose and len(variables):
         console.rule("Variables")
@@ -61,7 +190,8 @@ def cmd_send(inputfile, verbose, show_headers, arguments_list, env_list):
         console.rule("Requestfile")
         print_requestfile(requestfile)
 
-    request_info = build_request(requestfile, variables=variables)
+    # The verbose dump shows the whole body: don't stream it
+    request_info = build_request(requestfile, variables=variables, stream=not verbose)
 
     if verbose:
         console.rule("Generic request")
@@ -72,14 +202,153 @@ def cmd_send(inputfile, verbose, show_headers, arguments_list, env_list):
         console.rule("Request")
         console.print(dump_request_text(request))
 
-    response = send(request)
+    if record_file is not None and replay_file is not None:
+        raise click.UsageError("--record and --replay are mutually exclusive")
+
+    cache = None
+    if cache_dir is not None:
+        cache = HttpCache(
+            cache_dir, max_bytes=cache_max_size, ignore_headers=ignore_headers
+        )
+
+    cassette = None
+    if record_file is not None:
+        cassette = Cassette(record_file, MODE_RECORD, ignore_headers=ignore_headers)
+    elif replay_file is not None:
+        cassette = Cassette(replay_file, MODE_REPLAY, ignore_headers=ignore_headers)
+
+    use_policy = (
+        timeout is not None
+        or connect_timeout is not None
+        or deadline is not None
+        or retries > 0
+        or hedge_after is not None
+    )
+
+    def _send_with_policy(request_info, stream: bool = False):
+        return send_with_policy(
+            request_info,
+            timeout=get_timeout(timeout, connect_timeout),
+            deadline=deadline,
+            retry=RetryPolicy(max_attempts=retries + 1) if retries else None,
+            hedge=HedgePolicy(initial_delay=hedge_after)
+            if hedge_after is not None
+            else None,
+            stream=stream,
+        )
+
+    # Used by the cache and cassette, when they need to send the request
+    send_func = _send_with_policy if use_policy else None
+
+    def _send(stream: bool):
+        if cassette is not None:
+            try:
+                return cassette.send(request_info, send=send_func)
+            except KeyError as exc:
+                raise click.ClickException(exc.args[0])
+        if cache is not None:
+            return send_cached(request_info, cache, send=send_func)
+        if use_policy:
+            return _send_with_policy(request_info, stream=stream)
+        return send(request, stream=stream)
+
     if verbose:
+        response = _send(stream=False)
         console.rule("Response")
         console.print(dump_response_text(response))
+        if (outcome := getattr(response, "outcome", None)) is not None:
+            console.rule("Outcome")
+            console.print(outcome)
         console.rule()
-    elif show_headers:
-        print(dump_response(response))
+        sys.exit(0 if response.ok else 1)
+
+    response = _send(stream=True)
+
+    if show_headers:
+        sys.stdout.buffer.write(dump_response_head(response))
+        sys.stdout.buffer.flush()
+
+    if progress is None:
+        progress = output is not None and sys.stderr.isatty()
+
+    output_stream = output if output is not None else sys.stdout.buffer
+    if progress:
+        _write_with_progress(response, output_stream)
     else:
-        print(response.text)
+        write_response_body(response, output_stream)
 
     sys.exit(0 if response.ok else 1)
+
+
+def _watch_and_send(
+    console: Console,
+    watcher: RequestfileWatcher,
+    variables: dict[str, str],
+    timeout,
+    deadline: float | None,
+    retry: RetryPolicy | None,
+    hedge: HedgePolicy | None,
+    verbose: bool,
+    show_headers: bool,
+):
+    # Keep connections open across changes
+    session = make_session(1)
+
+    while True:
+        console.rule(f"{time.strftime('%H:%M:%S')} {watcher.path}")
+        try:
+            if watcher.error is not None:
+                raise watcher.error
+            request = build_request(
+                watcher.requestfile,
+                variables=variables,
+                resource_loader=watcher.get_resource_loader(),
+                prefetch=False,
+                stream=not verbose,
+            )
+            if verbose:
+                console.print(dump_request_text(build_requests_request(request)))
+            start = time.monotonic()
+            response = send_with_policy(
+                request,
+                session=session,
+                timeout=timeout,
+                deadline=deadline,
+                retry=retry,
+                hedge=hedge,
+                stream=not verbose,
+            )
+            elapsed = time.monotonic() - start
+            if verbose:
+                console.print(dump_response_text(response))
+            else:
+                if show_headers:
+                    sys.stdout.buffer.write(dump_response_head(response))
+                write_response_body(response, sys.stdout.buffer)
+        except Exception as exc:
+            console.print(f"{type(exc).__name__}: {exc}", style="bold red")
+        else:
+            console.print(
+                Text(f"{response.status_code} {response.reason}", style="bold").append(
+                    f" ({elapsed * 1000:.0f} ms)", style="dim"
+                ),
+            )
+
+        try:
+            watcher.wait()
+        except KeyboardInterrupt:
+            return
+
+
+def _write_with_progress(response, output_stream):
+    content_length = response.headers.get("Content-Length")
+    total = int(content_length) if content_length is not None else None
+
+    columns = (BarColumn(), DownloadColumn(), TransferSpeedColumn())
+    with Progress(*columns, console=Console(stderr=True)) as progress:
+        task = progress.add_task("download", total=total)
+        write_response_body(
+            response,
+            output_stream,
+            on_progress=lambda size: progress.advance(task, size),
+        )
@@ -0,0 +1,181 @@
+import json
+import sys
+from functools import partial
+
+import click
+from rich.console import Console
+from rich.text import Text
+from urllib3.exceptions import HTTPError
+
+from requestfile.builder import build_request
+from requestfile.eventstream import (
+    DEFAULT_RECONNECT_DELAY,
+    STREAM_AUTO,
+    STREAM_MODES,
+    StreamEvent,
+    StreamTimeout,
+    iter_events,
+)
+from requestfile.ext.requests import send as send_request
+from requestfile.workflow import make_session
+
+from .utils import load_requestfile, parse_variables
+
+# Print the data of each event
+FORMAT_DATA = "data"
+
+# Print each event as a JSON object, one per line
+FORMAT_JSON = "json"
+
+FORMATS = (FORMAT_DATA, FORMAT_JSON)
+
+
+@click.command(name="stream")
+@click.argument("inputfile", type=click.File("r"))
+@click.option("-a", "--arg", "arguments_list", multiple=True)
+@click.option("-e", "--env", "env_list", multiple=True)
+@click.option(
+    "-m",
+    "--mode",
+    type=click.Choice(STREAM_MODES),
+    default=STREAM_AUTO,
+    show_default=True,
+    help="Format of the stream (auto: from the response Content-Type)",
+)
+@click.option(
+    "-f",
+    "--format",
+    "output_format",
+    type=click.Choice(FORMATS),
+    default=FORMAT_DATA,
+    show_default=True,
+    help="Print the data of each event, or each event as a JSON line",
+)
+@click.option(
+    "-o",
+    "--output",
+    type=click.File("w"),
+    default=None,
+    help="Write events to a file, instead of stdout",
+)
+@click.option(
+    "--idle-timeout",
+    type=float,
+    default=None,
+    help="Give up, or reconnect, if no data arrives for this long, in seconds",
+)
+@click.option(
+    "--max-time",
+    type=float,
+    default=None,
+    help="Stop after this long, in seconds",
+)
+@click.option(
+    "--connect-timeout",
+    type=float,
+    default=None,
+    help="Timeout for connecting, in seconds",
+)
+@click.option(
+    "--reconnect/--no-reconnect",
+    default=False,
+    help="Reconnect when the stream ends or fails, sending Last-Event-ID",
+)
+@click.option(
+    "--max-reconnects",
+    type=click.IntRange(min=0),
+    default=None,
+    help="Give up after reconnecting this many times (default: never)",
+)
+@click.option(
+    "--reconnect-delay",
+    type=float,
+    default=DEFAULT_RECONNECT_DELAY,
+    show_default=True,
+    help="Seconds to wait before reconnecting, unless set by the server",
+)
+@click.option("-v", "--verbose", is_flag=True, default=False)
+def cmd_stream(
+    inputfile,
+    arguments_list,
+    env_list,
+    mode,
+    output_format,
+    output,
+    idle_timeout,
+    max_time,
+    connect_timeout,
+    reconnect,
+    max_reconnects,
+    reconnect_delay,
+    verbose,
+):
+    """
+    Send a request, and print events from a streaming response.
+
+    Server-Sent Events, NDJSON and text lines are printed one at a
+    time, as soon as they arrive.
+    """
+
+    variables = parse_variables(arguments_list, env_list)
+    request = build_request(load_requestfile(inputfile), variables=variables)
+
+    send = partial(
+        send_request,
+        stream=True,
+        session=make_session(1),
+        timeout=(connect_timeout, idle_timeout),
+    )
+
+    console = Console(highlight=False, markup=False, stderr=True)
+    output = output if output is not None else sys.stdout
+
+    def on_connect(connection, response):
+        if verbose or connection > 1:
+            console.print(_format_connect(connection, response))
+
+    try:
+        for event in iter_events(
+            request,
+            send,
+            mode=mode,
+            idle_timeout=idle_timeout,
+            total_timeout=max_time,
+            reconnect=reconnect,
+            max_reconnects=max_reconnects,
+            reconnect_delay=reconnect_delay,
+            on_connect=on_connect,
+        ):
+            output.write(_format_event(event, output_format))
+            output.write("\n")
+            output.flush()
+    except StreamTimeout as exc:
+        console.print(Text(f"Timeout: {exc}", style="bold red"))
+        sys.exit(1)
+    except (OSError, HTTPError, ValueError) as exc:
+        raise click.ClickException(str(exc))
+    except KeyboardInterrupt:
+        pass
+
+
+def _format_event(event: StreamEvent, output_format: str) -> str:
+    if output_format == FORMAT_DATA:
+        return event.data
+
+    data = {"event": event.event, "id": event.id, "data": event.data}
+    if event.value is not None:
+        data["value"] = event.value
+    data["connection"] = event.connection
+    data["elapsed"] = round(event.elapsed, 6)
+    return json.dumps(data)
+
+
+def _format_connect(connection: int, response) -> Text:
+    text = Text()
+    if connection > 1:
+        text.append("RECONNECTED ", style="bold yellow")
+    else:
+        text.append("CONNECTED ", style="bold green")
+    text.append(f"{response.url} {response.status_code} {response.reason}")
+    text.append(f" {response.headers.get('Content-Type', '')}", style="dim")
+    return text
@@ -0,0 +1,56 @@
+import os
+
+import click
+
+from requestfile.ast import Requestfile
+from requestfile.parser import parse_requestfile
+
+
+def parse_variables(arguments_list, env_list) -> dict[str, str]:
+    """
+    Build variables from -a name=value and -e name[:envvar] options.
+    """
+
+    variables = {}
+
+    for argspec in arguments_list:
+        key, value = argspec.split("=", 1)
+        variables[key] = value
+
+    for envspec in env_list:
+        parts = envspec.split(":", 1)
+        match parts:
+            case (key, envname):
+                variables[key] = os.environ[envname]
+            case (envname,):
+                variables[envname] = os.environ[envname]
+            case _:
+                raise ValueError(f"Bad env spec: {envspec}")
+
+    return variables
+
+
+def load_requestfile(inputfile: click.File) -> Requestfile:
+    """
+    Parse a Requestfile from a file opened by click.
+    """
+
+    filename = inputfile.name
+    if filename == "<stdin>":
+        filename = None
+    else:
+        filename = os.path.abspath(filename)
+
+    return parse_requestfile(inputfile, filename=filename)
+
+
+def get_timeout(
+    timeout: float | None, connect_timeout: float | None
+) -> float | tuple[float | None, float | None] | None:
+    """
+    Build a timeout value from --timeout and --connect-timeout.
+    """
+
+    if connect_timeout is None:
+        return timeout
+    return (connect_timeout, timeout)
@@ -0,0 +1,381 @@
+"""
+Download large responses in parallel, as byte ranges
+
+If the server supports range requests, the resource is split into
+ranges fetched concurrently over a pooled session, each written at its
+own offset of a preallocated file with pwrite(). Progress is saved to
+a sidecar state file next to the output, so interrupted downloads can
+be resumed where they left off. Other servers get a plain sequential
+download.
+"""
+
+import dataclasses
+import itertools
+import json
+import os
+import re
+import threading
+import time
+from concurrent.futures import FIRST_EXCEPTION, ThreadPoolExecutor, wait
+from dataclasses import dataclass, field
+from typing import Any
+
+from multidict import CIMultiDict
+from requests import Response, Session
+from requests.adapters import HTTPAdapter
+from urllib3.exceptions import HTTPError
+
+from .builder.request import Request
+from .ext.requests import send as send_request
+
+# Suffix of the file where progress is saved, next to the output
+STATE_SUFFIX = ".download"
+
+# Ranges are not split smaller than this
+MIN_PART_SIZE = 1024 * 1024
+
+CHUNK_SIZE = 256 * 1024
+
+RE_CONTENT_RANGE = re.compile(r"bytes\s+(\d+)-(\d+)/(\d+|\*)")
+
+
+@dataclass(slots=True)
+class ByteRange:
+    start: int
+
+    # End of the range, exclusive
+    end: int
+
+    # Bytes written so far, from start
+    done: int = 0
+
+    @property
+    def complete(self) -> bool:
+        return self.start + self.done >= self.end
+
+
+@dataclass(slots=True)
+class DownloadState:
+    url: str
+    size: int
+
+    # Validators of the resource: if they change, the download is
+    # started over.
+    etag: str | None = None
+    last_modified: str | None = None
+
+    ranges: list[ByteRange] = field(default_factory=list)
+
+    @classmethod
+    def load(cls, path: str) -> "DownloadState | None":
+        try:
+            with open(path) as fp:
+                data = json.load(fp)
+            data["ranges"] = [ByteRange(*item) for item in data["ranges"]]
+            return cls(**data)
+        except (OSError, ValueError, TypeError, KeyError):
+            return None
+
+    def save(self, path: str):
+        data: dict[str, Any] = dataclasses.asdict(self)
+        data["ranges"] = [[r.start, r.end, r.done] for r in self.ranges]
+        # Replaced atomically, so it's never left half-written
+        with open(f"{path}.tmp", "w") as fp:
+            json.dump(data, fp)
+        os.replace(f"{path}.tmp", path)
+
+    def matches(self, other: "DownloadState") -> bool:
+        return (self.url, self.size, self.etag, self.last_modified) == (
+            other.url,
+            other.size,
+            other.etag,
+            other.last_modified,
+        )
+
+
+@dataclass(slots=True)
+class DownloadResult:
+    path: str
+    size: int
+
+    # Number of ranges fetched concurrently; 0 if the server doesn't
+    # support range requests.
+    parts: int = 0
+
+    # Bytes already downloaded by a previous, interrupted run
+    resumed: int = 0
+
+    elapsed: float = 0.0
+
+
+def download(
+    request: Request,
+    path: str,
+    session: Session | None = None,
+    parts: int = 8,
+    retries: int = 3,
+    timeout: float | tuple[float | None, float | None] | None = None,
+    save_interval: float = 1.0,
+) -> DownloadResult:
+    """
+    Download the response to a request into ``path``.
+
+    If the server supports range requests, ``parts`` ranges are
+    fetched concurrently, each retried up to ``retries`` times from
+    where it stopped. Progress is saved to ``path`` + STATE_SUFFIX
+    every ``save_interval`` seconds; calling this again with the same
+    path resumes the download, unless the resource changed.
+
+    Raises ValueError if the response is unsuccessful.
+    """
+
+    if session is not None:
+        return _download(request, path, session, parts, retries, timeout, save_interval)
+
+    session = Session()
+    try:
+        return _download(request, path, session, parts, retries, timeout, save_interval)
+    finally:
+        _close_session(session)
+
+
+def _download(
+    request: Request,
+    path: str,
+    session: Session,
+    parts: int,
+    retries: int,
+    timeout,
+    save_interval: float,
+) -> DownloadResult:
+    started = time.monotonic()
+    state_path = path + STATE_SUFFIX
+
+    # Ask for the first byte: servers supporting ranges reply with 206,
+    # and the total size.
+    probe = _send_range(request, session, timeout, 0, 1)
+    if probe.status_code == 416:
+        # Not even one byte: the resource is empty
+        probe.close()
+        probe = send_request(request, stream=True, session=session, timeout=timeout)
+    total = _get_total_size(probe)
+    if total is None:
+        _check_response(probe)
+        size = _write_sequential(probe, path)
+        return DownloadResult(path, size, elapsed=time.monotonic() - started)
+    probe.close()
+
+    state = DownloadState(
+        url=probe.url,
+        size=total,
+        etag=probe.headers.get("ETag"),
+        last_modified=probe.headers.get("Last-Modified"),
+    )
+    previous = DownloadState.load(state_path)
+    if previous is not None and previous.matches(state) and os.path.exists(path):
+        state = previous
+    else:
+        state.ranges = _split_ranges(total, parts)
+
+    resumed = sum(r.done for r in state.ranges)
+    fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o666)
+    try:
+        _preallocate(fd, total)
+        state.save(state_path)
+
+        pending = [r for r in state.ranges if not r.complete]
+        if pending:
+            # Set on errors or interrupts, so the other ranges stop
+            # instead of downloading to the end
+            stop = threading.Event()
+            with ThreadPoolExecutor(max_workers=len(pending)) as pool:
+                futures = [
+                    pool.submit(
+                        _fetch_range,
+                        request,
+                        session,
+                        timeout,
+                        fd,
+                        r,
+                        retries,
+                        state,
+                        stop,
+                    )
+                    for r in pending
+                ]
+                try:
+                    while True:
+                        done, not_done = wait(
+                            futures, timeout=save_interval, return_when=FIRST_EXCEPTION
+                        )
+                        state.save(state_path)
+                        for future in done:
+                            future.result()  # Raise errors
+                        if not not_done:
+                            break
+                except BaseException:
+                    stop.set()
+                    for future in futures:
+                        future.cancel()
+                    raise
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+        if all(r.complete for r in state.ranges):
+            os.unlink(state_path)
+        else:
+            state.save(state_path)
+
+    return DownloadResult(
+        path,
+        total,
+        parts=len(state.ranges),
+        resumed=resumed,
+        elapsed=time.monotonic() - started,
+    )
+
+
+def _close_session(session: Session):
+    # Session.close() drops the connection pools, but leaves their idle
+    # connections open until garbage collected: close them now.
+    pools = [
+        adapter.poolmanager.pools[key]
+        for adapter in session.adapters.values()
+        if isinstance(adapter, HTTPAdapter)
+        for key in adapter.poolmanager.pools.keys()
+    ]
+    session.close()
+    for pool in pools:
+        pool.close()
+
+
+def _split_ranges(total: int, parts: int) -> list[ByteRange]:
+    parts = max(1, min(parts, -(-total // MIN_PART_SIZE)))
+    bounds = [total * i // parts for i in range(parts + 1)]
+    return [ByteRange(start, end) for start, end in itertools.pairwise(bounds)]
+
+
+def _fetch_range(
+    request: Request,
+    session: Session,
+    timeout,
+    fd: int,
+    byte_range: ByteRange,
+    retries: int,
+    state: DownloadState,
+    stop: threading.Event,
+):
+    for attempt in range(retries + 1):
+        offset = byte_range.start + byte_range.done
+        try:
+            response = _send_range(
+                request, session, timeout, offset, byte_range.end, state
+            )
+            with response:
+                _check_range_response(response, offset)
+                for chunk in response.raw.stream(CHUNK_SIZE, decode_content=False):
+                    if stop.is_set():
+                        break
+                    chunk = chunk[: byte_range.end - offset]
+                    _pwrite(fd, chunk, offset)
+                    offset += len(chunk)
+                    byte_range.done = offset - byte_range.start
+                    if byte_range.complete:
+                        break
+            if byte_range.complete or stop.is_set():
+                return
+            raise OSError(f"Range ended early, at byte {offset}")
+        except (OSError, HTTPError):
+            # Includes connection errors and timeouts: retry from where
+            # the range stopped
+            if attempt == retries or stop.is_set():
+                raise
+            if stop.wait(min(2**attempt * 0.1, 5.0)):
+                return
+
+
+def _send_range(
+    request: Request,
+    session: Session,
+    timeout,
+    start: int,
+    end: int,
+    state: DownloadState | None = None,
+) -> Response:
+    headers = CIMultiDict(request.headers)
+    headers["Range"] = f"bytes={start}-{end - 1}"
+    if state is not None and (validator := state.etag or state.last_modified):
+        # If the resource changed, the server sends all of it instead
+        headers["If-Range"] = validator
+    # Ranges apply to the encoded content: make sure there's none
+    headers.setdefault("Accept-Encoding", "identity")
+    ranged = dataclasses.replace(request, headers=headers)
+    return send_request(ranged, stream=True, session=session, timeout=timeout)
+
+
+def _get_total_size(response: Response) -> int | None:
+    """Total size of the resource, if the response is a 206 to a range"""
+    if response.status_code != 206:
+        return None
+    mo = RE_CONTENT_RANGE.match(response.headers.get("Content-Range", ""))
+    if mo is None or mo.group(3) == "*":
+        return None
+    return int(mo.group(3))
+
+
+def _check_response(response: Response):
+    if not response.ok:
+        response.close()
+        raise ValueError(f"Download failed: {response.status_code} {response.reason}")
+
+
+def _check_range_response(response: Response, offset: int):
+    _check_response(response)
+    mo = RE_CONTENT_RANGE.match(response.headers.get("Content-Range", ""))
+    if response.status_code != 206 or mo is None or int(mo.group(1)) != offset:
+        response.close()
+        raise ValueError("Resource changed, or server ignored the requested range")
+
+
+def _write_sequential(response: Response, path: str) -> int:
+    size = 0
+    with response, open(path, "wb") as fp:
+        for chunk in response.raw.stream(CHUNK_SIZE, decode_content=True):
+            fp.write(chunk)
+            size += len(chunk)
+    return size
+
+
+def _preallocate(fd: int, size: int):
+    current = os.fstat(fd).st_size
+    if current == size:
+        return
+    if current > size:
+        # Left over from another file: fallocate() only grows files
+        os.ftruncate(fd, size)
+        return
+    if hasattr(os, "posix_fallocate"):
+        try:
+            os.posix_fallocate(fd, 0, size)
+            return
+        except OSError:
+            pass  # Not supported by the filesystem
+    os.ftruncate(fd, size)
+
+
+_seek_lock = threading.Lock()
+
+
+def _pwrite(fd: int, data: bytes, offset: int):
+    if hasattr(os, "pwrite"):
+        while data:
+            written = os.pwrite(fd, data, offset)
+            data = data[written:]
+            offset += written
+        return
+
+    # Platforms without pwrite(): seek and write atomically
+    with _seek_lock:
+        os.lseek(fd, offset, os.SEEK_SET)
+        while data:
+            data = data[os.write(fd, data) :]
@@ -0,0 +1,349 @@
+"""
+Read streaming responses, one event at a time
+
+Server-Sent Events, NDJSON and plain text lines are parsed as the
+response arrives, and each event is yielded as soon as it's complete,
+without waiting for the end of the body. Streams can be bounded by idle
+and total timeouts, and reconnected when they drop; for Server-Sent
+Events, the ID of the last event received is sent back in the
+``Last-Event-ID`` header, so the server can resume from there.
+"""
+
+import codecs
+import dataclasses
+import itertools
+import json
+import queue
+import re
+import threading
+import time
+from dataclasses import dataclass
+from typing import Any, Callable, Iterable, Iterator
+
+from multidict import CIMultiDict
+from requests import Response
+from urllib3.exceptions import HTTPError, ReadTimeoutError
+
+from .builder.request import Request
+
+# Pick the format from the Content-Type of the response
+STREAM_AUTO = "auto"
+
+# Server-Sent Events (text/event-stream)
+STREAM_SSE = "sse"
+
+# One JSON value per line
+STREAM_NDJSON = "ndjson"
+
+# One event per line of text
+STREAM_LINES = "lines"
+
+STREAM_MODES = (STREAM_AUTO, STREAM_SSE, STREAM_NDJSON, STREAM_LINES)
+
+NDJSON_MIMETYPES = (
+    "application/x-ndjson",
+    "application/ndjson",
+    "application/jsonl",
+    "application/x-jsonlines",
+)
+
+# Delay before reconnecting, unless the server sets one
+DEFAULT_RECONNECT_DELAY = 3.0
+
+READ_SIZE = 64 * 1024
+
+RE_NEWLINE = re.compile(r"\r\n|\r|\n")
+
+
+class StreamTimeout(TimeoutError):
+    pass
+
+
+@dataclass(slots=True)
+class StreamEvent:
+    data: str
+
+    # Event type, for Server-Sent Events
+    event: str = "message"
+
+    # ID of the last event received, for Server-Sent Events
+    id: str | None = None
+
+    # Decoded JSON value, for NDJSON
+    value: Any = None
+
+    # Connection the event was received on, counting from 1
+    connection: int = 1
+
+    # Seconds since the stream started
+    elapsed: float = 0.0
+
+
+class SSEParser:
+    """
+    Parse Server-Sent Events, one line at a time.
+
+    The ID of the last event, and the reconnection delay requested by
+    the server, are kept across events (and connections).
+    """
+
+    def __init__(self):
+        self.last_event_id: str | None = None
+
+        # Reconnection delay set by the server, in seconds
+        self.retry: float | None = None
+
+        self._event = ""
+        self._data: list[str] = []
+
+    def feed(self, line: str) -> StreamEvent | None:
+        """Parse a line; returns an event, when the line completes it"""
+        if not line:
+            return self._dispatch()
+        if line.startswith(":"):
+            return None  # Comment, or keep-alive
+
+        name, _, value = line.partition(":")
+        value = value.removeprefix(" ")
+        match name:
+            case "event":
+                self._event = value
+            case "data":
+                self._data.append(value)
+            case "id" if "\0" not in value:
+                self.last_event_id = value
+            case "retry" if value.isascii() and value.isdigit():
+                self.retry = int(value) / 1000
+        return None
+
+    def reset(self):
+        """Discard an incomplete event, eg. when the connection drops"""
+        self._event = ""
+        self._data = []
+
+    def _dispatch(self) -> StreamEvent | None:
+        data, event = self._data, self._event
+        self.reset()
+        if not data:
+            return None
+        return StreamEvent(
+            "\n".join(data), event=event or "message", id=self.last_event_id
+        )
+
+
+def iter_lines(chunks: Iterable[bytes]) -> Iterator[str]:
+    """
+    Split a stream of UTF-8 chunks into lines, as they arrive.
+
+    Lines can end with CRLF, LF or CR, even split across chunks. The
+    last line is yielded even if unterminated.
+    """
+
+    decoder = codecs.getincrementaldecoder("utf-8-sig")(errors="replace")
+    buffer = ""
+    for chunk in chunks:
+        buffer += decoder.decode(chunk)
+        # A final CR might be the first half of a CRLF: wait for more
+        held = "\r" if buffer.endswith("\r") else ""
+        lines = RE_NEWLINE.split(buffer[: len(buffer) - len(held)])
+        buffer = lines.pop() + held
+        yield from lines
+
+    buffer += decoder.decode(b"", final=True)
+    lines = RE_NEWLINE.split(buffer)
+    last = lines.pop()
+    yield from lines
+    if last:
+        yield last
+
+
+def get_stream_mode(response: Response) -> str:
+    """Stream format of a response, from its Content-Type"""
+    mimetype = response.headers.get("Content-Type", "")
+    mimetype = mimetype.partition(";")[0].strip().lower()
+    if mimetype == "text/event-stream":
+        return STREAM_SSE
+    if mimetype in NDJSON_MIMETYPES:
+        return STREAM_NDJSON
+    return STREAM_LINES
+
+
+def iter_events(
+    request: Request,
+    send: Callable[[Request], Response],
+    mode: str = STREAM_AUTO,
+    idle_timeout: float | None = None,
+    total_timeout: float | None = None,
+    reconnect: bool = False,
+    max_reconnects: int | None = None,
+    reconnect_delay: float = DEFAULT_RECONNECT_DELAY,
+    on_connect: Callable[[int, Response], None] | None = None,
+) -> Iterator[StreamEvent]:
+    """
+    Send a request, and yield events from the response as they arrive.
+
+    ``send`` must return a streamed response (eg. send(stream=True)).
+
+    Raises StreamTimeout if no data arrives for ``idle_timeout``
+    seconds, or the stream lasts over ``total_timeout`` seconds; and
+    ValueError if the response is unsuccessful.
+
+    With ``reconnect``, the request is sent again when the stream ends,
+    fails, or stays idle, after ``reconnect_delay`` seconds (or the
+    delay set by the server), up to ``max_reconnects`` times. A 204
+    response stops reconnecting. ``on_connect`` is called with the
+    connection number and response, on each connection.
+    """
+
+    if mode not in STREAM_MODES:
+        raise ValueError(f"Invalid stream mode: {mode}")
+
+    started = time.monotonic()
+    deadline = started + total_timeout if total_timeout is not None else None
+    parser = SSEParser()
+
+    for connection in itertools.count(1):
+        try:
+            response = send(_with_last_event_id(request, parser.last_event_id))
+            if on_connect is not None:
+                on_connect(connection, response)
+            if response.status_code == 204:
+                # The server asks not to reconnect
+                response.close()
+                return
+            if not response.ok:
+                response.close()
+                raise ValueError(
+                    f"Stream failed: {response.status_code} {response.reason}"
+                )
+
+            stream_mode = mode if mode != STREAM_AUTO else get_stream_mode(response)
+            chunks = _iter_chunks(response, idle_timeout, deadline)
+            for event in _parse_events(iter_lines(chunks), stream_mode, parser):
+                event.connection = connection
+                event.elapsed = time.monotonic() - started
+                yield event
+        except (OSError, HTTPError) as exc:
+            # Includes connection errors, and timeouts
+            parser.reset()
+            if _is_past(deadline):
+                raise StreamTimeout(f"Stream lasted over {total_timeout}s") from exc
+            if not _can_reconnect(reconnect, max_reconnects, connection):
+                raise
+        else:
+            parser.reset()
+            if not _can_reconnect(reconnect, max_reconnects, connection):
+                return
+
+        delay = parser.retry if parser.retry is not None else reconnect_delay
+        if deadline is not None:
+            delay = min(delay, max(deadline - time.monotonic(), 0))
+        time.sleep(delay)
+        if _is_past(deadline):
+            raise StreamTimeout(f"Stream lasted over {total_timeout}s")
+
+
+def _parse_events(
+    lines: Iterable[str], mode: str, parser: SSEParser
+) -> Iterator[StreamEvent]:
+    for line in lines:
+        if mode == STREAM_SSE:
+            if (event := parser.feed(line)) is not None:
+                yield event
+        elif mode == STREAM_NDJSON:
+            if not line.strip():
+                continue
+            try:
+                value = json.loads(line)
+            except ValueError as exc:
+                raise ValueError(f"Invalid JSON line: {exc}") from exc
+            yield StreamEvent(line, value=value)
+        else:
+            yield StreamEvent(line)
+
+
+def _iter_chunks(
+    response: Response, idle_timeout: float | None, deadline: float | None
+) -> Iterator[bytes]:
+    """
+    Read a response body as it arrives.
+
+    Reads happen in a separate thread, so timeouts hold even while
+    blocked waiting for data.
+    """
+
+    chunks = queue.Queue(maxsize=16)
+    stop = threading.Event()
+    thread = threading.Thread(
+        target=_read_chunks, args=(response, chunks, stop), daemon=True
+    )
+    thread.start()
+    try:
+        while True:
+            timeout = idle_timeout
+            if deadline is not None:
+                remaining = max(deadline - time.monotonic(), 0)
+                timeout = remaining if timeout is None else min(timeout, remaining)
+            try:
+                item = chunks.get(timeout=timeout)
+            except queue.Empty:
+                if _is_past(deadline):
+                    raise StreamTimeout("Total timeout reached") from None
+                raise StreamTimeout(f"No data for {idle_timeout}s") from None
+            if item is None:
+                return
+            if isinstance(item, (ReadTimeoutError, TimeoutError)):
+                # The socket timed out first
+                raise StreamTimeout(f"No data for {idle_timeout}s") from item
+            if isinstance(item, BaseException):
+                raise item
+            yield item
+    finally:
+        stop.set()
+        response.close()
+
+
+def _read_chunks(response: Response, chunks: queue.Queue, stop: threading.Event):
+    try:
+        if hasattr(response.raw, "read1"):
+            reads = iter(
+                lambda: response.raw.read1(READ_SIZE, decode_content=True), b""
+            )
+        else:
+            # Older urllib3: chunked bodies still arrive one chunk at a time
+            reads = response.iter_content(chunk_size=None)
+        for chunk in reads:
+            if not _put(chunks, chunk, stop):
+                return
+        _put(chunks, None, stop)
+    except Exception as exc:
+        _put(chunks, exc, stop)
+
+
+def _put(chunks: queue.Queue, item: Any, stop: threading.Event) -> bool:
+    """Put an item in the queue, unless the reader stopped"""
+    while not stop.is_set():
+        try:
+            chunks.put(item, timeout=0.1)
+            return True
+        except queue.Full:
+            continue
+    return False
+
+
+def _with_last_event_id(request: Request, last_event_id: str | None) -> Request:
+    if last_event_id is None:
+        return request
+    headers = CIMultiDict(request.headers)
+    headers["Last-Event-ID"] = last_event_id
+    return dataclasses.replace(request, headers=headers)
+
+
+def _can_reconnect(reconnect: bool, max_reconnects: int | None, connection: int):
+    if not reconnect:
+        return False
+    return max_reconnects is None or connection <= max_reconnects
+
+
+def _is_past(deadline: float | None) -> bool:
+    return deadline is not None and time.monotonic() >= deadline
@@ -0,0 +1,367 @@
+"""
+Export built requests as a HAR document, or as a curl script
+
+Requests are built and prepared exactly as they would be sent, then
+written one at a time: the output is never held in memory as a whole.
+Bodies larger than a threshold, or binary, are streamed to separate
+files and referenced from the output instead of being inlined.
+"""
+
+import json
+import os
+import re
+import shlex
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from importlib.metadata import PackageNotFoundError, version
+from typing import Iterable, Iterator, TextIO
+from urllib.parse import parse_qsl, urlsplit
+
+from requests import PreparedRequest
+
+from .builder import build_request
+from .builder.request import Request
+from .ext.requests import build_requests_request
+from .parser import parse_requestfile
+
+FORMAT_HAR = "har"
+FORMAT_CURL = "curl"
+FORMATS = (FORMAT_HAR, FORMAT_CURL)
+
+# Bodies larger than this (in bytes) are written to separate files
+DEFAULT_INLINE_LIMIT = 64 * 1024
+
+READ_SIZE = 64 * 1024
+
+
+@dataclass(slots=True)
+class ExportedRequest:
+    # Name identifying the request, eg. path of its Requestfile
+    name: str
+    method: str
+    url: str
+    headers: list[tuple[str, str]]
+
+    # Body, if small enough to be inlined
+    body: str | None = None
+
+    # Path of the file holding the body, as referenced from the output
+    body_file: str | None = None
+
+    # Size of the body in bytes, wherever it is
+    body_size: int = 0
+
+
+def prepare_request(request: Request) -> PreparedRequest:
+    """Prepare a request as it would be sent (cookies, encoded forms...)"""
+    return build_requests_request(request).prepare()
+
+
+def export_request(
+    request: Request,
+    name: str,
+    body_path: str,
+    body_ref: str | None = None,
+    inline_limit: int = DEFAULT_INLINE_LIMIT,
+) -> ExportedRequest:
+    """
+    Prepare a request for export.
+
+    If the body is larger than ``inline_limit`` bytes, or not UTF-8
+    text, it is streamed to ``body_path``, and referenced in the
+    output as ``body_ref`` (default: same as ``body_path``).
+    """
+
+    prepared = prepare_request(request)
+    exported = ExportedRequest(
+        name=name,
+        method=prepared.method,
+        url=prepared.url,
+        headers=[(key, _ensure_str(value)) for key, value in prepared.headers.items()],
+    )
+
+    chunks = _iter_body(prepared.body)
+    head = bytearray()
+    for chunk in chunks:
+        head += chunk
+        if len(head) > inline_limit:
+            break
+    else:
+        try:
+            if head:
+                exported.body = head.decode()
+                exported.body_size = len(head)
+            return exported
+        except UnicodeDecodeError:
+            pass
+
+    # Too large, or binary: stream to a file
+    os.makedirs(os.path.dirname(body_path) or ".", exist_ok=True)
+    with open(body_path, "wb") as fp:
+        fp.write(head)
+        size = len(head)
+        for chunk in chunks:
+            fp.write(chunk)
+            size += len(chunk)
+    exported.body_file = body_ref or body_path
+    exported.body_size = size
+    return exported
+
+
+def export_requestfiles(
+    paths: Iterable[str],
+    writer: "HarWriter | CurlWriter",
+    variable_sets: Iterable[dict[str, str]] = ({},),
+    body_dir: str = ".",
+    base_dir: str = ".",
+    inline_limit: int = DEFAULT_INLINE_LIMIT,
+    max_workers: int = 1,
+) -> int:
+    """
+    Build each Requestfile in ``paths`` once per variable set, and
+    write the requests in order. Returns the number of requests
+    written.
+
+    Bodies too large to be inlined are written to ``body_dir``, and
+    referenced by path relative to ``base_dir``. Requests are built
+    in ``max_workers`` processes; only a few of them are kept in
+    memory at once, waiting to be written.
+    """
+
+    variable_sets = list(variable_sets)
+    jobs = (
+        (
+            _get_name(path, n, len(variable_sets)),
+            path,
+            variables,
+            body_dir,
+            base_dir,
+            inline_limit,
+        )
+        for path in paths
+        for n, variables in enumerate(variable_sets, 1)
+    )
+    jobs = ((index, *job) for index, job in enumerate(jobs, 1))
+
+    count = 0
+    if max_workers > 1:
+        with ProcessPoolExecutor(max_workers) as pool:
+            for exported in _map_ordered(pool, _export_file, jobs, max_workers * 2):
+                writer.write(exported)
+                count += 1
+    else:
+        for job in jobs:
+            writer.write(_export_file(job))
+            count += 1
+    return count
+
+
+class HarWriter:
+    """
+    Write exported requests to a HAR document, one entry at a time.
+
+    Bodies stored in separate files are referenced via a custom
+    ``_file`` attribute of the entry's postData, with empty text.
+    """
+
+    def __init__(self, stream: TextIO):
+        self.stream = stream
+        self._count = 0
+        creator = {"name": "requestfile", "version": _get_version()}
+        stream.write(
+            f'{{"log": {{"version": "1.2", "creator": {json.dumps(creator)}, '
+            '"entries": [\n'
+        )
+
+    def write(self, exported: ExportedRequest):
+        if self._count:
+            self.stream.write(",\n")
+        json.dump(_make_har_entry(exported), self.stream)
+        self._count += 1
+
+    def close(self):
+        self.stream.write("\n]}}\n")
+        self.stream.flush()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+
+class CurlWriter:
+    """
+    Write exported requests as curl commands, to a shell script.
+
+    Bodies stored in separate files are sent with --data-binary @file;
+    the script runs from its own directory, so relative paths work.
+    """
+
+    def __init__(self, stream: TextIO):
+        self.stream = stream
+        stream.write('#!/bin/sh\nset -e\ncd "$(dirname "$0")"\n')
+
+    def write(self, exported: ExportedRequest):
+        q = shlex.quote
+        lines = [f"curl -X {q(exported.method)} {q(exported.url)}"]
+        for key, value in exported.headers:
+            if key.lower() != "content-length":  # Computed by curl
+                lines.append(f"-H {q(f'{key}: {value}')}")
+        if exported.body_file is not None:
+            lines.append(f"--data-binary {q(f'@{exported.body_file}')}")
+        elif exported.body is not None:
+            lines.append(f"--data-raw {q(exported.body)}")
+
+        self.stream.write(f"\n# {_one_line(exported.name)}\n")
+        self.stream.write(" \\\n  ".join(lines))
+        self.stream.write("\n")
+
+    def close(self):
+        self.stream.flush()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+
+def _export_file(job: tuple) -> ExportedRequest:
+    """Build and export a Requestfile. Runs in worker processes."""
+    index, name, path, variables, body_dir, base_dir, inline_limit = job
+    try:
+        with open(path, encoding="utf-8") as fp:
+            requestfile = parse_requestfile(fp, filename=os.path.abspath(path))
+        request = build_request(requestfile, variables=variables, stream=True)
+        body_path = os.path.join(
+            body_dir, f"{index:05d}-{_slugify(os.path.basename(name))}.body"
+        )
+        return export_request(
+            request,
+            name,
+            body_path=body_path,
+            body_ref=os.path.relpath(body_path, base_dir),
+            inline_limit=inline_limit,
+        )
+    except Exception as exc:
+        raise ValueError(f"Failed to export {name}: {exc}") from exc
+
+
+def _map_ordered(
+    pool: ProcessPoolExecutor, fn, items: Iterable, window: int
+) -> Iterator:
+    """Like pool.map(), but only submitting ``window`` items ahead"""
+    pending = deque()
+    for item in items:
+        pending.append(pool.submit(fn, item))
+        if len(pending) >= window:
+            yield pending.popleft().result()
+    while pending:
+        yield pending.popleft().result()
+
+
+def _iter_body(body) -> Iterator[bytes]:
+    match body:
+        case None:
+            return
+        case str():
+            yield body.encode()
+        case bytes():
+            yield body
+        case _ if hasattr(body, "read"):
+            while chunk := body.read(READ_SIZE):
+                yield _ensure_bytes(chunk)
+        case _:
+            for chunk in body:
+                yield _ensure_bytes(chunk)
+
+
+def _make_har_entry(exported: ExportedRequest) -> dict:
+    headers = [{"name": key, "value": value} for key, value in exported.headers]
+    cookies = []
+    for key, value in exported.headers:
+        if key.lower() == "cookie":
+            for item in value.split(";"):
+                name, _, val = item.strip().partition("=")
+                cookies.append({"name": name, "value": val})
+
+    request = {
+        "method": exported.method,
+        "url": exported.url,
+        "httpVersion": "HTTP/1.1",
+        "cookies": cookies,
+        "headers": headers,
+        "queryString": [
+            {"name": key, "value": value}
+            for key, value in parse_qsl(
+                urlsplit(exported.url).query, keep_blank_values=True
+            )
+        ],
+        "headersSize": -1,
+        "bodySize": exported.body_size,
+    }
+    if exported.body is not None or exported.body_file is not None:
+        mimetype = next(
+            (value for key, value in exported.headers if key.lower() == "content-type"),
+            "",
+        )
+        request["postData"] = {"mimeType": mimetype, "text": exported.body or ""}
+        if exported.body_file is not None:
+            request["postData"]["_file"] = exported.body_file
+
+    return {
+        "startedDateTime": datetime.now(timezone.utc).isoformat(),
+        "time": 0,
+        "comment": exported.name,
+        "request": request,
+        # Requests were not sent: HAR requires a response anyway
+        "response": {
+            "status": 0,
+            "statusText": "",
+            "httpVersion": "",
+            "cookies": [],
+            "headers": [],
+            "content": {"size": 0, "mimeType": ""},
+            "redirectURL": "",
+            "headersSize": -1,
+            "bodySize": -1,
+        },
+        "cache": {},
+        "timings": {"send": 0, "wait": 0, "receive": 0},
+    }
+
+
+def _get_version() -> str:
+    try:
+        return version("requestfile")
+    except PackageNotFoundError:
+        return "unknown"
+
+
+def _get_name(path: str, n: int, count: int) -> str:
+    if count > 1:
+        return f"{path}[{n}]"
+    return path
+
+
+def _slugify(text: str) -> str:
+    return re.sub(r"[^a-zA-Z0-9]+", "-", text).strip("-")[-60:]
+
+
+def _one_line(text: str) -> str:
+    return " ".join(text.split())
+
+
+def _ensure_str(value: str | bytes) -> str:
+    if isinstance(value, bytes):
+        return value.decode("latin-1")
+    return value
+
+
+def _ensure_bytes(value: str | bytes) -> bytes:
+    if isinstance(value, str):
+        return value.encode()
+    return value
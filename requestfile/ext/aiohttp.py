@@ -0,0 +1,126 @@
+"""
+Send requests using aiohttp
+
+Used where many requests need to be sent concurrently from a single
+process, eg. for load generation.
+"""
+
+from typing import Any
+
+import aiohttp
+from multidict import CIMultiDict
+
+from requestfile.builder.request import Request as GenericRequest
+from requestfile.builder.request import RequestContentType
+from requestfile.builder.streaming import StreamedValue
+
+
+def build_aiohttp_request(grq: GenericRequest) -> dict[str, Any]:
+    """
+    Get keyword arguments for aiohttp.ClientSession.request().
+
+    The returned arguments can be reused to send the same request
+    multiple times, unless has_streamed_body() is True for it.
+    """
+
+    headers = CIMultiDict(
+        (name, _ensure_str(value)) for name, value in grq.headers.items()
+    )
+    kwargs: dict[str, Any] = {
+        "method": grq.method,
+        "url": grq.url,
+        "params": [(name, _ensure_str(value)) for name, value in grq.params.items()],
+        "headers": headers,
+        "cookies": {name: _ensure_str(value) for name, value in grq.cookies.items()},
+    }
+
+    if grq.content_type in (RequestContentType.BYTES, RequestContentType.TEXT):
+        body = grq.raw_body
+        match body:
+            case str():
+                body = body.encode()
+            case StreamedValue():
+                # aiohttp can't tell the size of file-like objects
+                # that are not real files
+                if body.size is not None and "Content-Length" not in headers:
+                    headers["Content-Length"] = str(body.size)
+                body = body.as_file()
+        kwargs["data"] = body
+
+        # Don't add a Content-Type, if one was not specified
+        if "Content-Type" not in headers:
+            kwargs["skip_auto_headers"] = ("Content-Type",)
+
+    elif grq.content_type == RequestContentType.MULTIPART:
+        kwargs["data"] = _build_multipart(grq)
+
+    elif grq.content_type == RequestContentType.FORM:
+        kwargs["data"] = [
+            (name, _ensure_str(value)) for name, value in grq.fields.items()
+        ]
+
+    return kwargs
+
+
+def has_streamed_body(grq: GenericRequest) -> bool:
+    """Whether the request body is read from a stream, when sent"""
+    return isinstance(grq.raw_body, StreamedValue) or any(
+        isinstance(part.body, StreamedValue) for part in grq.files.values()
+    )
+
+
+def _build_multipart(grq: GenericRequest) -> aiohttp.MultipartWriter:
+    writer = aiohttp.MultipartWriter("form-data")
+
+    for name, value in grq.fields.items():
+        part = writer.append(_ensure_str(value))
+        part.set_content_disposition("form-data", name=name)
+
+    for part_data in grq.files.values():
+        body = part_data.body
+        match body:
+            case None:
+                body = b""
+            case StreamedValue():
+                body = body.as_file()
+
+        headers = CIMultiDict(
+            (name, _ensure_str(value)) for name, value in part_data.headers.items()
+        )
+        if part_data.mimetype is not None:
+            headers["Content-Type"] = _ensure_str(part_data.mimetype)
+
+        part = writer.append(body, headers)
+        params = {"name": _ensure_str(part_data.name)}
+        if part_data.filename is not None:
+            params["filename"] = _ensure_str(part_data.filename)
+        part.set_content_disposition("form-data", **params)
+
+    return writer
+
+
+async def send(
+    req: GenericRequest,
+    session: aiohttp.ClientSession | None = None,
+) -> aiohttp.ClientResponse:
+    """
+    Send a request, and read the response body.
+
+    The body is read before returning, so it's still available via
+    ``await response.read()`` once the connection is released.
+    Pass a ``session`` to reuse connections across requests.
+    """
+
+    if session is None:
+        async with aiohttp.ClientSession() as session:
+            return await send(req, session)
+
+    async with session.request(**build_aiohttp_request(req)) as response:
+        await response.read()
+    return response
+
+
+def _ensure_str(text: str | bytes) -> str:
+    if not isinstance(text, str):
+        return text.decode()
+    return text
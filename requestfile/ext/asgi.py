@@ -0,0 +1,204 @@
+"""
+Send requests to an ASGI application, in-process
+
+Responses are returned as requests Response objects, just like the
+ones returned by ext.requests.send(), so the two can be swapped.
+
+The application runs in its own event loop, in a background thread,
+so requests can be sent from synchronous code as well as from within
+a running event loop. Lifespan events are not sent.
+"""
+
+import asyncio
+import queue
+import threading
+from http import HTTPStatus
+from typing import Any, Awaitable, Callable
+from urllib.parse import unquote, urlsplit
+
+from requests import PreparedRequest, Request, Response
+
+from requestfile.builder.request import Request as GenericRequest
+
+from .requests import build_requests_request, iter_request_body, make_streamed_response
+
+ASGIApp = Callable[[dict, Callable, Callable], Awaitable[None]]
+
+DEFAULT_PORTS = {"http": 80, "https": 443}
+
+# Marks the end of the response body, in the chunks queue
+_END = object()
+
+
+def send_asgi(
+    req: Request | GenericRequest,
+    app: ASGIApp,
+    stream: bool = False,
+    scope: dict | None = None,
+) -> Response:
+    """
+    Send a request to an ASGI application.
+
+    If ``stream`` is True, returns as soon as the response headers
+    are sent; the body can then be consumed as the application
+    produces it. Extra ``scope`` keys are passed to the application
+    along with the ones built from the request.
+    """
+
+    if isinstance(req, GenericRequest):
+        req = build_requests_request(req)
+    prepared = req.prepare()
+
+    asgi_scope = build_scope(prepared)
+    asgi_scope.update(scope or {})
+
+    exchange = _Exchange(prepared)
+    thread = threading.Thread(
+        target=asyncio.run,
+        args=(exchange.run(app, asgi_scope),),
+        name="asgi-app",
+        daemon=True,
+    )
+    thread.start()
+
+    status, headers = exchange.wait_for_start()
+    response = make_streamed_response(
+        prepared,
+        status=status,
+        reason=_get_reason(status),
+        headers=headers,
+        body=exchange,
+    )
+
+    if not stream:
+        # Read the whole body, as requests does for non-streamed responses
+        response.content
+        response.close()
+    return response
+
+
+def build_scope(request: PreparedRequest) -> dict:
+    """
+    Build an ASGI HTTP connection scope from a prepared request.
+    """
+
+    url = urlsplit(request.url)
+    raw_path = (url.path or "/").encode("ascii")
+
+    headers = [(b"host", url.netloc.encode("latin-1"))]
+    headers.extend(
+        (name.lower().encode("latin-1"), _encode_header_value(value))
+        for name, value in request.headers.items()
+        if name.lower() != "host"
+    )
+
+    return {
+        "type": "http",
+        "asgi": {"version": "3.0", "spec_version": "2.3"},
+        "http_version": "1.1",
+        "method": request.method,
+        "scheme": url.scheme,
+        "path": unquote(raw_path.decode("ascii")),
+        "raw_path": raw_path,
+        "query_string": url.query.encode("latin-1"),
+        "root_path": "",
+        "headers": headers,
+        "client": ("127.0.0.1", 0),
+        "server": (
+            url.hostname or "localhost",
+            url.port or DEFAULT_PORTS.get(url.scheme),
+        ),
+    }
+
+
+class _Exchange:
+    """
+    Messages exchanged with an ASGI application, for a single request.
+
+    The application side runs in the event loop thread; response
+    events are passed to the calling thread through a queue.
+    """
+
+    def __init__(self, request: PreparedRequest):
+        self._body = iter_request_body(request)
+        self._events: queue.Queue[tuple[str, Any]] = queue.Queue()
+        self._closed = threading.Event()
+        self._started = False
+
+    async def run(self, app: ASGIApp, scope: dict):
+        try:
+            await app(scope, self._receive, self._send)
+        except BaseException as exc:
+            self._events.put(("error", exc))
+        else:
+            if not self._started:
+                error = RuntimeError("ASGI application did not send a response")
+                self._events.put(("error", error))
+            else:
+                self._events.put(("body", _END))
+        finally:
+            self._closed.set()
+
+    async def _receive(self) -> dict:
+        if self._body is not None:
+            # Streamed request bodies might be read from files
+            chunk = await asyncio.to_thread(next, self._body, None)
+            if chunk is not None:
+                return {"type": "http.request", "body": chunk, "more_body": True}
+            self._body = None
+            return {"type": "http.request", "body": b"", "more_body": False}
+
+        # Request fully sent: wait until the response is complete, or
+        # the client stops reading it.
+        await asyncio.to_thread(self._closed.wait)
+        return {"type": "http.disconnect"}
+
+    async def _send(self, message: dict):
+        match message["type"]:
+            case "http.response.start":
+                self._started = True
+                self._events.put(("start", message))
+            case "http.response.body":
+                if body := message.get("body", b""):
+                    self._events.put(("body", body))
+                if not message.get("more_body", False):
+                    self._events.put(("body", _END))
+                    self._closed.set()
+
+    def wait_for_start(self) -> tuple[int, list[tuple[str, str]]]:
+        kind, value = self._events.get()
+        if kind == "error":
+            raise value
+        if kind != "start":
+            raise RuntimeError("ASGI application sent body before headers")
+        headers = [
+            (name.decode("latin-1"), value.decode("latin-1"))
+            for name, value in value.get("headers", [])
+        ]
+        return value["status"], headers
+
+    def __iter__(self):
+        while True:
+            kind, value = self._events.get()
+            if kind == "error":
+                raise value
+            if value is _END:
+                return
+            yield value
+
+    def close(self):
+        self._closed.set()
+
+
+def _get_reason(status: int) -> str:
+    try:
+        return HTTPStatus(status).phrase
+    except ValueError:
+        return ""
+
+
+def _encode_header_value(value: str | bytes) -> bytes:
+    # Values read from included files are already bytes
+    if isinstance(value, bytes):
+        return value
+    return value.encode("latin-1")
@@ -0,0 +1,275 @@
+"""
+On-disk HTTP cache, using conditional requests
+
+Responses to GET and HEAD requests are stored along with their
+validators (ETag, Last-Modified). Subsequent identical requests are
+served from the cache while fresh (as per Cache-Control: max-age), or
+revalidated with If-None-Match / If-Modified-Since otherwise.
+"""
+
+import dataclasses
+import json
+import os
+import re
+import time
+from dataclasses import dataclass, field
+from typing import Callable
+
+from requests import Response
+
+from requestfile.builder.fingerprint import fingerprint_request
+from requestfile.builder.request import Request as GenericRequest
+
+from .requests import make_response
+from .requests import send as send_request
+
+CACHEABLE_METHODS = ("GET", "HEAD")
+CACHEABLE_STATUSES = (200, 203, 300, 301, 308, 410)
+
+# Describe the body as received: not valid for the decoded body stored
+ENCODING_HEADERS = ("content-encoding", "content-length", "transfer-encoding")
+
+RE_MAX_AGE = re.compile(r"(?:^|,)\s*(?:s-)?max-age\s*=\s*\"?(\d+)\"?", re.IGNORECASE)
+
+
+@dataclass(slots=True)
+class CacheEntry:
+    url: str
+    status: int
+    reason: str
+    headers: list[tuple[str, str]]
+
+    # When the response was stored or last revalidated (epoch seconds)
+    stored_at: float
+
+    # Seconds the response can be served without revalidating
+    max_age: int = 0
+
+    etag: str | None = None
+    last_modified: str | None = None
+
+    # Size of the stored body, in bytes
+    size: int = 0
+
+    body: bytes = field(default=b"", repr=False)
+
+    @property
+    def is_fresh(self) -> bool:
+        return time.time() - self.stored_at < self.max_age
+
+    @property
+    def has_validators(self) -> bool:
+        return self.etag is not None or self.last_modified is not None
+
+
+class HttpCache:
+    """
+    HTTP response cache, stored in a directory.
+
+    Each entry is stored as two files named after the request
+    fingerprint: a JSON file with metadata, and the raw body.
+    Least recently used entries are evicted once the total size of
+    stored bodies goes over ``max_bytes``.
+    """
+
+    def __init__(
+        self,
+        directory: str,
+        max_bytes: int = 256 * 1024 * 1024,
+        ignore_headers: tuple[str, ...] = (),
+    ):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.ignore_headers = ignore_headers
+        os.makedirs(directory, exist_ok=True)
+
+    def get_key(self, request: GenericRequest) -> str:
+        return fingerprint_request(request, ignore_headers=self.ignore_headers)
+
+    def get(self, key: str) -> CacheEntry | None:
+        try:
+            with open(self._path(key, "json")) as fp:
+                meta = json.load(fp)
+            with open(self._path(key, "body"), "rb") as fp:
+                body = fp.read()
+        except (OSError, ValueError):
+            return None
+
+        # Keep track of usage, for eviction purposes
+        os.utime(self._path(key, "json"))
+
+        meta["headers"] = [tuple(item) for item in meta["headers"]]
+        return CacheEntry(**meta, body=body)
+
+    def put(self, key: str, entry: CacheEntry):
+        meta = dataclasses.asdict(entry)
+        del meta["body"]
+
+        # Write body first, so a metadata file always has its body
+        _write_atomic(self._path(key, "body"), entry.body)
+        _write_atomic(self._path(key, "json"), json.dumps(meta).encode())
+        self.evict()
+
+    def touch(self, key: str, entry: CacheEntry):
+        """Update metadata for an entry, after a successful revalidation"""
+        meta = dataclasses.asdict(entry)
+        del meta["body"]
+        _write_atomic(self._path(key, "json"), json.dumps(meta).encode())
+
+    def delete(self, key: str):
+        for ext in ("json", "body"):
+            try:
+                os.unlink(self._path(key, ext))
+            except FileNotFoundError:
+                pass
+
+    def evict(self):
+        """Remove least recently used entries, until under max_bytes"""
+        entries = []
+        total = 0
+        for name in os.listdir(self.directory):
+            key, ext = os.path.splitext(name)
+            if ext != ".json":
+                continue
+            try:
+                last_used = os.stat(self._path(key, "json")).st_mtime
+                size = os.stat(self._path(key, "body")).st_size
+            except OSError:
+                continue
+            entries.append((last_used, key, size))
+            total += size
+
+        for _, key, size in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            self.delete(key)
+            total -= size
+
+    def _path(self, key: str, ext: str) -> str:
+        return os.path.join(self.directory, f"{key}.{ext}")
+
+
+def send_cached(
+    request: GenericRequest,
+    cache: HttpCache,
+    send: Callable[[GenericRequest], Response] | None = None,
+    **kwargs,
+) -> Response:
+    """
+    Send a request through the cache.
+
+    Returned responses have a ``from_cache`` attribute, telling
+    whether the body was served from the cache. Extra arguments are
+    passed to send(); pass a custom ``send`` function to send requests
+    differently, eg. via send_with_policy().
+    """
+
+    if send is None:
+
+        def send(request: GenericRequest) -> Response:
+            return send_request(request, **kwargs)
+
+    if (request.method or "").upper() not in CACHEABLE_METHODS:
+        response = send(request)
+        response.from_cache = False
+        return response
+
+    key = cache.get_key(request)
+    entry = cache.get(key)
+
+    if entry is not None and entry.is_fresh:
+        return _build_response(entry)
+
+    if entry is not None and entry.has_validators:
+        request = dataclasses.replace(request, headers=request.headers.copy())
+        if entry.etag is not None:
+            request.headers["If-None-Match"] = entry.etag
+        if entry.last_modified is not None:
+            request.headers["If-Modified-Since"] = entry.last_modified
+
+    # The body is stored: read it in full
+    kwargs.pop("stream", None)
+    response = send(request)
+
+    if response.status_code == 304 and entry is not None:
+        entry.stored_at = time.time()
+        entry.max_age = _get_max_age(response.headers) or entry.max_age
+        cache.touch(key, entry)
+        return _build_response(entry)
+
+    response.from_cache = False
+
+    if _is_cacheable(response):
+        cache.put(key, _build_entry(response))
+    elif entry is not None:
+        cache.delete(key)
+
+    return response
+
+
+def _is_cacheable(response: Response) -> bool:
+    if response.status_code not in CACHEABLE_STATUSES:
+        return False
+    cache_control = response.headers.get("Cache-Control", "").lower()
+    if "no-store" in cache_control:
+        return False
+    return (
+        "ETag" in response.headers
+        or "Last-Modified" in response.headers
+        or _get_max_age(response.headers) > 0
+    )
+
+
+def _get_max_age(headers) -> int:
+    cache_control = headers.get("Cache-Control", "")
+    if "no-cache" in cache_control.lower():
+        return 0
+    if mo := RE_MAX_AGE.search(cache_control):
+        return int(mo.group(1))
+    return 0
+
+
+def get_decoded_headers(response: Response) -> list[tuple[str, str]]:
+    """Response headers, describing the decoded body in response.content"""
+    headers = [
+        (key, value)
+        for key, value in response.headers.items()
+        if key.lower() not in ENCODING_HEADERS
+    ]
+    headers.append(("Content-Length", str(len(response.content))))
+    return headers
+
+
+def _build_entry(response: Response) -> CacheEntry:
+    body = response.content
+    return CacheEntry(
+        url=response.url,
+        status=response.status_code,
+        reason=response.reason or "",
+        headers=get_decoded_headers(response),
+        stored_at=time.time(),
+        max_age=_get_max_age(response.headers),
+        etag=response.headers.get("ETag"),
+        last_modified=response.headers.get("Last-Modified"),
+        size=len(body),
+        body=body,
+    )
+
+
+def _build_response(entry: CacheEntry) -> Response:
+    response = make_response(
+        url=entry.url,
+        status=entry.status,
+        reason=entry.reason,
+        headers=entry.headers,
+        body=entry.body,
+    )
+    response.from_cache = True
+    return response
+
+
+def _write_atomic(path: str, data: bytes):
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, "wb") as fp:
+        fp.write(data)
+    os.replace(tmp_path, path)
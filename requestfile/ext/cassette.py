@@ -0,0 +1,163 @@
+"""
+Record and replay responses, for fast offline test runs
+
+A cassette is a single SQLite file mapping request fingerprints to
+recorded responses. In replay mode, responses are looked up by
+fingerprint via the table's primary key index, without touching the
+network at all.
+"""
+
+import json
+import sqlite3
+import threading
+import time
+from typing import Callable, Iterable
+
+from requests import Response
+
+from requestfile.builder.fingerprint import fingerprint_request
+from requestfile.builder.request import Request as GenericRequest
+
+from .cache import get_decoded_headers
+from .requests import make_response
+from .requests import send as send_request
+
+# Record every response, replacing existing ones
+MODE_RECORD = "record"
+
+# Only serve recorded responses; fail on unknown requests
+MODE_REPLAY = "replay"
+
+# Serve recorded responses, record unknown requests
+MODE_AUTO = "auto"
+
+CASSETTE_MODES = (MODE_RECORD, MODE_REPLAY, MODE_AUTO)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS responses (
+    fingerprint TEXT PRIMARY KEY,
+    method TEXT NOT NULL,
+    url TEXT NOT NULL,
+    status INTEGER NOT NULL,
+    reason TEXT NOT NULL,
+    headers TEXT NOT NULL,
+    body BLOB NOT NULL,
+    recorded_at REAL NOT NULL
+) WITHOUT ROWID
+"""
+
+
+class Cassette:
+    """
+    Store of recorded responses, keyed by request fingerprint.
+
+    Headers listed in ``ignore_headers`` are not taken into account
+    when matching requests, eg. for timestamps or signatures.
+    Safe to use from multiple threads.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        mode: str = MODE_REPLAY,
+        ignore_headers: Iterable[str] = (),
+    ):
+        if mode not in CASSETTE_MODES:
+            raise ValueError(f"Invalid cassette mode: {mode}")
+
+        self.path = path
+        self.mode = mode
+        self.ignore_headers = tuple(ignore_headers)
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute(SCHEMA)
+        self._db.commit()
+
+    def close(self):
+        with self._lock:
+            self._db.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def __len__(self) -> int:
+        with self._lock:
+            [(count,)] = self._db.execute("SELECT COUNT(*) FROM responses")
+        return count
+
+    def get_key(self, request: GenericRequest) -> str:
+        return fingerprint_request(request, ignore_headers=self.ignore_headers)
+
+    def lookup(self, key: str) -> Response | None:
+        with self._lock:
+            row = self._db.execute(
+                "SELECT url, status, reason, headers, body "
+                "FROM responses WHERE fingerprint = ?",
+                (key,),
+            ).fetchone()
+        if row is None:
+            return None
+
+        url, status, reason, headers, body = row
+        return make_response(
+            url=url,
+            status=status,
+            reason=reason,
+            headers=[tuple(item) for item in json.loads(headers)],
+            body=body,
+        )
+
+    def record(self, key: str, request: GenericRequest, response: Response):
+        row = (
+            key,
+            request.method or "",
+            request.url or "",
+            response.status_code,
+            response.reason or "",
+            # The body is stored decoded
+            json.dumps(get_decoded_headers(response)),
+            response.content,
+            time.time(),
+        )
+        with self._lock:
+            self._db.execute(
+                "INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                row,
+            )
+            self._db.commit()
+
+    def send(
+        self,
+        request: GenericRequest,
+        send: Callable[[GenericRequest], Response] | None = None,
+        **kwargs,
+    ) -> Response:
+        """
+        Send a request, according to the cassette mode.
+
+        In replay mode, raises KeyError for requests that were never
+        recorded. Extra arguments are passed to send(); pass a custom
+        ``send`` function to send requests differently, eg. via
+        send_with_policy().
+        """
+
+        key = self.get_key(request)
+
+        if self.mode in (MODE_REPLAY, MODE_AUTO):
+            if (response := self.lookup(key)) is not None:
+                return response
+            if self.mode == MODE_REPLAY:
+                raise KeyError(
+                    f"Request not found in cassette: {request.method} {request.url}"
+                )
+
+        kwargs.pop("stream", None)
+        if send is None:
+            response = send_request(request, **kwargs)
+        else:
+            response = send(request)
+        self.record(key, request, response)
+        return response
@@ -0,0 +1,326 @@
+"""
+Timeouts, deadlines, retries and hedging for sending requests
+
+- Timeouts apply to connecting, and to each read from the socket;
+- A deadline limits the total time spent on a request, including
+  retries, backoff and hedges;
+- Retries are only attempted for idempotent methods, after connection
+  errors, timeouts or some status codes, waiting an exponentially
+  increasing, jittered delay in between;
+- Hedging sends a duplicate request if the first one didn't complete
+  within the usual (eg. 95th percentile) latency, and takes whichever
+  response comes first.
+"""
+
+import random
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from dataclasses import dataclass, field
+from email.utils import parsedate_to_datetime
+from typing import Callable
+
+from requests import ConnectionError, Response, Session, Timeout
+
+from requestfile.builder.request import Request as GenericRequest
+from requestfile.utils.histogram import Histogram
+
+from .requests import send as send_request
+
+# Methods that can safely be sent more than once
+IDEMPOTENT_METHODS = ("GET", "HEAD", "OPTIONS", "PUT", "DELETE", "TRACE")
+
+# Timeout for connecting and for each read, in seconds; either a single
+# value for both, or a (connect, read) tuple.
+TimeoutValue = float | tuple[float | None, float | None] | None
+
+
+class DeadlineExceeded(Timeout):
+    """The request could not be completed before its deadline"""
+
+
+@dataclass(slots=True)
+class RetryPolicy:
+    # Total times a request can be sent, including the first one
+    max_attempts: int = 3
+
+    # Delay before the first retry; doubles at every attempt, and a
+    # random delay up to that is used ("full jitter").
+    backoff: float = 0.1
+    max_backoff: float = 10.0
+
+    # Responses to retry, as well as connection errors and timeouts
+    statuses: tuple[int, ...] = (502, 503, 504)
+
+    # Methods to retry; others are sent only once
+    methods: tuple[str, ...] = IDEMPOTENT_METHODS
+
+    def get_delay(self, attempt: int) -> float:
+        """Delay before sending attempt number ``attempt + 1``"""
+        limit = min(self.max_backoff, self.backoff * 2 ** (attempt - 1))
+        return random.uniform(0, limit)
+
+
+@dataclass(slots=True)
+class HedgePolicy:
+    """
+    Send a second request if the first one is slower than usual.
+
+    Latencies of completed requests are tracked, to decide how long
+    "usual" is; share one policy between similar requests.
+    """
+
+    # Hedge after this percentile of observed latency
+    percentile: float = 95
+
+    # Observed latencies needed before hedging
+    min_samples: int = 20
+
+    # Delay to use until there are enough samples; None to not hedge
+    initial_delay: float | None = None
+
+    # Never hedge sooner than this, in seconds
+    min_delay: float = 0.0
+
+    # Methods to hedge; others are sent only once
+    methods: tuple[str, ...] = IDEMPOTENT_METHODS
+
+    # Observed latencies, in microseconds
+    latencies: Histogram = field(default_factory=Histogram)
+    _lock: threading.Lock = field(default_factory=threading.Lock, repr=False)
+
+    def get_delay(self) -> float | None:
+        with self._lock:
+            if self.latencies.count < self.min_samples:
+                return self.initial_delay
+            delay = self.latencies.percentile(self.percentile) / 1_000_000
+        return max(delay, self.min_delay)
+
+    def record(self, seconds: float):
+        with self._lock:
+            self.latencies.record(round(seconds * 1_000_000))
+
+
+@dataclass(slots=True)
+class SendOutcome:
+    """What happened while sending a request"""
+
+    # Requests actually sent, including retries and hedges
+    attempts: int = 0
+    retries: int = 0
+
+    # Whether a hedge request was sent, and if its response was used
+    hedged: bool = False
+    hedge_won: bool = False
+
+    # Whether any attempt timed out, or the deadline was hit
+    timed_out: bool = False
+    deadline_exceeded: bool = False
+
+    # Errors from failed attempts, as "ExceptionType: message"
+    errors: list[str] = field(default_factory=list)
+
+    # Total time taken, in seconds
+    elapsed: float = 0.0
+
+
+def send_with_policy(
+    request: GenericRequest,
+    session: Session | None = None,
+    timeout: TimeoutValue = None,
+    deadline: float | None = None,
+    retry: RetryPolicy | None = None,
+    hedge: HedgePolicy | None = None,
+    send: Callable[[GenericRequest], Response] | None = None,
+    outcome: SendOutcome | None = None,
+    stream: bool = False,
+) -> Response:
+    """
+    Send a request, with timeouts, a deadline, retries and hedging.
+
+    ``deadline`` is the maximum time for the whole operation, in
+    seconds; DeadlineExceeded is raised once past it.
+
+    A custom ``send`` function can be passed to send each attempt
+    (``session``, ``timeout`` and ``stream`` are then ignored).
+
+    Details about what happened are recorded in ``outcome``, if
+    passed, and are available as ``response.outcome``.
+    """
+
+    if outcome is None:
+        outcome = SendOutcome()
+    if send is None:
+        session = session or Session()
+
+        def send(request: GenericRequest) -> Response:
+            return send_request(
+                request,
+                stream=stream,
+                session=session,
+                timeout=_limit_timeout(timeout, _remaining(deadline_at)),
+            )
+
+    start = time.monotonic()
+    deadline_at = None if deadline is None else start + deadline
+    method = (request.method or "").upper()
+    if retry is not None and method not in retry.methods:
+        retry = None
+    if hedge is not None and method not in hedge.methods:
+        hedge = None
+
+    try:
+        attempt = 0
+        while True:
+            attempt += 1
+            response, error = None, None
+            try:
+                response = _send_attempt(request, send, deadline_at, hedge, outcome)
+            except DeadlineExceeded:
+                outcome.deadline_exceeded = True
+                raise
+            except (ConnectionError, Timeout) as exc:
+                error = exc
+                outcome.timed_out |= isinstance(exc, Timeout)
+                outcome.errors.append(f"{type(exc).__name__}: {exc}")
+
+            if retry is None or attempt >= retry.max_attempts:
+                break
+            if response is not None and response.status_code not in retry.statuses:
+                break
+
+            delay = retry.get_delay(attempt)
+            if response is not None:
+                retry_after = get_retry_after(response)
+                if retry_after is not None:
+                    delay = min(retry_after, retry.max_backoff)
+
+            remaining = _remaining(deadline_at)
+            if remaining is not None and delay >= remaining:
+                # Retrying would not complete in time anyway
+                break
+
+            if response is not None:
+                response.close()
+            time.sleep(delay)
+            outcome.retries += 1
+
+        if error is not None:
+            raise error
+
+        response.outcome = outcome
+        return response
+
+    finally:
+        outcome.elapsed = time.monotonic() - start
+
+
+def _send_attempt(
+    request: GenericRequest,
+    send: Callable[[GenericRequest], Response],
+    deadline_at: float | None,
+    hedge: HedgePolicy | None,
+    outcome: SendOutcome,
+) -> Response:
+    hedge_delay = None if hedge is None else hedge.get_delay()
+
+    if deadline_at is None and hedge_delay is None:
+        # Nothing to wait for concurrently
+        outcome.attempts += 1
+        return _timed_send(request, send, hedge)
+
+    remaining = _remaining(deadline_at)
+    if remaining is not None and remaining <= 0:
+        raise DeadlineExceeded("Deadline exceeded before sending request")
+
+    # Threads are not waited for on exit: a request stuck past its
+    # deadline will eventually hit its own timeout.
+    executor = ThreadPoolExecutor(max_workers=2)
+    try:
+        outcome.attempts += 1
+        primary = executor.submit(_timed_send, request, send, hedge)
+        pending: set[Future] = {primary}
+
+        if hedge_delay is not None:
+            delay = hedge_delay if remaining is None else min(hedge_delay, remaining)
+            done, _ = wait(pending, timeout=delay)
+            if not done and (remaining is None or hedge_delay < remaining):
+                outcome.attempts += 1
+                outcome.hedged = True
+                pending.add(executor.submit(_timed_send, request, send, hedge))
+
+        while pending:
+            done, pending = wait(
+                pending, timeout=_remaining(deadline_at), return_when=FIRST_COMPLETED
+            )
+            if not done:
+                raise DeadlineExceeded("Request did not complete before deadline")
+
+            # Prefer successful responses, if both completed together
+            for future in sorted(done, key=lambda f: f.exception() is not None):
+                if future.exception() is None or not pending:
+                    # Use the first response, or the last error
+                    for other in pending:
+                        other.add_done_callback(_close_response)
+                    outcome.hedge_won = future is not primary
+                    return future.result()
+
+                # Failed, but the other request might still succeed
+                exc = future.exception()
+                outcome.errors.append(f"{type(exc).__name__}: {exc}")
+
+        raise RuntimeError("Unreachable")
+
+    finally:
+        executor.shutdown(wait=False)
+
+
+def _timed_send(
+    request: GenericRequest,
+    send: Callable[[GenericRequest], Response],
+    hedge: HedgePolicy | None,
+) -> Response:
+    start = time.monotonic()
+    response = send(request)
+    if hedge is not None:
+        hedge.record(time.monotonic() - start)
+    return response
+
+
+def _close_response(future: Future):
+    if future.exception() is None:
+        future.result().close()
+
+
+def _remaining(deadline_at: float | None) -> float | None:
+    if deadline_at is None:
+        return None
+    return deadline_at - time.monotonic()
+
+
+def _limit_timeout(timeout: TimeoutValue, remaining: float | None) -> TimeoutValue:
+    """Make sure timeouts don't go past the deadline"""
+    if remaining is None:
+        return timeout
+    remaining = max(remaining, 0.001)
+    if not isinstance(timeout, tuple):
+        timeout = (timeout, timeout)
+    return tuple(remaining if t is None else min(t, remaining) for t in timeout)
+
+
+def get_retry_after(response: Response) -> float | None:
+    """
+    Get the delay requested via a Retry-After header, in seconds.
+    """
+
+    value = response.headers.get("Retry-After")
+    if value is None:
+        return None
+    value = value.strip()
+    if value.isdigit():
+        return float(value)
+    try:
+        retry_at = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    return max(0.0, retry_at.timestamp() - time.time())
@@ -1,10 +1,19 @@
 import io
+from http.client import HTTPMessage
+from typing import BinaryIO, Callable, Iterable, Iterator
 
+from requests_toolbelt import MultipartEncoder
 from requests_toolbelt.utils import dump
 
 from requestfile.builder.request import Request as GenericRequest
 from requestfile.builder.request import RequestContentType
-from requests import Request, Response, Session
+from requestfile.builder.streaming import StreamedValue
+from requests import PreparedRequest, Request, Response, Session
+from requests.adapters import HTTPAdapter
+from requests.cookies import MockRequest, MockResponse
+from requests.structures import CaseInsensitiveDict
+from requests.utils import get_encoding_from_headers
+from urllib3 import HTTPResponse
 
 
 def build_requests_request(grq: GenericRequest) -> Request:
@@ -18,6 +27,13 @@ def build_requests_request(grq: GenericRequest) -> Request:
 
     if grq.content_type in (RequestContentType.BYTES, RequestContentType.TEXT):
         req.data = grq.raw_body
+        if isinstance(grq.raw_body, StreamedValue):
+            req.data = grq.raw_body.as_file()
+    elif _has_streamed_parts(grq):
+        encoder = _build_multipart_encoder(grq)
+        req.headers = grq.headers.copy()
+        req.headers["Content-Type"] = encoder.content_type
+        req.data = encoder
     else:
         req.data = grq.fields
 
@@ -34,10 +50,184 @@ def build_requests_request(grq: GenericRequest) -> Request:
     return req
 
 
-def send(req: Request | GenericRequest) -> Response:
+def _has_streamed_parts(grq: GenericRequest) -> bool:
+    return any(isinstance(part.body, StreamedValue) for part in grq.files.values())
+
+
+def _build_multipart_encoder(grq: GenericRequest) -> MultipartEncoder:
+    """
+    Encode multipart data without reading streamed parts in memory.
+
+    Parts need a known size to be streamed; others are read in full.
+    """
+
+    fields = list(grq.fields.items())
+    for part in grq.files.values():
+        body = part.body
+        if isinstance(body, StreamedValue):
+            body = body.as_file() if body.size is not None else body.read()
+        fields.append(
+            (part.name, (part.filename, body, part.mimetype, dict(part.headers)))
+        )
+    return MultipartEncoder(fields=fields)
+
+
+def send(
+    req: Request | GenericRequest,
+    stream: bool = False,
+    session: Session | None = None,
+    timeout: float | tuple[float | None, float | None] | None = None,
+) -> Response:
+    """
+    Send a request.
+
+    If ``stream`` is True, only headers are read before returning;
+    the body can then be consumed incrementally, eg. via
+    write_response_body().
+
+    Pass a ``session`` to reuse connections across requests.
+    ``timeout`` applies to connecting and to each read, in seconds;
+    pass a (connect, read) tuple to set them separately.
+    """
     if isinstance(req, GenericRequest):
         req = build_requests_request(req)
-    return Session().send(req.prepare())
+    if session is None:
+        session = Session()
+    return session.send(req.prepare(), stream=stream, timeout=timeout)
+
+
+def make_response(
+    url: str,
+    status: int,
+    reason: str,
+    headers: list[tuple[str, str]],
+    body: bytes,
+) -> Response:
+    """
+    Create a Response object from stored data.
+
+    Used to serve responses that did not come from the network, eg.
+    from a cache.
+    """
+    response = Response()
+    response.url = url
+    response.status_code = status
+    response.reason = reason
+    response.headers = CaseInsensitiveDict(headers)
+    response.encoding = get_encoding_from_headers(response.headers)
+    response._content = body
+    response._content_consumed = True
+    return response
+
+
+def make_streamed_response(
+    request: PreparedRequest,
+    status: int,
+    reason: str,
+    headers: list[tuple[str, str]],
+    body: Iterable[bytes],
+) -> Response:
+    """
+    Create a Response object, reading the body lazily from an iterable.
+
+    Used by in-process transports, so responses behave exactly like
+    the ones coming from the network (streaming, content decoding,
+    cookies...). The iterable is closed along with the response, if
+    it has a close() method.
+    """
+    raw = HTTPResponse(
+        body=IterableReader(body),
+        headers=headers,
+        status=status,
+        reason=reason,
+        version=11,
+        preload_content=False,
+        request_url=request.url,
+    )
+    response = HTTPAdapter().build_response(request, raw)
+
+    # Cookies are normally extracted from the http.client response
+    message = HTTPMessage()
+    for name, value in headers:
+        message[name] = value
+    response.cookies.extract_cookies(MockResponse(message), MockRequest(request))
+
+    return response
+
+
+def iter_request_body(
+    request: PreparedRequest, chunk_size: int = 64 * 1024
+) -> Iterator[bytes]:
+    """
+    Iterate over the body of a prepared request, one chunk at a time.
+    """
+    body = request.body
+    match body:
+        case None:
+            return
+        case str():
+            yield body.encode()
+        case bytes():
+            yield body
+        case _ if hasattr(body, "read"):
+            while chunk := body.read(chunk_size):
+                yield chunk if isinstance(chunk, bytes) else chunk.encode()
+        case _:
+            for chunk in body:
+                yield chunk if isinstance(chunk, bytes) else chunk.encode()
+
+
+class IterableReader(io.RawIOBase):
+    """
+    Read-only binary file, backed by an iterable of bytes chunks.
+    """
+
+    def __init__(self, iterable: Iterable[bytes]):
+        self._iterable = iterable
+        self._iterator = iter(iterable)
+        self._buffer = b""
+
+    def readable(self) -> bool:
+        return True
+
+    def readinto(self, buffer) -> int:
+        while not self._buffer:
+            try:
+                self._buffer = next(self._iterator)
+            except StopIteration:
+                return 0
+        size = min(len(buffer), len(self._buffer))
+        buffer[:size] = self._buffer[:size]
+        self._buffer = self._buffer[size:]
+        return size
+
+    def close(self):
+        if not self.closed and hasattr(self._iterable, "close"):
+            self._iterable.close()
+        super().close()
+
+
+def write_response_body(
+    resp: Response,
+    output: BinaryIO,
+    chunk_size: int = 64 * 1024,
+    on_progress: Callable[[int], None] | None = None,
+) -> int:
+    """
+    Copy a response body to a binary stream, one chunk at a time.
+
+    ``on_progress`` is called with the size of every chunk written.
+    Returns the total number of bytes written.
+    """
+
+    total = 0
+    for chunk in resp.iter_content(chunk_size=chunk_size):
+        output.write(chunk)
+        total += len(chunk)
+        if on_progress is not None:
+            on_progress(len(chunk))
+    output.flush()
+    return total
 
 
 def dump_request(req: Request) -> bytearray:
@@ -54,6 +244,41 @@ def dump_response(resp: Response) -> bytearray:
     return data
 
 
+def dump_response_head(resp: Response) -> bytearray:
+    """
+    Dump response status line and headers, without reading the body.
+    """
+    prefixes = dump.PrefixSettings("", "")
+    raw = resp.raw
+    data = bytearray()
+
+    # Responses not coming from the network (eg. cached) have no raw
+    # response object: fall back to parsed data.
+    version = dump.HTTP_VERSIONS.get(getattr(raw, "version", 11), b"?")
+    if raw is not None:
+        headers = [
+            (name, value)
+            for name in raw.headers.keys()
+            for value in raw.headers.getlist(name)
+        ]
+    else:
+        headers = list(resp.headers.items())
+
+    data.extend(
+        b"HTTP/"
+        + version
+        + b" "
+        + str(resp.status_code).encode("ascii")
+        + b" "
+        + dump._coerce_to_bytes(resp.reason)
+        + b"\r\n"
+    )
+    for name, value in headers:
+        data.extend(prefixes.response + dump._format_header(name, value))
+    data.extend(b"\r\n")
+    return data
+
+
 def dump_request_text(req: Request) -> str:
     data = dump_request(req)
     return _reqresp_data_to_string(data)
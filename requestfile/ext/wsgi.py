@@ -0,0 +1,174 @@
+"""
+Send requests to a WSGI application, in-process
+
+Responses are returned as requests Response objects, just like the
+ones returned by ext.requests.send(), so the two can be swapped.
+"""
+
+import io
+import sys
+from typing import Callable, Iterable
+from urllib.parse import unquote_to_bytes, urlsplit
+
+from requests import PreparedRequest, Request, Response
+from requests.structures import CaseInsensitiveDict
+
+from requestfile.builder.request import Request as GenericRequest
+
+from .requests import build_requests_request, iter_request_body, make_streamed_response
+
+WSGIApp = Callable[[dict, Callable], Iterable[bytes]]
+
+DEFAULT_PORTS = {"http": "80", "https": "443"}
+
+
+def send_wsgi(
+    req: Request | GenericRequest,
+    app: WSGIApp,
+    stream: bool = False,
+    environ: dict | None = None,
+) -> Response:
+    """
+    Send a request to a WSGI application.
+
+    If ``stream`` is True, the application response is iterated
+    lazily, as the body is consumed. Extra ``environ`` keys are passed
+    to the application along with the ones built from the request.
+    """
+
+    if isinstance(req, GenericRequest):
+        req = build_requests_request(req)
+    prepared = req.prepare()
+
+    wsgi_environ = build_environ(prepared)
+    wsgi_environ.update(environ or {})
+
+    started = {}
+    written = []
+
+    def start_response(status: str, headers: list, exc_info=None):
+        if exc_info is not None and started:
+            raise exc_info[1].with_traceback(exc_info[2])
+        started["status"] = status
+        started["headers"] = headers
+        return written.append
+
+    result = app(wsgi_environ, start_response)
+    body = _ResponseBody(result, written)
+
+    # Applications can defer calling start_response until the first
+    # chunk of the body is produced.
+    try:
+        body.prefetch()
+    except BaseException:
+        body.close()
+        raise
+
+    if not started:
+        body.close()
+        raise RuntimeError("WSGI application did not call start_response()")
+
+    code, _, reason = started["status"].partition(" ")
+    response = make_streamed_response(
+        prepared,
+        status=int(code),
+        reason=reason,
+        headers=started["headers"],
+        body=body,
+    )
+
+    if not stream:
+        # Read the whole body, as requests does for non-streamed responses
+        response.content
+        response.close()
+    return response
+
+
+def build_environ(request: PreparedRequest) -> dict:
+    """
+    Build a WSGI environ dict from a prepared request, as per PEP 3333.
+    """
+
+    url = urlsplit(request.url)
+    body = b"".join(iter_request_body(request))
+
+    environ = {
+        "REQUEST_METHOD": request.method,
+        "SCRIPT_NAME": "",
+        "PATH_INFO": unquote_to_bytes(url.path or "/").decode("latin-1"),
+        "QUERY_STRING": url.query,
+        "SERVER_NAME": url.hostname or "localhost",
+        "SERVER_PORT": str(url.port or DEFAULT_PORTS.get(url.scheme, "80")),
+        "SERVER_PROTOCOL": "HTTP/1.1",
+        "REMOTE_ADDR": "127.0.0.1",
+        "wsgi.version": (1, 0),
+        "wsgi.url_scheme": url.scheme,
+        "wsgi.input": io.BytesIO(body),
+        "wsgi.errors": sys.stderr,
+        "wsgi.multithread": False,
+        "wsgi.multiprocess": False,
+        "wsgi.run_once": False,
+    }
+
+    headers = CaseInsensitiveDict({"Host": url.netloc})
+    headers.update(request.headers)
+
+    for name, value in headers.items():
+        key = name.upper().replace("-", "_")
+        if key not in ("CONTENT_TYPE", "CONTENT_LENGTH", "TRANSFER_ENCODING"):
+            environ[f"HTTP_{key}"] = _decode_header_value(value)
+
+    if "Content-Type" in request.headers:
+        environ["CONTENT_TYPE"] = _decode_header_value(request.headers["Content-Type"])
+
+    # WSGI has no support for chunked request bodies: the body is
+    # read in full, so its length is always known.
+    if request.body is not None:
+        environ["CONTENT_LENGTH"] = str(len(body))
+
+    return environ
+
+
+class _ResponseBody:
+    """
+    WSGI application response, including data passed to write().
+    """
+
+    def __init__(self, result: Iterable[bytes], written: list[bytes]):
+        self._result = result
+        self._iterator = iter(result)
+        self._written = written
+        self._pending: list[bytes] = []
+
+    def prefetch(self):
+        """Read chunks until the first non-empty one, or the end"""
+        for chunk in self._iterator:
+            self._pending.append(chunk)
+            if chunk:
+                break
+
+    def __iter__(self):
+        yield from self._drain()
+        for chunk in self._iterator:
+            yield from self._drain()
+            yield chunk
+        yield from self._drain()
+
+    def _drain(self):
+        # Data passed to write() comes before the chunk returned by
+        # the application iterator right after.
+        chunks = self._written + self._pending
+        self._written.clear()
+        self._pending = []
+        yield from chunks
+
+    def close(self):
+        if hasattr(self._result, "close"):
+            self._result.close()
+
+
+def _decode_header_value(value: str | bytes) -> str:
+    # PEP 3333 environ values are latin-1 "native strings"
+    if isinstance(value, bytes):
+        return value.decode("latin-1")
+    return value
@@ -6,6 +6,7 @@ from requestfile.parser import quote_value
 from .ast import (
     Argument,
     Command,
+    Comment,
     Filter,
     Header,
     Heredoc,
@@ -13,12 +14,14 @@ from .ast import (
     QuotedValue,
     RawData,
     Requestfile,
+    Requestline,
     Symbol,
     Variable,
 )
 
 AstObject: TypeAlias = (
     Requestfile
+    | Requestline
     | Command
     | Argument
     | Symbol
@@ -29,14 +32,24 @@ AstObject: TypeAlias = (
     | Filter
     | Header
     | RawData
+    | Comment
 )
 
 
 def format_requestfile(requestfile: Requestfile, stream: TextIO):
     for item in requestfile.preamble:
-        _format_command(item, stream)
+        match item:
+            case Command(_):
+                _format_command(item, stream)
+            case Comment(value):
+                stream.write(f"# {value}\n")
+            case RawData(value):
+                stream.write(f"{value}\n")
+            case _:
+                # Unreachable!
+                raise TypeError(f"Unsupported preamble item: {item}")
 
-    stream.write(f"{requestfile.method} {requestfile.url}\n")
+    _format_requestline(requestfile.requestline, stream)
 
     for item in requestfile.headers:
         match item:
@@ -44,6 +57,8 @@ def format_requestfile(requestfile: Requestfile, stream: TextIO):
                 stream.write(f"{name}: {value}\n")
             case Command(_):
                 _format_command(item, stream)
+            case Comment(value):
+                stream.write(f"# {value}\n")
             case _:
                 # Unreachable!
                 raise TypeError(f"Unsupported header item: {item}")
@@ -64,9 +79,11 @@ def format_requestfile(requestfile: Requestfile, stream: TextIO):
             case RawData(value):
                 stream.write(value)
                 stream.write("\n")
+            case Comment(value):
+                stream.write(f"# {value}\n")
             case _:
                 # Unreachable!
-                raise TypeError(f"Unsupported header item: {item}")
+                raise TypeError(f"Unsupported body item: {item}")
 
 
 def _format_ast_object(obj: AstObject) -> str:
@@ -88,11 +105,13 @@ def _format_ast_object(obj: AstObject) -> str:
 
         case (
             Requestfile(_)
+            | Requestline(_)
             | Command(_)
             | Argument(_)
             | Filter(_)
             | Header(_)
             | RawData(_)
+            | Comment(_)
         ):
             raise TypeError(f"Unsupported {obj} - use specific function")
 
@@ -101,17 +120,24 @@ def _format_ast_object(obj: AstObject) -> str:
             raise TypeError(f"Unsupported AST object: {obj}")
 
 
+def _format_requestline(requestline: Requestline, stream: TextIO):
+    stream.write(f"{requestline.method} {_format_argument(requestline.url_arg)}\n")
+    _format_heredocs([requestline.url_arg], stream)
+
+
 def _format_command(cmd: Command, stream: TextIO):
-    stream.write(f"%{cmd.name}:")
+    stream.write(f"%{cmd.name.upper()}:")
 
     # Write arguments
     for arg in cmd.arguments:
         stream.write(" ")
         stream.write(_format_argument(arg))
     stream.write("\n")
+    _format_heredocs(cmd.arguments, stream)
 
-    # Write heredoc values
-    for arg in cmd.arguments:
+
+def _format_heredocs(arguments: list[Argument], stream: TextIO):
+    for arg in arguments:
         if isinstance(heredoc := arg.value, Heredoc):
             if heredoc.value is not None:
                 stream.write(heredoc.value)
@@ -0,0 +1,276 @@
+"""
+Convert HAR captures into Requestfiles
+
+The HAR file is read incrementally, one entry at a time, so captures
+of any size can be converted with bounded memory: each entry is
+turned into a Requestfile AST and written out before the next one is
+read. Large and binary bodies are written to separate files, which
+the Requestfile includes.
+"""
+
+import base64
+import os
+import re
+from typing import Callable, Iterator, TextIO
+from urllib.parse import parse_qsl, urlsplit, urlunsplit
+
+from .ast import (
+    Argument,
+    Command,
+    Comment,
+    Filter,
+    Header,
+    Heredoc,
+    IncludedFile,
+    QuotedValue,
+    RawData,
+    Requestfile,
+    Requestline,
+    Symbol,
+)
+from .formatting import format_requestfile
+from .utils.jsonstream import DEFAULT_CHUNK_SIZE, JsonStreamReader
+
+# Bodies larger than this (in bytes) are written to separate files
+DEFAULT_INLINE_LIMIT = 4096
+
+# Same as the SYMBOL terminal in the grammar: values matching it can
+# be written without quotes.
+RE_SYMBOL = re.compile(r"[a-zA-Z_/]([a-zA-Z0-9_:/.-]*[a-zA-Z0-9_/])?")
+
+# Header names that can be written as plain header lines
+RE_HEADER_NAME = re.compile(r"[a-zA-Z0-9!$&'*+.^_`|~-]+")
+
+# Headers computed when sending the request
+SKIPPED_HEADERS = {"content-length"}
+
+FORM_MIMETYPE = "application/x-www-form-urlencoded"
+MULTIPART_MIMETYPE = "multipart/form-data"
+
+# Callback writing data to a file: takes a file name suffix and the
+# data, returns the path to reference it by.
+WriteFile = Callable[[str, bytes], str]
+
+
+def iter_har_entries(
+    stream: TextIO, chunk_size: int = DEFAULT_CHUNK_SIZE
+) -> Iterator[dict]:
+    """Read entries from a HAR file, one at a time"""
+    reader = JsonStreamReader(stream, chunk_size)
+    for key in reader.iter_object():
+        if key != "log":
+            reader.read_value()
+            continue
+        for key in reader.iter_object():
+            if key != "entries":
+                reader.read_value()
+                continue
+            for _ in reader.iter_array():
+                yield reader.read_value()
+
+
+def har_entry_to_requestfile(
+    entry: dict,
+    write_file: WriteFile | None = None,
+    inline_limit: int = DEFAULT_INLINE_LIMIT,
+) -> Requestfile:
+    """
+    Convert a HAR entry to a Requestfile.
+
+    Bodies larger than ``inline_limit`` bytes, or binary, are passed
+    to ``write_file`` and included from there; without ``write_file``,
+    binary bodies are inlined as base64.
+
+    Note that inlined text bodies get a final newline, as any text
+    body in a Requestfile.
+    """
+
+    request = entry["request"]
+    method = request["method"].upper()
+    if not method.isalpha():
+        raise ValueError(f"Unsupported HTTP method: {method}")
+
+    requestfile = Requestfile()
+    if started := entry.get("startedDateTime"):
+        requestfile.preamble.append(Comment(f"Recorded at {_one_line(started)}"))
+    if status := entry.get("response", {}).get("status"):
+        text = entry["response"].get("statusText", "")
+        requestfile.preamble.append(Comment(_one_line(f"Response: {status} {text}")))
+    if requestfile.preamble:
+        requestfile.preamble.append(RawData(""))
+
+    scheme, netloc, path, query, _ = urlsplit(request["url"])
+    url = urlunsplit((scheme, netloc, path, "", ""))
+    requestfile.requestline = Requestline(method, Argument(None, _make_value(url)))
+
+    for name, value in parse_qsl(query, keep_blank_values=True):
+        requestfile.headers.append(_make_command("param", name, value))
+
+    post_data = request.get("postData") or {}
+    mimetype = post_data.get("mimeType", "").partition(";")[0].strip().lower()
+    params = post_data.get("params") or []
+    encoded = mimetype == FORM_MIMETYPE or (
+        mimetype == MULTIPART_MIMETYPE and bool(params)
+    )
+    if mimetype == FORM_MIMETYPE:
+        body = _get_form_body(post_data)
+    elif encoded:
+        body = [
+            _get_part(param, write_file, inline_limit, n)
+            for n, param in enumerate(params, 1)
+        ]
+    else:
+        body = _get_raw_body(post_data, write_file, inline_limit)
+
+    cookies = request.get("cookies") or []
+    for header in request.get("headers", []):
+        name, value = header["name"], header["value"]
+        match name.lower():
+            case lower if lower.startswith(":") or lower in SKIPPED_HEADERS:
+                continue
+            case "host" if value.lower() == netloc.lower():
+                continue
+            case "cookie" if cookies:
+                continue
+            case "content-type" if encoded:
+                # Set when encoding the form, with a new boundary
+                continue
+        requestfile.headers.append(_make_header(name, value))
+
+    for cookie in cookies:
+        requestfile.headers.append(
+            _make_command("cookie", cookie["name"], cookie["value"])
+        )
+
+    requestfile.body = body
+    return requestfile
+
+
+def import_har(
+    stream: TextIO,
+    output_dir: str,
+    inline_limit: int = DEFAULT_INLINE_LIMIT,
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+) -> Iterator[str]:
+    """
+    Convert each entry of a HAR file to a Requestfile in
+    ``output_dir``, along with any files it includes.
+
+    Entries are converted as this is iterated, yielding the path of
+    each Requestfile written.
+    """
+
+    os.makedirs(output_dir, exist_ok=True)
+    for index, entry in enumerate(iter_har_entries(stream, chunk_size), 1):
+        name = _get_filename(index, entry["request"])
+
+        def write_file(suffix: str, data: bytes, name=name) -> str:
+            with open(os.path.join(output_dir, f"{name}.{suffix}"), "wb") as fp:
+                fp.write(data)
+            return f"{name}.{suffix}"
+
+        requestfile = har_entry_to_requestfile(entry, write_file, inline_limit)
+        path = os.path.join(output_dir, name)
+        with open(path, "w", encoding="utf-8") as fp:
+            format_requestfile(requestfile, fp)
+        yield path
+
+
+def _get_form_body(post_data: dict) -> list:
+    if (text := post_data.get("text")) is not None:
+        fields = parse_qsl(text, keep_blank_values=True)
+    else:
+        fields = [(p["name"], p.get("value", "")) for p in post_data["params"]]
+    return [_make_command("field", name, value) for name, value in fields]
+
+
+def _get_part(
+    param: dict, write_file: WriteFile | None, inline_limit: int, n: int
+) -> Command:
+    arguments = [Argument(None, _make_value(param["name"]))]
+    if mimetype := param.get("contentType"):
+        arguments.append(Argument("mimetype", QuotedValue(mimetype)))
+    if filename := param.get("fileName"):
+        arguments.append(Argument("filename", QuotedValue(filename)))
+
+    value = param.get("value", "")
+    if write_file is not None and len(value.encode()) > inline_limit:
+        path = write_file(f"part{n}", value.encode())
+        arguments.append(Argument(None, IncludedFile(QuotedValue(path))))
+    else:
+        arguments.append(Argument(None, QuotedValue(value)))
+    return Command("part", arguments)
+
+
+def _get_raw_body(
+    post_data: dict, write_file: WriteFile | None, inline_limit: int
+) -> list:
+    text = post_data.get("text")
+    if not text:
+        return []
+
+    data: bytes | None = None
+    if post_data.get("encoding") == "base64":
+        data = base64.b64decode(text)
+        try:
+            text = data.decode()
+        except UnicodeDecodeError:
+            text = None
+
+    if text is None or len(text.encode()) > inline_limit or "\r" in text:
+        # Written as is, byte for byte
+        if data is None:
+            data = text.encode()
+        if write_file is not None:
+            path = write_file("body", data)
+            return [
+                Command("include", [Argument(None, IncludedFile(QuotedValue(path)))])
+            ]
+        value = QuotedValue(base64.b64encode(data).decode())
+        return [Command("include", [Argument(None, value, [Filter("from-base64")])])]
+
+    # Trailing newline is added back when building the body
+    text = text.removesuffix("\n")
+    lines = text.split("\n")
+    if all(line.isprintable() and line == line.rstrip() for line in lines):
+        marker = _get_marker(lines)
+        return [Command("include", [Argument(None, Heredoc(marker, text))])]
+    return [Command("include", [Argument(None, QuotedValue(text))])]
+
+
+def _get_marker(lines: list[str]) -> str:
+    marker, n = "EOF", 1
+    while marker in lines:
+        marker, n = f"EOF{n}", n + 1
+    return marker
+
+
+def _make_header(name: str, value: str) -> Header | Command:
+    if (
+        RE_HEADER_NAME.fullmatch(name)
+        and value == value.strip()
+        and value.isprintable()
+    ):
+        return Header(name, value)
+    return _make_command("header", name, value)
+
+
+def _make_command(name: str, *values: str) -> Command:
+    return Command(name, [Argument(None, _make_value(value)) for value in values])
+
+
+def _make_value(value: str) -> Symbol | QuotedValue:
+    if RE_SYMBOL.fullmatch(value):
+        return Symbol(value)
+    return QuotedValue(value)
+
+
+def _get_filename(index: int, request: dict) -> str:
+    """File name for a request: index, method, host and path"""
+    _, netloc, path, _, _ = urlsplit(request["url"])
+    slug = re.sub(r"[^a-zA-Z0-9]+", "-", f"{netloc}{path}").strip("-")[:60]
+    return f"{index:05d}-{request['method'].lower()}-{slug}".rstrip("-")
+
+
+def _one_line(text: str) -> str:
+    return " ".join(str(text).split())
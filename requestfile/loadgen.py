@@ -0,0 +1,445 @@
+"""
+Open-loop load generation
+
+Requests are sent at a fixed (or linearly ramping) arrival rate,
+regardless of how long responses take: a slow server doesn't slow
+down the generator, so stalls show up in the latency distribution
+instead of being hidden by fewer requests being sent.
+
+Latency is measured from the time each request was *meant* to be
+sent, so delays in the generator itself are accounted for too
+("coordinated omission" correction). Sends happening later than
+intended are reported, as they indicate the generator can't keep up.
+Requests dropped because too many are already in flight are recorded
+as timing out.
+"""
+
+import asyncio
+import math
+import multiprocessing
+import queue
+import time
+from dataclasses import dataclass, field
+from itertools import islice
+from typing import Any, Callable, Iterator
+
+import aiohttp
+
+from .analysis import analyze_requestfile
+from .ast import Requestfile
+from .builder import build_request
+from .builder.builder import get_resource_root
+from .builder.request import Request
+from .builder.resource_loader import (
+    BaseResourceLoader,
+    ResourceLoader,
+    SharedResourceLoader,
+    map_resources,
+)
+from .ext.aiohttp import build_aiohttp_request, has_streamed_body
+from .utils.histogram import Histogram
+
+# Sends later than this (in seconds) count as the generator lagging
+DEFAULT_LAG_TOLERANCE = 0.005
+
+# How often to check on worker processes, in seconds
+WORKER_POLL_INTERVAL = 1.0
+
+
+@dataclass(slots=True)
+class LoadStats:
+    """Statistics for a load run, or a reporting interval of it"""
+
+    # Latency of completed requests, in microseconds; dropped requests
+    # are recorded as taking the whole timeout
+    latency: Histogram = field(default_factory=Histogram)
+
+    # Number of requests sent
+    sent: int = 0
+
+    # Number of responses received, by status code
+    statuses: dict[int, int] = field(default_factory=dict)
+
+    # Number of failed requests, by exception type
+    errors: dict[str, int] = field(default_factory=dict)
+
+    # Requests not sent, as too many were already in flight
+    dropped: int = 0
+
+    # Requests sent later than intended, by more than the tolerance
+    late: int = 0
+
+    # Highest delay between intended and actual send time, in seconds
+    max_lag: float = 0.0
+
+    # Seconds since the start of the run, at the end of the interval
+    elapsed: float = 0.0
+
+    @property
+    def completed(self) -> int:
+        return sum(self.statuses.values()) + sum(self.errors.values())
+
+    @property
+    def failed(self) -> int:
+        return sum(self.errors.values()) + sum(
+            count for status, count in self.statuses.items() if status >= 400
+        )
+
+    def merge(self, other: "LoadStats"):
+        self.latency.merge(other.latency)
+        self.sent += other.sent
+        for status, count in other.statuses.items():
+            self.statuses[status] = self.statuses.get(status, 0) + count
+        for error, count in other.errors.items():
+            self.errors[error] = self.errors.get(error, 0) + count
+        self.dropped += other.dropped
+        self.late += other.late
+        self.max_lag = max(self.max_lag, other.max_lag)
+        self.elapsed = max(self.elapsed, other.elapsed)
+
+
+def iter_schedule(
+    rate: float,
+    duration: float,
+    end_rate: float | None = None,
+) -> Iterator[float]:
+    """
+    Generate intended send times, in seconds from the start.
+
+    With ``end_rate``, the rate changes linearly from ``rate`` to
+    ``end_rate`` over ``duration``.
+    """
+
+    if rate < 0 or (end_rate is not None and end_rate < 0):
+        raise ValueError("Rate cannot be negative")
+    if duration <= 0:
+        raise ValueError("Duration must be positive")
+
+    slope = 0.0 if end_rate is None else (end_rate - rate) / duration
+
+    for index in range(math.ceil(_total_requests(rate, slope, duration))):
+        # Solve for t: rate * t + slope * t^2 / 2 = index
+        if slope == 0:
+            offset = index / rate
+        else:
+            offset = (math.sqrt(rate * rate + 2 * slope * index) - rate) / slope
+        if offset >= duration:
+            return
+        yield offset
+
+
+def _total_requests(rate: float, slope: float, duration: float) -> float:
+    return rate * duration + slope * duration * duration / 2
+
+
+async def run_load_async(
+    request: Request,
+    rate: float,
+    duration: float,
+    end_rate: float | None = None,
+    max_in_flight: int = 10_000,
+    timeout: float = 30.0,
+    interval: float = 1.0,
+    on_interval: Callable[[LoadStats], None] | None = None,
+    lag_tolerance: float = DEFAULT_LAG_TOLERANCE,
+    schedule: Iterator[float] | None = None,
+    start_time: float | None = None,
+) -> LoadStats:
+    """
+    Send a request repeatedly, at the given arrival rate.
+
+    ``on_interval`` is called every ``interval`` seconds, with stats
+    for requests completed during that interval.
+
+    A custom ``schedule`` of send times can be passed, eg. a slice of
+    the full schedule. ``start_time`` is a time.time() timestamp at
+    which to start, to synchronize multiple generators.
+
+    Returns stats for the whole run.
+    """
+
+    if schedule is None:
+        schedule = iter_schedule(rate, duration, end_rate)
+
+    # Streamed bodies can only be read once: prepare them for every
+    # request; otherwise, prepare the request once and reuse it.
+    kwargs = build_aiohttp_request(request)
+    reuse_kwargs = not has_streamed_body(request)
+    loop = asyncio.get_running_loop()
+
+    # Convert wall clock start time to event loop time
+    start = loop.time()
+    if start_time is not None:
+        start += max(0.0, start_time - time.time())
+
+    total = LoadStats()
+    current = LoadStats()
+    in_flight: set[asyncio.Task] = set()
+
+    async def _send(session: aiohttp.ClientSession, intended: float):
+        try:
+            request_kwargs = kwargs if reuse_kwargs else build_aiohttp_request(request)
+            async with session.request(**request_kwargs) as response:
+                await response.read()
+        except Exception as exc:
+            _increment(current.errors, type(exc).__name__)
+        else:
+            _increment(current.statuses, response.status)
+        current.latency.record(round((loop.time() - intended) * 1_000_000))
+
+    def _flush_interval():
+        nonlocal current
+        current.elapsed = loop.time() - start
+        total.merge(current)
+        if on_interval is not None:
+            on_interval(current)
+        current = LoadStats()
+
+    async def _report():
+        next_report = start + interval
+        while True:
+            await asyncio.sleep(max(0.0, next_report - loop.time()))
+            _flush_interval()
+            next_report += interval
+
+    connector = aiohttp.TCPConnector(limit=max_in_flight)
+    client_timeout = aiohttp.ClientTimeout(total=timeout)
+    async with aiohttp.ClientSession(
+        connector=connector, timeout=client_timeout
+    ) as session:
+        reporter = asyncio.create_task(_report())
+        try:
+            for offset in schedule:
+                intended = start + offset
+                # Always yield to the event loop, so that requests
+                # in flight make progress even when running behind
+                await asyncio.sleep(max(0.0, intended - loop.time()))
+
+                lag = loop.time() - intended
+                current.max_lag = max(current.max_lag, lag)
+                if lag > lag_tolerance:
+                    current.late += 1
+
+                if len(in_flight) >= max_in_flight:
+                    # Not sent, as the server is stalling: leaving it out
+                    # of the latency distribution would hide the stall.
+                    # Count it as having timed out, at best.
+                    current.dropped += 1
+                    current.latency.record(round(timeout * 1_000_000))
+                    continue
+
+                current.sent += 1
+                task = asyncio.create_task(_send(session, intended))
+                in_flight.add(task)
+                task.add_done_callback(in_flight.discard)
+
+            if in_flight:
+                await asyncio.wait(in_flight)
+        finally:
+            reporter.cancel()
+            for task in in_flight:
+                task.cancel()
+
+    _flush_interval()
+    return total
+
+
+def run_load(request: Request, rate: float, duration: float, **kwargs) -> LoadStats:
+    """Synchronous version of run_load_async()"""
+    return asyncio.run(run_load_async(request, rate, duration, **kwargs))
+
+
+def run_load_processes(
+    requestfile: Requestfile,
+    processes: int,
+    rate: float,
+    duration: float,
+    end_rate: float | None = None,
+    variables: dict[str, str | bytes] | None = None,
+    resource_loader: BaseResourceLoader | None = None,
+    max_in_flight: int = 10_000,
+    interval: float = 1.0,
+    on_interval: Callable[[LoadStats], None] | None = None,
+    **kwargs,
+) -> LoadStats:
+    """
+    Generate load from multiple processes, forked from this one.
+
+    Each process builds the request once, and sends its share of the
+    schedule (every N-th request). Included files are read once and
+    kept in shared memory, so large payloads aren't copied for every
+    process. Stats are sent back every ``interval`` and merged, so
+    ``on_interval`` gets stats for all processes combined.
+
+    ``max_in_flight`` is split evenly between processes. Other
+    arguments are passed to run_load_async(). Requires fork(), so
+    it's not available on Windows.
+    """
+
+    context = multiprocessing.get_context("fork")
+
+    if resource_loader is None:
+        resource_loader = ResourceLoader(get_resource_root(requestfile))
+    includes = analyze_requestfile(requestfile).includes
+    shared_loader = SharedResourceLoader(
+        resource_loader, map_resources(resource_loader, includes)
+    )
+
+    events = context.Queue()
+    start_event = context.Event()
+    start_time = context.Value("d", 0.0)
+
+    worker_kwargs = dict(
+        kwargs,
+        end_rate=end_rate,
+        max_in_flight=max(1, max_in_flight // processes),
+        interval=interval,
+    )
+    workers = [
+        context.Process(
+            target=_run_worker,
+            args=(index, processes, events, start_event, start_time),
+            kwargs=dict(
+                requestfile=requestfile,
+                variables=variables,
+                resource_loader=shared_loader,
+                rate=rate,
+                duration=duration,
+                load_kwargs=worker_kwargs,
+            ),
+            name=f"requestfile-load-{index}",
+            daemon=True,
+        )
+        for index in range(processes)
+    ]
+    for worker in workers:
+        worker.start()
+
+    merger = _IntervalMerger(processes, on_interval)
+    ready: set[int] = set()
+    totals: dict[int, LoadStats] = {}
+
+    try:
+        while len(totals) < processes:
+            try:
+                kind, index, payload = events.get(timeout=WORKER_POLL_INTERVAL)
+            except queue.Empty:
+                for index, worker in enumerate(workers):
+                    if index not in totals and not worker.is_alive():
+                        raise RuntimeError(
+                            f"Load worker {index} exited unexpectedly "
+                            f"(exit code {worker.exitcode})"
+                        )
+                continue
+
+            match kind:
+                case "ready":
+                    # Start all workers at the same time, once they're
+                    # all done building the request.
+                    ready.add(index)
+                    if len(ready) == processes:
+                        start_time.value = time.time()
+                        start_event.set()
+                case "interval":
+                    merger.add(index, payload)
+                case "done":
+                    totals[index] = payload
+                    merger.finish(index)
+                case "error":
+                    raise RuntimeError(f"Load worker {index} failed: {payload}")
+    finally:
+        for worker in workers:
+            if worker.is_alive():
+                worker.terminate()
+            worker.join()
+
+    total = LoadStats()
+    for stats in totals.values():
+        total.merge(stats)
+    return total
+
+
+def _run_worker(
+    index: int,
+    count: int,
+    events: Any,
+    start_event: Any,
+    start_time: Any,
+    requestfile: Requestfile,
+    variables: dict[str, str | bytes] | None,
+    resource_loader: BaseResourceLoader,
+    rate: float,
+    duration: float,
+    load_kwargs: dict,
+):
+    try:
+        request = build_request(
+            requestfile,
+            variables=variables,
+            resource_loader=resource_loader,
+            stream=True,
+        )
+        schedule = islice(
+            iter_schedule(rate, duration, load_kwargs.get("end_rate")),
+            index,
+            None,
+            count,
+        )
+
+        events.put(("ready", index, None))
+        start_event.wait()
+
+        total = run_load(
+            request,
+            rate,
+            duration,
+            schedule=schedule,
+            start_time=start_time.value,
+            on_interval=lambda stats: events.put(("interval", index, stats)),
+            **load_kwargs,
+        )
+        events.put(("done", index, total))
+
+    except Exception as exc:
+        events.put(("error", index, f"{type(exc).__name__}: {exc}"))
+
+
+class _IntervalMerger:
+    """
+    Merge per-interval stats from multiple workers.
+
+    Workers start at the same time and report at the same interval,
+    so their n-th reports cover the same period. A merged interval is
+    reported once all workers that are still running reported it.
+    """
+
+    def __init__(self, workers: int, on_interval: Callable[[LoadStats], None] | None):
+        self.on_interval = on_interval
+        self.reported = [0] * workers
+        self.finished: set[int] = set()
+        self.pending: dict[int, LoadStats] = {}
+        self.next_interval = 0
+
+    def add(self, worker: int, stats: LoadStats):
+        interval = self.reported[worker]
+        self.reported[worker] += 1
+        self.pending.setdefault(interval, LoadStats()).merge(stats)
+        self._flush()
+
+    def finish(self, worker: int):
+        self.finished.add(worker)
+        self._flush()
+
+    def _flush(self):
+        while self.next_interval in self.pending and all(
+            reported > self.next_interval or worker in self.finished
+            for worker, reported in enumerate(self.reported)
+        ):
+            stats = self.pending.pop(self.next_interval)
+            self.next_interval += 1
+            if self.on_interval is not None:
+                self.on_interval(stats)
+
+
+def _increment(counts: dict, key):
+    counts[key] = counts.get(key, 0) + 1
@@ -0,0 +1,342 @@
+"""
+Fetch all the pages of a paginated collection
+
+Next pages are found via the ``Link: <...>; rel="next"`` response
+header, a URL or cursor in the JSON body, or by incrementing a page
+number or offset in the query string. Pages are yielded as they
+arrive; when their URLs are predictable (page numbers and offsets),
+several are fetched concurrently, ahead of time.
+"""
+
+import dataclasses
+import itertools
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Any, Callable, Iterator
+from urllib.parse import unquote_plus, urljoin, urlsplit
+
+from multidict import MultiDict
+from requests import Response
+
+from .builder.request import Request
+from .workflow import get_json_path
+
+# Follow the URL in the Link header, with rel="next"
+PAGINATION_LINK = "link"
+
+# Follow the URL found at a JSON path in the body
+PAGINATION_NEXT = "next"
+
+# Pass the value found at a JSON path in the body as a query parameter
+PAGINATION_CURSOR = "cursor"
+
+# Increment a page number query parameter
+PAGINATION_PAGE = "page"
+
+# Increment an offset query parameter by the page size
+PAGINATION_OFFSET = "offset"
+
+PAGINATION_MODES = (
+    PAGINATION_LINK,
+    PAGINATION_NEXT,
+    PAGINATION_CURSOR,
+    PAGINATION_PAGE,
+    PAGINATION_OFFSET,
+)
+
+# Modes where the URL of any page is known in advance
+PREDICTABLE_MODES = (PAGINATION_PAGE, PAGINATION_OFFSET)
+
+
+@dataclass(slots=True)
+class PaginationRule:
+    # How to get to the next page: one of PAGINATION_MODES
+    mode: str
+
+    # Query parameter holding the cursor, page number or offset
+    param: str | None = None
+
+    # JSON path of the next URL or cursor, in the response body
+    path: str | None = None
+
+    # First page number, or offset
+    start: int = 0
+
+    # Page size, for offsets
+    step: int = 1
+
+    # JSON path of the list of items in each page. A page with no
+    # items marks the end of the collection.
+    items: str | None = None
+
+
+@dataclass(slots=True)
+class Page:
+    # Position of the page, counting from 1
+    number: int
+    request: Request
+    response: Response | None = None
+    error: Exception | None = None
+    elapsed: float = 0.0
+
+    @property
+    def ok(self) -> bool:
+        return self.error is None and self.response is not None and self.response.ok
+
+
+def parse_pagination_rule(text: str, items: str | None = None) -> PaginationRule:
+    """
+    Parse a pagination rule, written as one of:
+
+    - ``link``
+    - ``next:<json path>``
+    - ``cursor:<param>=<json path>``
+    - ``page:<param>[=<start>]`` (start defaults to 1)
+    - ``offset:<param>=<page size>[,<start>]`` (start defaults to 0)
+    """
+
+    mode, _, spec = text.partition(":")
+    param, sep, value = spec.partition("=")
+    try:
+        match mode:
+            case "link" if not spec:
+                return PaginationRule(PAGINATION_LINK, items=items)
+            case "next" if spec:
+                return PaginationRule(PAGINATION_NEXT, path=spec, items=items)
+            case "cursor" if param and value:
+                return PaginationRule(
+                    PAGINATION_CURSOR, param=param, path=value, items=items
+                )
+            case "page" if param:
+                start = int(value) if sep else 1
+                return PaginationRule(
+                    PAGINATION_PAGE, param=param, start=start, items=items
+                )
+            case "offset" if param and value:
+                step, _, start = value.partition(",")
+                return PaginationRule(
+                    PAGINATION_OFFSET,
+                    param=param,
+                    step=int(step),
+                    start=int(start or 0),
+                    items=items,
+                )
+    except ValueError:
+        pass
+    raise ValueError(f"Invalid pagination rule: {text}")
+
+
+def paginate(
+    request: Request,
+    rule: PaginationRule,
+    send: Callable[[Request], Response],
+    max_pages: int | None = None,
+    prefetch: int = 4,
+) -> Iterator[Page]:
+    """
+    Send a request, and then requests for all the following pages,
+    yielding each page in order as soon as it's available.
+
+    Stops after a page without a next one, or without items; after a
+    page failing with an error or an unsuccessful status; or after
+    ``max_pages`` pages. With page numbers and offsets, a 404 response
+    also marks the end of the collection.
+
+    For page numbers and offsets, up to ``prefetch`` pages are fetched
+    concurrently: ``send`` must then be thread-safe.
+    """
+
+    if rule.mode in PREDICTABLE_MODES and prefetch > 1:
+        yield from _paginate_predictable(request, rule, send, max_pages, prefetch)
+    else:
+        yield from _paginate_sequential(request, rule, send, max_pages)
+
+
+def get_page_request(request: Request, rule: PaginationRule, number: int) -> Request:
+    """Request for a page, when pages are predictable"""
+    if rule.mode == PAGINATION_PAGE:
+        value = rule.start + number - 1
+    else:
+        value = rule.start + (number - 1) * rule.step
+    return _with_param(request, rule.param, str(value))
+
+
+def _paginate_sequential(
+    request: Request,
+    rule: PaginationRule,
+    send: Callable[[Request], Response],
+    max_pages: int | None,
+) -> Iterator[Page]:
+    seen = set()
+    if rule.mode in PREDICTABLE_MODES:
+        request = get_page_request(request, rule, 1)
+
+    for number in itertools.count(1):
+        page = _fetch_page(number, request, send)
+        if _is_end(page, rule):
+            return
+        yield page
+
+        if not page.ok or number == max_pages:
+            return
+        if rule.mode in PREDICTABLE_MODES:
+            if _is_short(page, rule):
+                return
+            request = get_page_request(request, rule, number + 1)
+            continue
+
+        request = _get_next_request(page, rule)
+        if request is None:
+            return
+        key = (request.url, tuple(request.params.items()))
+        if key in seen:
+            raise ValueError(f"Pagination loop, at page {number}: {request.url}")
+        seen.add(key)
+
+
+def _paginate_predictable(
+    request: Request,
+    rule: PaginationRule,
+    send: Callable[[Request], Response],
+    max_pages: int | None,
+    prefetch: int,
+) -> Iterator[Page]:
+    numbers = itertools.count(1)
+    if max_pages is not None:
+        numbers = iter(range(1, max_pages + 1))
+
+    pool = ThreadPoolExecutor(max_workers=prefetch)
+    pending = deque()
+
+    def _submit():
+        if (number := next(numbers, None)) is not None:
+            page_request = get_page_request(request, rule, number)
+            pending.append(pool.submit(_fetch_page, number, page_request, send))
+
+    try:
+        for _ in range(prefetch):
+            _submit()
+        while pending:
+            page = pending.popleft().result()
+            if _is_end(page, rule):
+                return
+            yield page
+            if not page.ok or _is_short(page, rule):
+                return
+            _submit()
+    finally:
+        # Pages past the end might still be in flight: don't wait
+        pool.shutdown(wait=False, cancel_futures=True)
+
+
+def _fetch_page(
+    number: int, request: Request, send: Callable[[Request], Response]
+) -> Page:
+    page = Page(number, request)
+    started = time.monotonic()
+    try:
+        page.response = send(request)
+    except Exception as exc:
+        page.error = exc
+    page.elapsed = time.monotonic() - started
+    return page
+
+
+def _is_end(page: Page, rule: PaginationRule) -> bool:
+    """Whether a page is past the end of the collection"""
+    response = page.response
+    if response is None:
+        return False
+    if response.status_code == 404 and rule.mode in PREDICTABLE_MODES:
+        return True
+    if not response.ok:
+        return False
+
+    if rule.items is not None:
+        return not _get_items(response, rule.items)
+    if rule.mode in PREDICTABLE_MODES:
+        # Without knowing where the items are: an empty body, or an
+        # empty JSON list or object
+        if not response.content.strip():
+            return True
+        try:
+            return response.json() in ([], {})
+        except ValueError:
+            return False
+    return False
+
+
+def _is_short(page: Page, rule: PaginationRule) -> bool:
+    """Whether a page has fewer items than the page size"""
+    if rule.mode != PAGINATION_OFFSET or rule.items is None:
+        return False
+    return len(_get_items(page.response, rule.items)) < rule.step
+
+
+def _get_items(response: Response, path: str) -> Any:
+    try:
+        return get_json_path(response.json(), path)
+    except ValueError:
+        return []
+
+
+def _get_next_request(page: Page, rule: PaginationRule) -> Request | None:
+    response = page.response
+
+    if rule.mode == PAGINATION_LINK:
+        if (link := response.links.get("next")) is None:
+            return None
+        return _with_url(page.request, urljoin(response.url, link["url"]))
+
+    if rule.mode == PAGINATION_NEXT:
+        if (url := _get_json_value(response, rule.path)) is None:
+            return None
+        return _with_url(page.request, urljoin(response.url, url))
+
+    if rule.mode == PAGINATION_CURSOR:
+        if (cursor := _get_json_value(response, rule.path)) is None:
+            return None
+        return _with_param(page.request, rule.param, cursor)
+
+    # Unreachable
+    raise ValueError(f"Unsupported pagination mode: {rule.mode}")
+
+
+def _get_json_value(response: Response, path: str) -> str | None:
+    """Value at a path in the response body; None if missing or empty"""
+    try:
+        value = get_json_path(response.json(), path)
+    except ValueError:
+        return None
+    if value is None or value == "":
+        return None
+    return str(value)
+
+
+def _with_url(request: Request, url: str) -> Request:
+    # Next URLs come with their own query string
+    return dataclasses.replace(request, url=url, params=MultiDict())
+
+
+def _with_param(request: Request, name: str, value: str) -> Request:
+    params = MultiDict(request.params)
+    params[name] = value
+    return dataclasses.replace(
+        request, url=_without_query_param(request.url, name), params=params
+    )
+
+
+def _without_query_param(url: str, name: str) -> str:
+    # Otherwise servers reading the first value would keep serving the
+    # page in the original URL
+    parsed = urlsplit(url)
+    if not parsed.query:
+        return url
+    query = "&".join(
+        part
+        for part in parsed.query.split("&")
+        if unquote_plus(part.partition("=")[0]) != name
+    )
+    return parsed._replace(query=query).geturl()
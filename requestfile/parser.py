@@ -1,6 +1,7 @@
 import io
 import re
-from typing import Iterable, Iterator
+from dataclasses import dataclass
+from typing import Iterable, Iterator, TypeAlias
 
 from lark import Lark, Transformer
 
@@ -20,102 +21,281 @@ from requestfile.ast import (
     Variable,
 )
 
+# Sections of a Requestfile, in order
+SECTION_PREAMBLE = "preamble"
+SECTION_HEADERS = "headers"
+SECTION_BODY = "body"
+
+Node: TypeAlias = Command | Comment | Header | RawData | Requestline
+
 
 def parse_requestfile(
     lines: Iterable[str],
     filename: str | None = None,
 ) -> Requestfile:
-    stream = iter(x.rstrip() for x in lines)
+    lines = [x.rstrip() for x in lines]
     result = Requestfile(source_filename=filename)
-    section = "preamble"
 
-    # Read preamble
-    for line in stream:
-        if line.startswith("%"):
-            command = _parse_requestfile_command(line, stream)
-            result.preamble.append(command)
+    entries = list(_iter_entries(lines, 0, SECTION_PREAMBLE))
+    _assemble_requestfile(result, entries)
+    assert result.requestline is not None, "Missing request line"
+    return result
 
-        elif line.startswith("# "):
-            comment = Comment(line[2:])
-            result.preamble.append(comment)
 
-        elif line.strip() == "":
-            # Ignore blank lines in preamble
-            result.preamble.append(RawData(""))
+@dataclass(slots=True)
+class Diagnostic:
+    """Error found while parsing a Requestfile"""
 
+    # Lines the error applies to, counting from 1
+    line: int
+    end_line: int
+
+    error: Exception
+
+    @property
+    def message(self) -> str:
+        return str(self.error)
+
+
+class IncrementalParser:
+    """
+    Parse a Requestfile, then keep it up to date as lines are edited.
+
+    Lines are grouped into entries, each producing one AST node (a
+    command spans multiple lines if it has heredocs). On edit, parsing
+    restarts from the first entry touching the edited lines, and stops
+    as soon as it gets back in step with the previous parse; entries
+    after that are reused, with line numbers shifted.
+
+    Errors don't stop parsing: they are collected in ``diagnostics``.
+    """
+
+    def __init__(self, lines: Iterable[str] = (), filename: str | None = None):
+        self.lines = [x.rstrip() for x in lines]
+        self.requestfile = Requestfile(source_filename=filename)
+        self._entries = list(
+            _iter_entries(self.lines, 0, SECTION_PREAMBLE, collect_errors=True)
+        )
+        _assemble_requestfile(self.requestfile, self._entries)
+
+    @property
+    def diagnostics(self) -> list[Diagnostic]:
+        diagnostics = [
+            Diagnostic(entry.start + 1, entry.end, entry.error)
+            for entry in self._entries
+            if entry.error is not None
+        ]
+        if self.requestfile.requestline is None:
+            line = max(len(self.lines), 1)
+            diagnostics.append(
+                Diagnostic(line, line, ValueError("Missing request line"))
+            )
+        return diagnostics
+
+    def edit(self, start: int, end: int, lines: Iterable[str]) -> Requestfile:
+        """
+        Replace lines from ``start`` up to (excluding) ``end`` with
+        ``lines``, and update the Requestfile.
+
+        Lines are counted from 1; use ``start == end`` to insert lines
+        before ``start``.
+        """
+
+        if not 1 <= start <= end <= len(self.lines) + 1:
+            raise ValueError(f"Invalid line range: {start}-{end}")
+
+        start, end = start - 1, end - 1
+        old_length = len(self.lines)
+        new_lines = [x.rstrip() for x in lines]
+        self.lines[start:end] = new_lines
+        shift = len(new_lines) - (end - start)
+        edit_end = start + len(new_lines)
+
+        # Entries ending before the edit are not affected, unless they
+        # ran to the end of file (eg. looking for a heredoc marker).
+        first = 0
+        while first < len(self._entries) and (
+            self._entries[first].end <= start and self._entries[first].end < old_length
+        ):
+            first += 1
+
+        if first < len(self._entries):
+            position = self._entries[first].start
+            section = self._entries[first].section
+        elif self._entries:
+            position = self._entries[-1].end
+            section = self._entries[-1].next_section
         else:
-            result.requestline = _parse_requestfile_requestline(line, stream)
-            section = "headers"
-            break  # End of preamle
-
-    assert section == "headers"
-
-    # Read headers
-    for line in stream:
-        if line.strip() == "":
-            section = "body"
-            break  # End of headers
-        if line.startswith("%"):
-            command = _parse_requestfile_command(line, stream)
-            result.headers.append(command)
-        elif line.startswith("# "):
-            comment = Comment(line[2:])
-            result.headers.append(comment)
-        else:
-            header = _parse_header_line(line)
-            result.headers.append(header)
-
-    if section == "body":
-        for line in stream:
-            if line.strip() == "":
-                # Ignore empty lines
-                continue
-            elif line.startswith("%"):
-                command = _parse_requestfile_command(line, stream)
-                result.body.append(command)
-            elif line.startswith("# "):
-                comment = Comment(line[2:])
-                result.body.append(comment)
-            else:
-                raw = RawData(line)
-                result.body.append(raw)
+            position, section = 0, SECTION_PREAMBLE
+
+        # Entries after the edit, by their start line once shifted
+        old_entries = {
+            entry.start + shift: index
+            for index, entry in enumerate(self._entries[first:], start=first)
+            if entry.start >= end
+        }
+
+        new_entries = []
+        reused = []
+        for entry in _iter_entries(self.lines, position, section, True):
+            new_entries.append(entry)
+            index = old_entries.get(entry.end)
+            if (
+                entry.end >= edit_end
+                and index is not None
+                and self._entries[index].section == entry.next_section
+            ):
+                # Back in step: the rest is the same as before
+                reused = self._entries[index:]
+                break
+
+        for entry in reused:
+            entry.shift(shift)
+
+        self._entries[first:] = new_entries + reused
+        _assemble_requestfile(self.requestfile, self._entries)
+        return self.requestfile
 
-    return result
 
+@dataclass(slots=True)
+class _Entry:
+    # Lines spanned by the entry, as indexes into the list of lines
+    start: int
+    end: int
 
-def _parse_requestfile_command(line: str, stream: Iterator[str]) -> Command:
-    command = parse_command(line)
-    _fill_heredocs_data(command, stream)
-    return command
+    # Section the entry is in, and the one following it
+    section: str
+    next_section: str
 
+    # Node parsed from the lines, if any (blank lines have none)
+    node: Node | None = None
+    error: Exception | None = None
+
+    def shift(self, lines: int):
+        self.start += lines
+        self.end += lines
+        if self.node is not None:
+            self.node.line += lines
+            self.node.end_line += lines
+
+
+def _iter_entries(
+    lines: list[str],
+    position: int,
+    section: str,
+    collect_errors: bool = False,
+) -> Iterator[_Entry]:
+    """
+    Parse lines into entries, starting at ``position`` in ``section``.
+
+    Unless ``collect_errors`` is True, errors are raised right away.
+    """
 
-def _parse_requestfile_requestline(line: str, stream: Iterator[str]) -> Requestline:
-    requestline = parse_requestline(line)
-    _fill_heredocs_data(requestline, stream)
-    return requestline
+    while position < len(lines):
+        try:
+            entry = _parse_entry(lines, position, section)
+        except Exception as exc:
+            if not collect_errors:
+                raise
+            entry = _Entry(
+                position,
+                position + 1,
+                section,
+                _get_next_section(lines[position], section),
+                error=exc,
+            )
+        yield entry
+        position, section = entry.end, entry.next_section
+
+
+def _parse_entry(lines: list[str], position: int, section: str) -> _Entry:
+    line = lines[position]
+    end = position + 1
+    node = None
+
+    if line.startswith("%"):
+        node = parse_command(line)
+        end = _fill_heredocs_data(node, lines, end)
+    elif line.startswith("# "):
+        node = Comment(line[2:])
+    elif line.strip() == "":
+        if section == SECTION_PREAMBLE:
+            # Blank lines in preamble are kept; in other sections,
+            # they are ignored (the first one ends the headers).
+            node = RawData("")
+    elif section == SECTION_PREAMBLE:
+        node = parse_requestline(line)
+        end = _fill_heredocs_data(node, lines, end)
+    elif section == SECTION_HEADERS:
+        node = _parse_header_line(line)
+    else:
+        node = RawData(line)
+
+    if node is not None:
+        node.line = position + 1
+        node.end_line = end
+
+    return _Entry(position, end, section, _get_next_section(line, section), node)
+
+
+def _get_next_section(line: str, section: str) -> str:
+    if line.startswith("%") or line.startswith("# "):
+        return section
+    if section == SECTION_PREAMBLE and line.strip() != "":
+        # Request line
+        return SECTION_HEADERS
+    if section == SECTION_HEADERS and line.strip() == "":
+        return SECTION_BODY
+    return section
+
+
+def _assemble_requestfile(result: Requestfile, entries: list[_Entry]):
+    """Fill a Requestfile (in place) with nodes from parsed entries"""
+
+    result.requestline = None
+    sections = {
+        SECTION_PREAMBLE: [],
+        SECTION_HEADERS: [],
+        SECTION_BODY: [],
+    }
+    for entry in entries:
+        if isinstance(entry.node, Requestline):
+            result.requestline = entry.node
+        elif entry.node is not None:
+            sections[entry.section].append(entry.node)
+
+    result.preamble[:] = sections[SECTION_PREAMBLE]
+    result.headers[:] = sections[SECTION_HEADERS]
+    result.body[:] = sections[SECTION_BODY]
 
 
 def _parse_header_line(line) -> Header:
-    key, val = line.split(":", 1)
+    key, sep, val = line.partition(":")
+    if not sep:
+        raise ValueError(f"Invalid header line: {line}")
     return Header(key.strip(), val.strip())
 
 
-def _fill_heredocs_data(obj: Command | Requestline, stream: Iterator[str]):
+def _fill_heredocs_data(obj: Command | Requestline, lines: list[str], position: int):
     """
     Load HEREDOC values into a just-loaded object.
 
-    For all HEREDOCs found in an object, consume lines from the stream
-    to populate it with data.
+    For all HEREDOCs found in an object, consume lines starting at
+    ``position`` to populate it with data. Returns the position after
+    the last line consumed.
     """
 
     for heredoc in _iter_find_heredocs(obj):
         buf = []
-        for x in stream:
+        while position < len(lines):
+            x = lines[position]
+            position += 1
             if x == heredoc.marker:
                 break
             else:
                 buf.append(x)
         heredoc.value = "\n".join(buf)
+    return position
 
 
 def _iter_find_heredocs(obj: Command | Requestline) -> Iterable[Heredoc]:
@@ -156,6 +336,7 @@ line_parser = Lark(
 
     include : "<" symbol
             | "<" quoted
+            | "<" variable
 
     variable : "$" SYMBOL
 
@@ -165,7 +346,7 @@ line_parser = Lark(
     quoted : QUOTED
 
     SYMBOL : /[a-zA-Z_\/]([a-zA-Z0-9_:\/\.-]*[a-zA-Z0-9_\/])?/
-    QUOTED : /".*?(?<!\\)"/
+    QUOTED : /"(?:[^"\\\n]|\\.)*"/
     HTTP_METHOD : /[a-zA-Z]+/
 
     %import common.WS
@@ -207,7 +388,7 @@ class CommandTransformer(Transformer):
     def include(self, items):
         assert len(items) == 1
         [value] = items
-        assert isinstance(value, (Symbol, QuotedValue))
+        assert isinstance(value, (Symbol, QuotedValue, Variable))
         return IncludedFile(value)
 
     def variable(self, items):
@@ -234,6 +415,7 @@ class CommandTransformer(Transformer):
 
 QUOTED_CHARS = {
     r"\\": "\\",
+    r"\"": '"',
     r"\0": "\0",
     r"\a": "\a",
     r"\b": "\b",
@@ -300,8 +482,10 @@ def quote_value(text: str) -> str:
 
     for ch in text:
         code = ord(ch)
-        if 0x20 <= code <= 0x7E:
-            buf.write(TO_QUOTED.get(ch, ch))
+        if ch in TO_QUOTED:
+            buf.write(TO_QUOTED[ch])
+        elif 0x20 <= code <= 0x7E:
+            buf.write(ch)
         elif code < 256:
             buf.write(r"\x")
             buf.write(format(code, "02x"))
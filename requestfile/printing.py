@@ -226,11 +226,11 @@ def _format_quoted_value(text: str) -> str | Text:
     for ch in text:
         code = ord(ch)
 
-        if 0x20 <= code <= 0x7E:
-            if ch in TO_QUOTED:
-                buf.append(TO_QUOTED[ch], style="quoted-escape")
-            else:
-                buf.append(ch)
+        if ch in TO_QUOTED:
+            buf.append(TO_QUOTED[ch], style="quoted-escape")
+
+        elif 0x20 <= code <= 0x7E:
+            buf.append(ch)
 
         elif code < 256:
             buf.append(f"\\x{code:02x}", style="quoted-escape")
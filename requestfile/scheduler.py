@@ -0,0 +1,436 @@
+"""
+Schedule sending of many requests
+
+Requests are sent from a pool of threads, honouring:
+
+- Token bucket rate limits, both global and per host;
+- A maximum number of requests in flight per host;
+- Priorities: requests with a higher priority are sent first;
+- Backoff, when a host responds with 429 or 503: no more requests are
+  sent to it until the time in its Retry-After header, and the
+  request is retried.
+"""
+
+import heapq
+import itertools
+import threading
+import time
+from concurrent.futures import Future
+from dataclasses import dataclass, field
+from typing import Callable, Iterable
+from urllib.parse import urlsplit
+
+from requests import Response
+
+from .builder.request import Request
+from .ext.policy import (
+    HedgePolicy,
+    RetryPolicy,
+    SendOutcome,
+    TimeoutValue,
+    get_retry_after,
+    send_with_policy,
+)
+from .workflow import make_session
+
+# Responses meaning the host is overloaded, and we should back off
+BACKOFF_STATUSES = (429, 503)
+
+
+@dataclass(slots=True)
+class SchedulerConfig:
+    # Maximum requests per second, across all hosts
+    rate: float | None = None
+    burst: int = 1
+
+    # Maximum requests per second, to each host
+    host_rate: float | None = None
+    host_burst: int = 1
+
+    # Maximum requests in flight to each host
+    host_max_in_flight: int | None = None
+
+    # Number of threads sending requests
+    max_workers: int = 8
+
+    # Times a request is retried after a 429 / 503 response
+    max_retries: int = 3
+
+    # Delay before retrying, if the response has no Retry-After;
+    # doubles for every consecutive 429 / 503 from the same host.
+    backoff: float = 1.0
+    max_backoff: float = 60.0
+
+    # Timeout for connecting and for each read, in seconds
+    timeout: TimeoutValue = None
+
+    # Maximum time for each request, and for the whole batch, in
+    # seconds; requests not sent before the batch deadline fail.
+    deadline: float | None = None
+    batch_deadline: float | None = None
+
+    # Retries for errors and status codes, besides 429 / 503 backoff
+    # (leave those out of retry.statuses)
+    retry: RetryPolicy | None = None
+
+    # Hedge slow requests; latencies are tracked across the batch
+    hedge: HedgePolicy | None = None
+
+
+@dataclass(slots=True)
+class BatchResult:
+    # Name used to refer to this request, usually the file name
+    name: str
+    request: Request
+    response: Response | None = None
+
+    # Error raised while sending the request, if any
+    error: Exception | None = None
+
+    # Times the request was sent
+    attempts: int = 0
+
+    # Seconds spent waiting in the queue, and sending the request
+    waited: float = 0.0
+    elapsed: float = 0.0
+
+    # Details about the last attempt: retries, hedging, timeouts...
+    outcome: SendOutcome | None = None
+
+    # Variables the request was built with, if known
+    variables: dict[str, str | bytes] | None = None
+
+    @property
+    def ok(self) -> bool:
+        return self.error is None and self.response is not None and self.response.ok
+
+
+class TokenBucket:
+    """
+    Token bucket rate limiter.
+
+    Tokens are added at ``rate`` per second, up to ``burst``. Not
+    thread-safe on its own: used by the Scheduler under its lock.
+    """
+
+    def __init__(self, rate: float, burst: int = 1):
+        if rate <= 0:
+            raise ValueError("Rate must be positive")
+        self.rate = rate
+        self.burst = max(1, burst)
+        self.tokens = float(self.burst)
+        self.updated = time.monotonic()
+
+    def _refill(self, now: float):
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def get_delay(self, now: float) -> float:
+        """Seconds until a token is available"""
+        self._refill(now)
+        return max(0.0, (1 - self.tokens) / self.rate)
+
+    def take(self, now: float):
+        self._refill(now)
+        self.tokens -= 1
+
+
+@dataclass(order=True, slots=True)
+class _QueueItem:
+    # Ordering: highest priority first, then first submitted
+    sort_key: tuple[int, int]
+    result: BatchResult = field(compare=False)
+    future: Future = field(compare=False)
+    queued_at: float = field(compare=False, default=0.0)
+
+
+@dataclass(slots=True)
+class _HostState:
+    queue: list[_QueueItem] = field(default_factory=list)
+    in_flight: int = 0
+    bucket: TokenBucket | None = None
+
+    # No requests to be sent before this time (time.monotonic())
+    blocked_until: float = 0.0
+
+    # Consecutive 429 / 503 responses
+    backoff_count: int = 0
+
+
+class Scheduler:
+    """
+    Send requests from a pool of threads, honouring rate limits,
+    concurrency caps and priorities.
+
+    Use as a context manager, or call close() once done.
+    """
+
+    def __init__(
+        self,
+        config: SchedulerConfig | None = None,
+        send: Callable[[Request], Response] | None = None,
+    ):
+        self.config = config or SchedulerConfig()
+
+        self._send = send
+        self._session = None
+        if send is None:
+            self._session = make_session(self.config.max_workers)
+
+        self._started = time.monotonic()
+        self._hosts: dict[str, _HostState] = {}
+        self._bucket = None
+        if self.config.rate is not None:
+            self._bucket = TokenBucket(self.config.rate, self.config.burst)
+
+        self._counter = itertools.count()
+        self._condition = threading.Condition()
+        self._closed = False
+        self._threads = [
+            threading.Thread(target=self._run, name=f"scheduler-{i}", daemon=True)
+            for i in range(self.config.max_workers)
+        ]
+        for thread in self._threads:
+            thread.start()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def submit(
+        self,
+        request: Request,
+        priority: int = 0,
+        name: str | None = None,
+        variables: dict[str, str | bytes] | None = None,
+    ) -> "Future[BatchResult]":
+        """
+        Queue a request to be sent.
+
+        Returns a Future, resolving to a BatchResult once the request
+        was sent (and retried, if needed). ``variables`` are passed
+        through to the result.
+        """
+
+        result = BatchResult(
+            name=name or request.url or "", request=request, variables=variables
+        )
+        item = _QueueItem((-priority, next(self._counter)), result, Future())
+        self._enqueue(item)
+        return item.future
+
+    def close(self, wait: bool = True):
+        """Stop the worker threads, once all queued requests are sent"""
+        with self._condition:
+            self._closed = True
+            self._condition.notify_all()
+        if wait:
+            for thread in self._threads:
+                thread.join()
+
+    def _enqueue(self, item: _QueueItem):
+        item.queued_at = time.monotonic()
+        host = _get_host(item.result.request)
+        with self._condition:
+            if self._closed:
+                raise RuntimeError("Scheduler is closed")
+            heapq.heappush(self._get_host_state(host).queue, item)
+            self._condition.notify()
+
+    def _get_host_state(self, host: str) -> _HostState:
+        if (state := self._hosts.get(host)) is None:
+            state = self._hosts[host] = _HostState()
+            if self.config.host_rate is not None:
+                state.bucket = TokenBucket(
+                    self.config.host_rate, self.config.host_burst
+                )
+        return state
+
+    def _run(self):
+        while (picked := self._next_item()) is not None:
+            host, item = picked
+            self._process(host, item)
+
+    def _next_item(self) -> tuple[str, _QueueItem] | None:
+        """Wait for the next request that can be sent, and take it"""
+
+        with self._condition:
+            while True:
+                now = time.monotonic()
+                picked, delay = self._pick(now)
+                if picked is not None:
+                    host, state = picked
+                    item = heapq.heappop(state.queue)
+                    state.in_flight += 1
+                    if state.bucket is not None:
+                        state.bucket.take(now)
+                    if self._bucket is not None:
+                        self._bucket.take(now)
+                    return host, item
+
+                if self._closed and not any(
+                    state.queue or state.in_flight for state in self._hosts.values()
+                ):
+                    return None
+
+                self._condition.wait(delay)
+
+    def _pick(self, now: float) -> tuple[tuple[str, _HostState] | None, float | None]:
+        """
+        Find the host with the highest priority request that can be
+        sent right now.
+
+        Otherwise, returns how long to wait before trying again (None
+        if waiting on requests in flight).
+        """
+
+        best = None
+        delay = None
+
+        def _wait(seconds: float):
+            nonlocal delay
+            delay = seconds if delay is None else min(delay, seconds)
+
+        for host, state in self._hosts.items():
+            if not state.queue:
+                continue
+            max_in_flight = self.config.host_max_in_flight
+            if max_in_flight is not None and state.in_flight >= max_in_flight:
+                continue
+            if state.blocked_until > now:
+                _wait(state.blocked_until - now)
+                continue
+            if state.bucket is not None and (wait := state.bucket.get_delay(now)):
+                _wait(wait)
+                continue
+            if best is None or state.queue[0] < best[1].queue[0]:
+                best = (host, state)
+
+        if best is not None and self._bucket is not None:
+            if wait := self._bucket.get_delay(now):
+                return None, wait
+
+        return best, delay
+
+    def _get_deadline(self) -> float | None:
+        """Time left for the next request, in seconds"""
+        deadlines = []
+        if self.config.deadline is not None:
+            deadlines.append(self.config.deadline)
+        if self.config.batch_deadline is not None:
+            elapsed = time.monotonic() - self._started
+            deadlines.append(self.config.batch_deadline - elapsed)
+        return min(deadlines, default=None)
+
+    def _process(self, host: str, item: _QueueItem):
+        result = item.result
+        start = time.monotonic()
+        result.waited += start - item.queued_at
+        result.attempts += 1
+
+        result.outcome = SendOutcome()
+        try:
+            result.response = send_with_policy(
+                result.request,
+                session=self._session,
+                timeout=self.config.timeout,
+                deadline=self._get_deadline(),
+                retry=self.config.retry,
+                hedge=self.config.hedge,
+                send=self._send,
+                outcome=result.outcome,
+            )
+            result.error = None
+        except Exception as exc:
+            result.response = None
+            result.error = exc
+        result.elapsed += time.monotonic() - start
+
+        with self._condition:
+            state = self._hosts[host]
+            state.in_flight -= 1
+            response = result.response
+            retry = False
+            if response is not None and response.status_code in BACKOFF_STATUSES:
+                state.backoff_count += 1
+                delay = get_retry_after(response)
+                if delay is None:
+                    delay = min(
+                        self.config.backoff * 2 ** (state.backoff_count - 1),
+                        self.config.max_backoff,
+                    )
+                state.blocked_until = max(state.blocked_until, time.monotonic() + delay)
+                retry = result.attempts <= self.config.max_retries
+            elif response is not None:
+                state.backoff_count = 0
+
+            if retry:
+                item.queued_at = time.monotonic()
+                heapq.heappush(state.queue, item)
+            self._condition.notify_all()
+
+        if not retry:
+            item.future.set_result(result)
+
+
+def run_batch(
+    requests: Iterable[
+        tuple[str, Request, int]
+        | tuple[str, Request, int, dict[str, str | bytes] | None]
+    ],
+    config: SchedulerConfig | None = None,
+    send: Callable[[Request], Response] | None = None,
+    on_result: Callable[[BatchResult], None] | None = None,
+    max_pending: int | None = None,
+    collect: bool = True,
+) -> list[BatchResult]:
+    """
+    Send many requests through a Scheduler.
+
+    ``requests`` are (name, request, priority) tuples, optionally
+    followed by the variables the request was built with, which are
+    passed through to its result. ``on_result`` is called as soon as
+    each request completes.
+
+    If ``max_pending`` is set, ``requests`` is only consumed while
+    fewer than that many requests are queued or in flight, so it can
+    be a generator building requests lazily. Priorities then only
+    apply among the pending requests.
+
+    Returns results in the same order as ``requests``. If ``collect``
+    is False, results are not kept once passed to ``on_result``, and an
+    empty list is returned: along with ``max_pending``, memory use then
+    stays bounded however many requests are sent.
+    """
+
+    pending = threading.Semaphore(max_pending) if max_pending is not None else None
+
+    def _done(future: "Future[BatchResult]"):
+        if pending is not None:
+            pending.release()
+        if on_result is not None:
+            on_result(future.result())
+
+    with Scheduler(config, send=send) as scheduler:
+        futures = []
+        requests = iter(requests)
+        while True:
+            # Wait for a free slot before building the next request
+            if pending is not None:
+                pending.acquire()
+            if (item := next(requests, None)) is None:
+                break
+            name, request, priority, *rest = item
+            future = scheduler.submit(
+                request, priority=priority, name=name, variables=next(iter(rest), None)
+            )
+            future.add_done_callback(_done)
+            if collect:
+                futures.append(future)
+    return [future.result() for future in futures]
+
+
+def _get_host(request: Request) -> str:
+    return urlsplit(request.url or "").netloc.lower()
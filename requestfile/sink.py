@@ -0,0 +1,183 @@
+"""
+Write results of many requests to a file, as they complete
+
+Results are written as JSON Lines: one JSON object per request, with
+the input variables, response status, timings, selected headers and
+the body (or just its digest). Files ending in ``.gz`` are compressed.
+
+Writes are buffered, and flushed every ``flush_interval`` seconds, so
+results are not kept in memory and partial runs still leave usable
+output.
+"""
+
+import base64
+import gzip
+import hashlib
+import json
+import threading
+import time
+from typing import Any, Iterable
+
+from requests import Response
+
+from .builder.request import Request
+
+# Don't include the body
+BODY_NONE = "none"
+
+# Include a SHA-256 digest of the body, and its size
+BODY_DIGEST = "digest"
+
+# Include the whole body; as text if valid UTF-8, else base64
+BODY_FULL = "full"
+
+BODY_MODES = (BODY_NONE, BODY_DIGEST, BODY_FULL)
+
+# Size of chunks when reading response bodies
+CHUNK_SIZE = 64 * 1024
+
+
+class ResultSink:
+    """
+    Append one JSON record per request to a file.
+
+    Only headers listed in ``headers`` are included in records. Safe to
+    use from multiple threads; use as a context manager, or call
+    close() once done.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        headers: Iterable[str] = (),
+        body: str = BODY_DIGEST,
+        compress: bool | None = None,
+        flush_interval: float = 1.0,
+        buffer_size: int = 1024 * 1024,
+    ):
+        if body not in BODY_MODES:
+            raise ValueError(f"Invalid body mode: {body}")
+        if compress is None:
+            compress = path.endswith(".gz")
+
+        self.path = path
+        self.headers = tuple(headers)
+        self.body = body
+        self.flush_interval = flush_interval
+        self.count = 0
+
+        # Appending to a gzip file adds a new member, which readers
+        # handle transparently.
+        raw = open(path, "ab", buffering=buffer_size)
+        self._file = gzip.GzipFile(fileobj=raw, mode="ab") if compress else raw
+        self._raw = raw
+        self._lock = threading.Lock()
+        self._flushed_at = time.monotonic()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def close(self):
+        with self._lock:
+            if self._file is not self._raw:
+                self._file.close()
+            self._raw.close()
+
+    def flush(self):
+        with self._lock:
+            self._flush()
+
+    def write(
+        self,
+        name: str,
+        request: Request | None = None,
+        response: Response | None = None,
+        error: Exception | None = None,
+        elapsed: float | None = None,
+        variables: dict[str, Any] | None = None,
+        **extra,
+    ):
+        """
+        Write a record for a request.
+
+        ``extra`` values are added to the record as they are; they must
+        be serializable to JSON.
+        """
+
+        record = self.make_record(
+            name, request, response, error, elapsed, variables, **extra
+        )
+        self.write_record(record)
+
+    def write_record(self, record: dict[str, Any]):
+        line = json.dumps(record, ensure_ascii=False, default=str) + "\n"
+        with self._lock:
+            self._file.write(line.encode())
+            self.count += 1
+            if time.monotonic() - self._flushed_at >= self.flush_interval:
+                self._flush()
+
+    def make_record(
+        self,
+        name: str,
+        request: Request | None = None,
+        response: Response | None = None,
+        error: Exception | None = None,
+        elapsed: float | None = None,
+        variables: dict[str, Any] | None = None,
+        **extra,
+    ) -> dict[str, Any]:
+        record: dict[str, Any] = {"name": name, "time": time.time()}
+        if variables is not None:
+            record["variables"] = variables
+        if request is not None:
+            record["method"] = request.method
+            record["url"] = request.url
+        if elapsed is not None:
+            record["elapsed"] = elapsed
+
+        if response is not None:
+            record["status"] = response.status_code
+            record["reason"] = response.reason
+            record["headers"] = {
+                name: response.headers[name]
+                for name in self.headers
+                if name in response.headers
+            }
+            record.update(self._get_body(response))
+        if error is not None:
+            record["error"] = f"{type(error).__name__}: {error}"
+
+        record.update(extra)
+        return record
+
+    def _get_body(self, response: Response) -> dict[str, Any]:
+        if self.body == BODY_NONE:
+            return {}
+
+        if self.body == BODY_FULL:
+            content = response.content or b""
+            try:
+                return {"body": content.decode("utf-8"), "size": len(content)}
+            except UnicodeDecodeError:
+                return {
+                    "body_base64": base64.b64encode(content).decode(),
+                    "size": len(content),
+                }
+
+        # Streamed responses are hashed chunk by chunk, without loading
+        # the whole body in memory.
+        digest = hashlib.sha256()
+        size = 0
+        for chunk in response.iter_content(CHUNK_SIZE):
+            digest.update(chunk)
+            size += len(chunk)
+        return {"sha256": digest.hexdigest(), "size": size}
+
+    def _flush(self):
+        self._file.flush()
+        self._raw.flush()
+        self._flushed_at = time.monotonic()
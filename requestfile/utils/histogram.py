@@ -0,0 +1,95 @@
+"""
+Latency histogram, with bounded relative error
+
+Values are integers (eg. microseconds), counted in log-linear buckets:
+each power of two is split in ``2 ** SUB_BUCKET_BITS`` linear
+sub-buckets, so the relative error of reported values is bounded,
+while memory stays small regardless of the number of recorded values.
+
+Histograms are mergeable without loss: merging histograms recorded
+separately gives the same result as recording all values in one.
+"""
+
+from dataclasses import dataclass, field
+
+# Up to 128 sub-buckets per power of two, for < 1% relative error
+SUB_BUCKET_BITS = 7
+SUB_BUCKET_COUNT = 1 << SUB_BUCKET_BITS
+SUB_BUCKET_HALF = SUB_BUCKET_COUNT // 2
+
+
+@dataclass(slots=True)
+class Histogram:
+    # Number of values per bucket index; sparse
+    counts: dict[int, int] = field(default_factory=dict)
+
+    count: int = 0
+    total: int = 0
+    min: int | None = None
+    max: int | None = None
+
+    def record(self, value: int, count: int = 1):
+        if value < 0:
+            raise ValueError(f"Cannot record negative value: {value}")
+        index = _get_index(value)
+        self.counts[index] = self.counts.get(index, 0) + count
+        self.count += count
+        self.total += value * count
+        self.min = value if self.min is None else min(self.min, value)
+        self.max = value if self.max is None else max(self.max, value)
+
+    def merge(self, other: "Histogram"):
+        for index, count in other.counts.items():
+            self.counts[index] = self.counts.get(index, 0) + count
+        self.count += other.count
+        self.total += other.total
+        if other.min is not None:
+            self.min = other.min if self.min is None else min(self.min, other.min)
+        if other.max is not None:
+            self.max = other.max if self.max is None else max(self.max, other.max)
+
+    def copy(self) -> "Histogram":
+        result = Histogram()
+        result.merge(self)
+        return result
+
+    @property
+    def mean(self) -> float:
+        return self.total / self.count if self.count else 0.0
+
+    def percentile(self, percent: float) -> int:
+        """
+        Get the value below which ``percent``% of values fall.
+
+        The result is the midpoint of the containing bucket, clamped
+        to the recorded range, or 0 for an empty histogram.
+        """
+
+        if not self.count:
+            return 0
+
+        target = max(1, round(self.count * percent / 100))
+        seen = 0
+        for index in sorted(self.counts):
+            seen += self.counts[index]
+            if seen >= target:
+                low, high = _get_bounds(index)
+                return min(max((low + high) // 2, self.min), self.max)
+
+        return self.max
+
+
+def _get_index(value: int) -> int:
+    if value < SUB_BUCKET_COUNT:
+        return value
+    exponent = value.bit_length() - SUB_BUCKET_BITS
+    return exponent * SUB_BUCKET_HALF + (value >> exponent)
+
+
+def _get_bounds(index: int) -> tuple[int, int]:
+    """Lowest and highest value counted in a bucket"""
+    if index < SUB_BUCKET_COUNT:
+        return index, index
+    exponent = index // SUB_BUCKET_HALF - 1
+    mantissa = index - exponent * SUB_BUCKET_HALF
+    return mantissa << exponent, ((mantissa + 1) << exponent) - 1
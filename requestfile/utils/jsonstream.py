@@ -0,0 +1,115 @@
+"""
+Read large JSON documents incrementally
+
+Only the structure leading to the values of interest is walked one
+token at a time; each value is then decoded on its own, so memory use
+is bounded by the size of the largest value rather than the whole
+document.
+"""
+
+import json
+from typing import Any, Iterator, TextIO
+
+DEFAULT_CHUNK_SIZE = 1024 * 1024
+
+WHITESPACE = " \t\n\r"
+
+
+class JsonStreamReader:
+    """
+    Walk a JSON document read from a text stream.
+
+    Use iter_object() and iter_array() to walk the structure; each
+    item they yield must be consumed, via read_value(), or by walking
+    into it.
+    """
+
+    def __init__(self, stream: TextIO, chunk_size: int = DEFAULT_CHUNK_SIZE):
+        self.stream = stream
+        self.chunk_size = chunk_size
+        self._buffer = ""
+        self._pos = 0
+        self._eof = False
+        self._decoder = json.JSONDecoder()
+
+    def peek(self) -> str:
+        """Next character that is not whitespace; empty at end of stream"""
+        while True:
+            while self._pos < len(self._buffer):
+                if self._buffer[self._pos] not in WHITESPACE:
+                    return self._buffer[self._pos]
+                self._pos += 1
+            if not self._fill():
+                return ""
+
+    def expect(self, char: str):
+        if (found := self.peek()) != char:
+            raise ValueError(f"Expected {char!r}, found {found or 'end of stream'!r}")
+        self._pos += 1
+
+    def read_value(self) -> Any:
+        """Decode the next value"""
+        self.peek()
+        while True:
+            try:
+                value, end = self._decoder.raw_decode(self._buffer, self._pos)
+            except json.JSONDecodeError:
+                # Might be incomplete: read more, in increasingly large
+                # chunks so large values are not decoded too many times
+                if not self._fill(len(self._buffer) - self._pos):
+                    raise
+                continue
+            if end == len(self._buffer) and not self._eof:
+                # Numbers might continue in the next chunk
+                if self._fill():
+                    continue
+            self._pos = end
+            return value
+
+    def iter_object(self) -> Iterator[str]:
+        """Walk an object, yielding its keys"""
+        self.expect("{")
+        if self.peek() == "}":
+            self._pos += 1
+            return
+        while True:
+            key = self.read_value()
+            if not isinstance(key, str):
+                raise ValueError(f"Expected an object key, found {key!r}")
+            self.expect(":")
+            yield key
+            if self.peek() == ",":
+                self._pos += 1
+                continue
+            self.expect("}")
+            return
+
+    def iter_array(self) -> Iterator[int]:
+        """Walk an array, yielding the index of each item"""
+        self.expect("[")
+        if self.peek() == "]":
+            self._pos += 1
+            return
+        index = 0
+        while True:
+            yield index
+            index += 1
+            if self.peek() == ",":
+                self._pos += 1
+                continue
+            self.expect("]")
+            return
+
+    def _fill(self, min_size: int = 0) -> bool:
+        """Read more data; returns False at end of stream"""
+        if self._eof:
+            return False
+        # Drop what was already consumed
+        self._buffer = self._buffer[self._pos :]
+        self._pos = 0
+        chunk = self.stream.read(max(self.chunk_size, min_size))
+        if not chunk:
+            self._eof = True
+            return False
+        self._buffer += chunk
+        return True
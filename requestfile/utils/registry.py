@@ -1,21 +1,40 @@
+import threading
+
+
 class Registry:
+    """
+    Map of names to items (eg. filters or commands), with options.
+
+    Lookups don't take any lock: updates replace the dicts as a whole
+    (copy-on-write), so readers in other threads always see a
+    consistent state, even on free-threaded Python builds.
+    """
+
     def __init__(self):
         self.items = {}
+        self.options = {}
+        self._lock = threading.Lock()
 
-    def set(self, name, value, override=False):
-        if not override and name in self.items:
-            raise ValueError(f"Item {name} already defined")
-        self.items[name] = value
+    def set(self, name, value, override=False, **options):
+        with self._lock:
+            if not override and name in self.items:
+                raise ValueError(f"Item {name} already defined")
+            # Options first: once an item is visible, so are its options
+            self.options = {**self.options, name: options}
+            self.items = {**self.items, name: value}
 
     def get(self, name):
         return self.items[name]
 
+    def get_options(self, name) -> dict:
+        return self.options.get(name, {})
+
     def __getitem__(self, name):
         return self.items[name]
 
-    def declare(self, name):
+    def declare(self, name, **options):
         def decorator(fn):
-            self.set(name, fn)
+            self.set(name, fn, **options)
             return fn
 
         return decorator
@@ -0,0 +1,164 @@
+"""
+Watch a Requestfile and its included files for changes
+
+Files are polled with os.stat(): the Requestfile is parsed again only
+when it changes, and included files are read again only when they
+change; contents of unchanged files are kept in memory, and served to
+the builder via a PrefetchedResourceLoader.
+
+Files included via a variable (<$name) are watched if the variable is
+passed to the watcher; paths set in the Requestfile itself, via %SET,
+are only known when building, and are read from disk without being
+watched.
+"""
+
+import os
+import time
+from dataclasses import dataclass
+
+from .analysis import analyze_requestfile
+from .ast import Requestfile
+from .builder.builder import get_include_paths, get_resource_root
+from .builder.resource_loader import PrefetchedResourceLoader, ResourceLoader
+from .parser import parse_requestfile
+
+# Key used to detect changes to a file; None if missing
+StatKey = tuple[int, int, int] | None
+
+
+@dataclass(slots=True)
+class _WatchedFile:
+    stat_key: StatKey
+    data: bytes | None = None
+
+    # Error raised while reading or parsing the file, if any
+    error: Exception | None = None
+
+
+class RequestfileWatcher:
+    """
+    Keep a parsed Requestfile, and the contents of its includes, up to
+    date with the files on disk.
+
+    Call poll() to check for changes, or wait() to block until some
+    file changes.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        interval: float = 0.2,
+        variables: dict[str, str | bytes] | None = None,
+    ):
+        self.path = os.path.abspath(path)
+        self.interval = interval
+
+        # Used to resolve paths of files included via <$name
+        self.variables = variables or {}
+        self.requestfile: Requestfile | None = None
+
+        # Error raised while parsing the Requestfile or reading an
+        # include, if any; cleared once the file is fixed.
+        self.error: Exception | None = None
+
+        self._source: _WatchedFile | None = None
+        self._include_paths: list[str] = []
+        self._includes: dict[str, _WatchedFile] = {}
+        self.poll()
+
+    @property
+    def watched_paths(self) -> list[str]:
+        """Paths of all files being watched"""
+        return [self.path, *(self._get_path(path) for path in self._includes)]
+
+    def poll(self) -> bool:
+        """
+        Re-read any files that changed since the last call.
+
+        Returns True if anything changed.
+        """
+
+        changed = False
+        stat_key = _get_stat_key(self.path)
+        if self._source is None or self._source.stat_key != stat_key:
+            self._source = _WatchedFile(stat_key)
+            changed = True
+            try:
+                with open(self.path) as fp:
+                    self.requestfile = parse_requestfile(fp, filename=self.path)
+                self._include_paths = get_include_paths(
+                    analyze_requestfile(self.requestfile), self.variables
+                )
+            except Exception as exc:
+                # Keep the last good version, until the file is fixed
+                self._source.error = exc
+
+        if self.requestfile is not None:
+            changed |= self._poll_includes()
+
+        self.error = next(
+            (
+                watched.error
+                for watched in (self._source, *self._includes.values())
+                if watched.error is not None
+            ),
+            None,
+        )
+        return changed
+
+    def wait(self) -> bool:
+        """Block until some file changes"""
+        while not self.poll():
+            time.sleep(self.interval)
+        return True
+
+    def get_resource_loader(self) -> PrefetchedResourceLoader:
+        """Resource loader serving the latest contents of included files"""
+        return PrefetchedResourceLoader(
+            ResourceLoader(get_resource_root(self.requestfile)),
+            {
+                path: watched.data
+                for path, watched in self._includes.items()
+                if watched.data is not None
+            },
+        )
+
+    def _poll_includes(self) -> bool:
+        changed = False
+
+        for path in list(self._includes):
+            if path not in self._include_paths:
+                # No longer referenced
+                del self._includes[path]
+                changed = True
+
+        for path in self._include_paths:
+            full_path = self._get_path(path)
+            stat_key = _get_stat_key(full_path)
+            watched = self._includes.get(path)
+            if watched is not None and watched.stat_key == stat_key:
+                continue
+
+            # The file is stat'ed before reading: if it changes in the
+            # meantime, it'll be read again on the next poll.
+            try:
+                with open(full_path, "rb") as fp:
+                    self._includes[path] = _WatchedFile(stat_key, fp.read())
+            except OSError as exc:
+                self._includes[path] = _WatchedFile(stat_key, error=exc)
+            changed = True
+
+        return changed
+
+    def _get_path(self, path: str) -> str:
+        if os.path.isabs(path):
+            return path
+        return os.path.join(get_resource_root(self.requestfile), path)
+
+
+def _get_stat_key(path: str) -> StatKey:
+    try:
+        st = os.stat(path)
+    except FileNotFoundError:
+        return None
+    return (st.st_mtime_ns, st.st_size, st.st_ino)
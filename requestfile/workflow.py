@@ -0,0 +1,260 @@
+"""
+Run multiple Requestfiles, passing values between them
+
+Values extracted from a response (via %EXTRACT) become variables for
+the requests that reference them. Requests are run as soon as all
+the requests they depend on have completed, concurrently where
+possible, sharing a single pooled HTTP session.
+"""
+
+import json
+import re
+import time
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from dataclasses import dataclass, field
+from typing import Any, Callable
+
+from requests import Response, Session
+from requests.adapters import HTTPAdapter
+
+from .analysis import RequestfileAnalysis, analyze_requestfile
+from .ast import Requestfile
+from .builder import build_request
+from .builder.request import Extraction, Request
+from .ext.requests import send as send_request
+
+RE_JSON_PATH_PART = re.compile(r"\.?([^.\[\]]+)|\[(-?\d+)\]")
+
+
+@dataclass(slots=True)
+class WorkflowStep:
+    # Name used to refer to this step, usually the file name
+    name: str
+    requestfile: Requestfile
+    analysis: RequestfileAnalysis
+
+    # Names of steps this one depends on
+    dependencies: set[str] = field(default_factory=set)
+
+
+@dataclass(slots=True)
+class StepResult:
+    step: WorkflowStep
+    request: Request | None = None
+    response: Response | None = None
+
+    # Variables extracted from the response
+    extracted: dict[str, str] = field(default_factory=dict)
+
+    # Time taken to build and send the request, in seconds
+    elapsed: float = 0.0
+
+    # Error raised while running the step, if any
+    error: Exception | None = None
+
+    # True if the step did not run, as one of its dependencies failed
+    skipped: bool = False
+
+    @property
+    def ok(self) -> bool:
+        return (
+            self.error is None
+            and not self.skipped
+            and self.response is not None
+            and self.response.ok
+        )
+
+
+def plan_workflow(requestfiles: dict[str, Requestfile]) -> list[WorkflowStep]:
+    """
+    Build the dependency graph between multiple Requestfiles.
+
+    A step depends on all other steps extracting a variable it uses.
+    Raises ValueError if dependencies are circular.
+    """
+
+    steps = [
+        WorkflowStep(name, rqf, analyze_requestfile(rqf))
+        for name, rqf in requestfiles.items()
+    ]
+
+    producers: dict[str, set[str]] = {}
+    for step in steps:
+        for var in step.analysis.variables_extracted:
+            producers.setdefault(var, set()).add(step.name)
+
+    for step in steps:
+        for var in step.analysis.variables_used - step.analysis.variables_defined:
+            step.dependencies |= producers.get(var, set()) - {step.name}
+
+    _check_cycles(steps)
+    return steps
+
+
+def run_workflow(
+    requestfiles: dict[str, Requestfile],
+    variables: dict[str, str | bytes] | None = None,
+    max_workers: int = 8,
+    send: Callable[[Request], Response] | None = None,
+    on_result: Callable[[StepResult], None] | None = None,
+) -> list[StepResult]:
+    """
+    Run multiple Requestfiles, honouring dependencies between them.
+
+    ``send`` is used to send the built requests; by default, they're
+    sent using a requests Session shared by all steps.
+    ``on_result`` is called as soon as each step completes.
+
+    Returns results in the same order as ``requestfiles``.
+    """
+
+    steps = plan_workflow(requestfiles)
+    variables = dict(variables or {})
+
+    if send is None:
+        session = make_session(max_workers)
+
+        def send(request: Request) -> Response:
+            return send_request(request, session=session)
+
+    def _run_step(step: WorkflowStep, step_variables) -> StepResult:
+        result = StepResult(step)
+        start = time.perf_counter()
+        try:
+            result.request = build_request(step.requestfile, variables=step_variables)
+            result.response = send(result.request)
+            result.extracted = extract_values(
+                result.request.extractions, result.response
+            )
+        except Exception as exc:
+            result.error = exc
+        result.elapsed = time.perf_counter() - start
+        return result
+
+    results: dict[str, StepResult] = {}
+    pending = {step.name: step for step in steps}
+    running: dict[Future, WorkflowStep] = {}
+
+    def _complete(result: StepResult):
+        results[result.step.name] = result
+        if on_result is not None:
+            on_result(result)
+
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        while pending or running:
+            for name, step in list(pending.items()):
+                if any(
+                    dep in results and not results[dep].ok for dep in step.dependencies
+                ):
+                    del pending[name]
+                    _complete(StepResult(step, skipped=True))
+                elif all(dep in results for dep in step.dependencies):
+                    del pending[name]
+                    future = pool.submit(_run_step, step, dict(variables))
+                    running[future] = step
+
+            if not running:
+                continue
+
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                del running[future]
+                result = future.result()
+                variables.update(result.extracted)
+                _complete(result)
+
+    return [results[step.name] for step in steps]
+
+
+def extract_values(extractions: list[Extraction], response: Response) -> dict[str, str]:
+    """
+    Extract values from a response, as specified via %EXTRACT.
+
+    Raises ValueError if any of the values cannot be found.
+    """
+
+    values = {}
+    parsed_json = None
+
+    for extraction in extractions:
+        match extraction.source:
+            case "json":
+                if parsed_json is None:
+                    parsed_json = response.json()
+                value = get_json_path(parsed_json, extraction.expression)
+                if not isinstance(value, str):
+                    value = json.dumps(value)
+
+            case "header":
+                value = response.headers.get(extraction.expression)
+                if value is None:
+                    raise ValueError(f"Header not found: {extraction.expression}")
+
+            case "regex":
+                mo = re.search(extraction.expression, response.text)
+                if mo is None:
+                    raise ValueError(
+                        f"Pattern not found in response: {extraction.expression}"
+                    )
+                value = mo.group(1) if mo.re.groups else mo.group()
+
+            case _:
+                # Unreachable
+                raise ValueError(f"Unsupported extraction: {extraction.source}")
+
+        values[extraction.name] = value
+
+    return values
+
+
+def get_json_path(data: Any, path: str) -> Any:
+    """
+    Get a value from parsed JSON data.
+
+    Supports simple paths like ``$.data.items[0].id``; the leading
+    ``$`` is optional.
+    """
+
+    path = path.removeprefix("$")
+    pos = 0
+    while pos < len(path):
+        mo = RE_JSON_PATH_PART.match(path, pos)
+        if mo is None:
+            raise ValueError(f"Invalid JSON path: {path}")
+        key, index = mo.groups()
+        try:
+            data = data[int(index)] if index is not None else data[key]
+        except (KeyError, IndexError, TypeError):
+            raise ValueError(f"Path not found in response: {path}")
+        pos = mo.end()
+    return data
+
+
+def make_session(pool_size: int) -> Session:
+    """Create a Session, with a connection pool sized for concurrent use"""
+    session = Session()
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
+
+
+def _check_cycles(steps: list[WorkflowStep]):
+    by_name = {step.name: step for step in steps}
+    visited: set[str] = set()
+    visiting: set[str] = set()
+
+    def _visit(name: str, chain: list[str]):
+        if name in visiting:
+            cycle = " -> ".join(chain[chain.index(name) :] + [name])
+            raise ValueError(f"Circular dependency between requests: {cycle}")
+        if name in visited:
+            return
+        visiting.add(name)
+        for dep in sorted(by_name[name].dependencies):
+            _visit(dep, chain + [name])
+        visiting.remove(name)
+        visited.add(name)
+
+    for step in steps:
+        _visit(step.name, [])
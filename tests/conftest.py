@@ -0,0 +1,32 @@
+import threading
+from http.server import ThreadingHTTPServer
+
+import pytest
+
+
+@pytest.fixture
+def http_server_factory():
+    """
+    Start HTTP servers on a random local port, serving requests in a
+    background thread until the end of the test.
+
+    Call with the handler class, and attributes to set on the server
+    (eg. ``daemon_threads=False``, to wait for handlers when closing).
+    """
+
+    servers = []
+
+    def _start(handler, **attributes) -> ThreadingHTTPServer:
+        server = ThreadingHTTPServer(("127.0.0.1", 0), handler)
+        for name, value in attributes.items():
+            setattr(server, name, value)
+        thread = threading.Thread(target=server.serve_forever, daemon=True)
+        thread.start()
+        servers.append(server)
+        return server
+
+    yield _start
+
+    for server in servers:
+        server.shutdown()
+        server.server_close()
@@ -0,0 +1,85 @@
+import io
+import threading
+from textwrap import dedent
+
+import pytest
+
+from requestfile.analysis import analyze_requestfile
+from requestfile.builder import build_request, resource_loader
+from requestfile.parser import parse_requestfile
+
+
+def _parse(text):
+    return parse_requestfile(io.StringIO(dedent(text)))
+
+
+def test_analyze_includes_and_variables():
+    rqf = _parse("""\
+    %SET-DEFAULT: user_id "1"
+    POST "http://example.com/user/${user_id}"|interpolate
+    %HEADER: x-auth-token $auth_token
+
+    %PART: picture <"picture.png"
+    %PART: resume <resume.pdf
+    %PART: again <"picture.png"
+    """)
+    analysis = analyze_requestfile(rqf)
+    assert analysis.includes == ["picture.png", "resume.pdf"]
+    assert analysis.variables_used == {"user_id", "auth_token"}
+    assert analysis.variables_defined == {"user_id"}
+    assert analysis.undefined_variables() == {"auth_token"}
+    assert analysis.undefined_variables(["auth_token"]) == set()
+    assert not analysis.dynamic_definitions
+    assert not analysis.dynamic_references
+
+
+def test_analyze_dynamic_definitions():
+    rqf = _parse("""\
+    %SET: $name "value"
+    GET http://example.com
+    """)
+    analysis = analyze_requestfile(rqf)
+    assert analysis.dynamic_definitions
+    assert analysis.variables_used == {"name"}
+
+
+def test_build_reports_undefined_variables():
+    rqf = _parse("""\
+    GET http://example.com
+    %HEADER: x-one $one
+    %HEADER: x-two $two
+    """)
+    with pytest.raises(ValueError, match="Undefined variables: one, two"):
+        build_request(rqf)
+
+
+class _BarrierLoader(resource_loader.TestingResourceLoader):
+    """Blocks each read until all of them have started"""
+
+    def __init__(self, files):
+        super().__init__()
+        self.files = files
+        self.reads = []
+        self._barrier = threading.Barrier(len(files), timeout=5)
+
+    def read_bytes(self, path):
+        self.reads.append(path)
+        self._barrier.wait()
+        return super().read_bytes(path)
+
+
+def test_build_prefetches_includes():
+    rqf = _parse("""\
+    POST http://example.com
+
+    %PART: first <"first.txt"
+    %PART: second <"second.txt"
+    """)
+    # Reading the files one at a time would break the barrier
+    loader = _BarrierLoader({"first.txt": b"FIRST", "second.txt": b"SECOND"})
+
+    request = build_request(rqf, resource_loader=loader)
+    assert request.files["first"].body == b"FIRST"
+    assert request.files["second"].body == b"SECOND"
+    # Read once each, ahead of evaluation
+    assert sorted(loader.reads) == ["first.txt", "second.txt"]
@@ -0,0 +1,32 @@
+from click.testing import CliRunner
+from requests import Response
+
+from requestfile.cli import batch as batch_module
+from requestfile.cli import main
+from requestfile.scheduler import run_batch
+
+
+def test_batch_priority_file_listed_last(tmp_path, monkeypatch):
+    sent = []
+
+    def _send(request):
+        sent.append(request.url)
+        response = Response()
+        response.status_code = 200
+        return response
+
+    def _run_batch(requests, **kwargs):
+        return run_batch(requests, send=_send, **kwargs)
+
+    monkeypatch.setattr(batch_module, "run_batch", _run_batch)
+    monkeypatch.chdir(tmp_path)
+    names = [f"low{i:02d}.req" for i in range(20)] + ["high.req"]
+    for name in names:
+        (tmp_path / name).write_text(f"GET http://example.com/{name}\n")
+
+    result = CliRunner().invoke(main, ["batch", "-j", "1", "-p", "high*=10", *names])
+
+    assert result.exit_code == 0, result.output
+    assert len(sent) == 21
+    # Sent first, even though far more requests are listed before it
+    assert sent[0] == "http://example.com/high.req"
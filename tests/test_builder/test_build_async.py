@@ -0,0 +1,70 @@
+import asyncio
+import io
+from textwrap import dedent
+
+from requestfile.builder import build_request_async, resource_loader
+from requestfile.parser import parse_requestfile
+
+
+class _SlowLoader(resource_loader.AsyncBaseResourceLoader):
+    def __init__(self, files):
+        self.files = files
+        self.pending = 0
+        self.max_pending = 0
+
+    async def read_bytes(self, path: str) -> bytes:
+        self.pending += 1
+        self.max_pending = max(self.max_pending, self.pending)
+        await asyncio.sleep(0.01)
+        self.pending -= 1
+        return self.files[path]
+
+
+def _parse(text):
+    return parse_requestfile(io.StringIO(dedent(text)))
+
+
+def test_build_request_async_reads_concurrently():
+    rqf = _parse("""\
+    POST http://example.com/upload
+
+    %PART: first <"first.txt"
+    %PART: second <"second.txt"
+    %PART: third <"third.txt"
+    """)
+    loader = _SlowLoader(
+        {"first.txt": b"FIRST", "second.txt": b"SECOND", "third.txt": b"THIRD"}
+    )
+
+    request = asyncio.run(build_request_async(rqf, resource_loader=loader))
+
+    assert loader.max_pending == 3
+    assert [p.body for p in request.files.values()] == [b"FIRST", b"SECOND", b"THIRD"]
+
+
+def test_build_request_async_with_sync_loader():
+    rqf = _parse("""\
+    POST http://example.com/upload
+    %HEADER: x-token <"token.txt"|text
+    """)
+    loader = resource_loader.TestingResourceLoader()
+    loader.files = {"token.txt": b"s3cr3t"}
+
+    request = asyncio.run(build_request_async(rqf, resource_loader=loader))
+
+    assert request.headers["x-token"] == "s3cr3t"
+
+
+def test_build_request_async_include_path_set_in_file():
+    # The path is only known once %SET is evaluated: not prefetched
+    rqf = _parse("""\
+    %SET: f "inc.txt"
+    POST http://example.com/upload
+
+    %INCLUDE: <$f
+    """)
+    loader = _SlowLoader({"inc.txt": b"INCLUDED"})
+
+    request = asyncio.run(build_request_async(rqf, resource_loader=loader))
+
+    assert request.raw_body == b"INCLUDED"
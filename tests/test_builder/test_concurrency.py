@@ -0,0 +1,80 @@
+import io
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from textwrap import dedent
+
+from requestfile.builder import build_request, build_requests_parallel
+from requestfile.parser import parse_requestfile
+from requestfile.utils.registry import Registry
+
+THREADS = 8
+
+
+def _parse(text):
+    return parse_requestfile(io.StringIO(dedent(text)))
+
+
+REQUESTFILE = _parse("""\
+    %SET-DEFAULT: suffix "default"
+    %SET: greeting "hello-${id}-${suffix}"|interpolate
+    POST "http://example.com/${id}"|interpolate
+    X-Id: ${id}
+    %HEADER: X-Greeting $greeting
+    %HEADER: X-Digest "${id}"|interpolate|sha256
+
+    %FIELD: id "${id}"|interpolate
+    """)
+
+
+def _check(request, id):
+    assert request.url == f"http://example.com/{id}"
+    assert request.headers["X-Greeting"] == f"hello-{id}-default"
+    assert request.fields["id"] == id
+
+
+def test_concurrent_builds_are_isolated():
+    barrier = threading.Barrier(THREADS)
+
+    def _build(n):
+        barrier.wait()
+        results = []
+        for i in range(50):
+            id = f"{n}-{i}"
+            results.append((id, build_request(REQUESTFILE, variables={"id": id})))
+        return results
+
+    with ThreadPoolExecutor(THREADS) as pool:
+        for results in pool.map(_build, range(THREADS)):
+            for id, request in results:
+                _check(request, id)
+
+
+def test_variables_are_not_modified():
+    variables = {"id": "1"}
+    build_request(REQUESTFILE, variables=variables)
+    assert variables == {"id": "1"}
+
+
+def test_build_requests_parallel():
+    items = [(REQUESTFILE, {"id": str(i)}) for i in range(20)]
+    for i, request in enumerate(build_requests_parallel(items, max_workers=4)):
+        _check(request, str(i))
+
+    with ThreadPoolExecutor(2) as pool:
+        requests = build_requests_parallel(items[:3], executor=pool)
+    assert [request.fields["id"] for request in requests] == ["0", "1", "2"]
+
+
+def test_registry_concurrent_updates():
+    registry = Registry()
+    barrier = threading.Barrier(THREADS)
+
+    def _declare(n):
+        barrier.wait()
+        for i in range(100):
+            registry.set(f"item-{n}-{i}", i, pure=True)
+            assert registry.get_options(f"item-{n}-{i}") == {"pure": True}
+
+    with ThreadPoolExecutor(THREADS) as pool:
+        list(pool.map(_declare, range(THREADS)))
+    assert len(registry.items) == len(registry.options) == THREADS * 100
@@ -0,0 +1,62 @@
+import io
+from textwrap import dedent
+
+from requestfile.builder import build_request, resource_loader
+from requestfile.builder.filter_cache import FilterCache
+from requestfile.parser import parse_requestfile
+
+
+def _upper(value):
+    return value.upper()
+
+
+def test_filter_cache_hits_and_misses():
+    cache = FilterCache(min_input_size=0)
+    assert cache.apply(("upper",), "hello", _upper) == "HELLO"
+    assert cache.apply(("upper",), "hello", _upper) == "HELLO"
+    assert cache.apply(("other",), "hello", _upper) == "HELLO"
+
+    stats = cache.stats
+    assert stats.hits == 1
+    assert stats.misses == 2
+    assert stats.entries == 2
+
+
+def test_filter_cache_evicts_by_size():
+    cache = FilterCache(max_bytes=10, min_input_size=0)
+    cache.apply(("upper",), b"aaaa", _upper)
+    cache.apply(("upper",), b"bbbb", _upper)
+    cache.apply(("upper",), b"cccc", _upper)
+
+    stats = cache.stats
+    assert stats.entries == 2
+    assert stats.evictions == 1
+    assert stats.total_bytes == 8
+
+
+def test_build_memoizes_pure_filters():
+    rqf = parse_requestfile(
+        io.StringIO(
+            dedent("""\
+            POST http://example.com/upload
+            %HEADER: x-greeting "Hello ${name}"|interpolate|base64
+
+            %PART: blob <"blob.bin"|base64
+            """)
+        )
+    )
+    loader = resource_loader.TestingResourceLoader()
+    loader.files = {"blob.bin": b"\x00" * 3000}
+    cache = FilterCache()
+
+    for name in ("first", "second"):
+        request = build_request(
+            rqf,
+            variables={"name": name},
+            resource_loader=loader,
+            filter_cache=cache,
+        )
+        assert request.files["blob"].body == "AAAA" * 1000
+
+    assert cache.stats.hits == 1
+    assert cache.stats.misses == 1
@@ -0,0 +1,104 @@
+import asyncio
+import io
+from textwrap import dedent
+
+import pytest
+
+from requestfile.analysis import analyze_requestfile
+from requestfile.builder import (
+    build_request,
+    build_request_async,
+    expand_foreach,
+    iter_build_requests,
+)
+from requestfile.parser import parse_requestfile
+
+
+def _parse(path, text):
+    path.write_text(dedent(text))
+    with path.open() as fp:
+        return parse_requestfile(fp, filename=str(path))
+
+
+@pytest.fixture
+def docs(tmp_path):
+    (tmp_path / "docs" / "sub").mkdir(parents=True)
+    for name in ("b.json", "a.json", "sub/c.json", "readme.txt"):
+        (tmp_path / "docs" / name).write_text(f'{{"name": "{name}"}}')
+    return tmp_path
+
+
+def test_include_from_variable(tmp_path):
+    (tmp_path / "data.txt").write_bytes(b"hello")
+    requestfile = _parse(
+        tmp_path / "request",
+        """\
+        POST http://example.com
+
+        %INCLUDE: <$path
+        """,
+    )
+    analysis = analyze_requestfile(requestfile)
+    assert analysis.includes == []
+    assert analysis.include_variables == ["path"]
+    assert analysis.variables_used == {"path"}
+
+    request = build_request(requestfile, variables={"path": "data.txt"})
+    assert request.raw_body == b"hello"
+
+    request = asyncio.run(
+        build_request_async(requestfile, variables={"path": "data.txt"})
+    )
+    assert request.raw_body == b"hello"
+
+
+def test_foreach(docs):
+    requestfile = _parse(
+        docs / "upload",
+        """\
+        %FOREACH: doc "docs/**/*.json"
+        POST "http://example.com/${doc}"|interpolate
+
+        %INCLUDE: <$doc
+        """,
+    )
+    assert list(expand_foreach(requestfile)) == [
+        {"doc": "docs/a.json"},
+        {"doc": "docs/b.json"},
+        {"doc": "docs/sub/c.json"},
+    ]
+
+    requests = iter_build_requests(requestfile, stream=True)
+    request = next(requests)
+    assert request.url == "http://example.com/docs/a.json"
+    assert request.raw_body.read() == b'{"name": "a.json"}'
+    assert [request.url for request in requests] == [
+        "http://example.com/docs/b.json",
+        "http://example.com/docs/sub/c.json",
+    ]
+
+    with pytest.raises(ValueError, match="Unbound %FOREACH variable: doc"):
+        build_request(requestfile)
+
+
+def test_foreach_combinations(docs):
+    requestfile = _parse(
+        docs / "upload",
+        """\
+        %FOREACH: doc "docs/*.json"
+        %FOREACH: readme $pattern
+        POST http://example.com
+        """,
+    )
+    bindings = list(expand_foreach(requestfile, {"pattern": "docs/*.txt"}))
+    assert bindings == [
+        {"doc": "docs/a.json", "readme": "docs/readme.txt"},
+        {"doc": "docs/b.json", "readme": "docs/readme.txt"},
+    ]
+
+
+def test_no_foreach():
+    requestfile = parse_requestfile(io.StringIO("GET http://example.com\n"))
+    assert list(expand_foreach(requestfile)) == [{}]
+    [request] = iter_build_requests(requestfile)
+    assert request.url == "http://example.com"
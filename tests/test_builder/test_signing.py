@@ -0,0 +1,100 @@
+import base64
+import hashlib
+import hmac
+import io
+from textwrap import dedent
+
+from multidict import CIMultiDict
+
+from requestfile.builder import build_request, resource_loader
+from requestfile.builder.signing import sign_aws4
+from requestfile.parser import parse_requestfile
+
+
+def _parse(text):
+    return parse_requestfile(io.StringIO(dedent(text)))
+
+
+def test_content_digest_and_hmac_headers():
+    rqf = _parse("""\
+    POST http://example.com/webhook
+    X-First: 1
+    %CONTENT-DIGEST: sha-256
+    %SIGN-HMAC: x-signature $secret encoding=base64
+    X-Last: 2
+    Content-Type: application/json
+
+    {"hello": "world"}
+    """)
+    request = build_request(rqf, variables={"secret": "s3cr3t"})
+
+    body = b'{"hello": "world"}\n'
+    digest = base64.b64encode(hashlib.sha256(body).digest()).decode()
+    signature = hmac.new(b"s3cr3t", body, hashlib.sha256).digest()
+
+    assert list(request.headers.items()) == [
+        ("X-First", "1"),
+        ("Content-Digest", f"sha-256=:{digest}:"),
+        ("x-signature", base64.b64encode(signature).decode()),
+        ("X-Last", "2"),
+        ("Content-Type", "application/json"),
+    ]
+
+
+def test_content_digest_over_streamed_body():
+    rqf = _parse("""\
+    POST http://example.com/upload
+    %CONTENT-DIGEST: sha-512
+
+    %INCLUDE: <"data.bin"
+    """)
+    loader = resource_loader.TestingResourceLoader()
+    loader.files = {"data.bin": b"\x00" * 100_000}
+
+    request = build_request(rqf, resource_loader=loader, stream=True)
+
+    digest = base64.b64encode(hashlib.sha512(b"\x00" * 100_000).digest()).decode()
+    assert request.headers["Content-Digest"] == f"sha-512=:{digest}:"
+
+
+def test_sign_aws4_test_vector():
+    # "get-vanilla" example from the AWS SigV4 test suite
+    authorization = sign_aws4(
+        method="GET",
+        url="https://example.amazonaws.com/",
+        params=[],
+        headers=CIMultiDict({"X-Amz-Date": "20150830T123600Z"}),
+        payload_hash=hashlib.sha256(b"").hexdigest(),
+        access_key="AKIDEXAMPLE",
+        secret_key="wJalrXUtnFEMI/K7MDENG+bPxRfiCYEXAMPLEKEY",
+        region="us-east-1",
+        service="service",
+        amz_date="20150830T123600Z",
+    )
+    assert authorization == (
+        "AWS4-HMAC-SHA256 "
+        "Credential=AKIDEXAMPLE/20150830/us-east-1/service/aws4_request, "
+        "SignedHeaders=host;x-amz-date, "
+        "Signature=5fa00fa31553b73ebf1942676e86291e8372ff2a2260956d9b8aae1d763fbf31"
+    )
+
+
+def test_sign_aws4_command():
+    rqf = _parse("""\
+    PUT http://bucket.s3.amazonaws.com/key.txt
+    %SIGN-AWS4: AKID secret us-east-1 s3
+
+    Hello
+    """)
+    request = build_request(rqf)
+
+    assert request.headers["X-Amz-Content-Sha256"] == (
+        hashlib.sha256(b"Hello\n").hexdigest()
+    )
+    assert request.headers["Authorization"].startswith(
+        "AWS4-HMAC-SHA256 Credential=AKID/"
+    )
+    assert (
+        "SignedHeaders=host;x-amz-content-sha256;x-amz-date,"
+        in (request.headers["Authorization"])
+    )
@@ -0,0 +1,96 @@
+import io
+import os
+import random
+from textwrap import dedent
+
+import pytest
+
+from requestfile.builder import build_request, resource_loader
+from requestfile.builder.filters import get_filter, get_incremental_filter
+from requestfile.builder.streaming import StreamedValue
+from requestfile.parser import parse_requestfile
+
+SAMPLE_TEXT = "Hello, ${name}! Ünïcödé ⟹ 🤟 100% /path?a=b&c=d\n" * 50
+
+
+def _chunked(data, seed=0):
+    rnd = random.Random(seed)
+    pos = 0
+    while pos < len(data):
+        size = rnd.randint(1, 7)
+        yield data[pos : pos + size]
+        pos += size
+
+
+def _run_incremental(name, data):
+    filter_ = get_incremental_filter(name)()
+    output = [filter_.feed(chunk) for chunk in _chunked(data)]
+    output.append(filter_.flush())
+    return output
+
+
+@pytest.mark.parametrize(
+    "name,data",
+    [
+        ("base64", os.urandom(1000)),
+        ("from-base64", get_filter("base64")(os.urandom(1000))),
+        ("urlquote", SAMPLE_TEXT),
+        ("urlunquote", get_filter("urlquote")(SAMPLE_TEXT)),
+        ("text", SAMPLE_TEXT.encode()),
+    ],
+)
+def test_incremental_filters_match_regular_filters(name, data):
+    expected = get_filter(name)(data)
+    output = _run_incremental(name, data)
+    if isinstance(expected, str):
+        assert "".join(output) == expected
+    else:
+        assert b"".join(output) == expected
+
+
+def _parse(text):
+    return parse_requestfile(io.StringIO(dedent(text)))
+
+
+def test_build_streams_included_files():
+    rqf = _parse("""\
+    %SET: name "world"
+    POST http://example.com/upload
+
+    %PART: blob <"blob.bin"|base64
+    %PART: greeting <"greeting.txt"|interpolate
+    """)
+    loader = resource_loader.TestingResourceLoader()
+    loader.files = {
+        "blob.bin": os.urandom(1000),
+        "greeting.txt": SAMPLE_TEXT.encode(),
+    }
+
+    request = build_request(rqf, resource_loader=loader, stream=True)
+
+    blob = request.files["blob"].body
+    assert isinstance(blob, StreamedValue)
+    assert blob.text
+    assert blob.size == 1336
+    assert blob.read() == get_filter("base64")(loader.files["blob.bin"]).encode()
+
+    greeting = request.files["greeting"].body
+    assert isinstance(greeting, StreamedValue)
+    assert greeting.read() == SAMPLE_TEXT.replace("${name}", "world").encode()
+
+
+def test_build_streams_raw_body():
+    rqf = _parse("""\
+    POST http://example.com/upload
+
+    %INCLUDE: <"first.bin"
+    %INCLUDE: <"second.bin"
+    """)
+    loader = resource_loader.TestingResourceLoader()
+    loader.files = {"first.bin": b"\x00\x01", "second.bin": b"\x02\x03"}
+
+    request = build_request(rqf, resource_loader=loader, stream=True)
+
+    assert isinstance(request.raw_body, StreamedValue)
+    assert request.raw_body.size == 4
+    assert request.raw_body.as_file().read() == b"\x00\x01\x02\x03"
@@ -0,0 +1,108 @@
+import os
+from textwrap import dedent
+
+from click.testing import CliRunner
+
+from requestfile.catalog import Catalog
+from requestfile.cli import main
+
+FILES = {
+    "orders/create": """\
+        %SET-DEFAULT: tenant "acme"
+        POST "https://api.example.com/v2/orders?tenant=${tenant}"|interpolate
+        Content-Type: application/json
+        %HEADER: X-Api-Key $api_key
+
+        %INCLUDE: <order.json
+        %EXTRACT: order_id json="$.id"
+        """,
+    "orders/list": """\
+        GET "https://api.example.com/v2/orders"
+        Accept: application/json
+        """,
+    "users/get": """\
+        GET "https://api.example.com/v1/users/${user_id}"|interpolate
+        """,
+    "broken": """\
+        %NOT A COMMAND
+        """,
+}
+
+
+def _write_files(root, files):
+    for name, text in files.items():
+        path = root / name
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(dedent(text))
+
+
+def _paths(entries):
+    return [entry.path for entry in entries]
+
+
+def test_index_and_find(tmp_path):
+    _write_files(tmp_path, FILES)
+    with Catalog(str(tmp_path / "index.db")) as catalog:
+        stats = catalog.update(str(tmp_path))
+        assert (stats.added, stats.updated, stats.removed) == (4, 0, 0)
+        assert stats.errors == ["broken"]
+
+        assert _paths(catalog.find(method="post")) == ["orders/create"]
+        assert _paths(catalog.find(url="*/v2/orders*")) == [
+            "orders/create",
+            "orders/list",
+        ]
+        assert _paths(catalog.find(url="*/v2/orders*", method="GET")) == ["orders/list"]
+        assert _paths(catalog.find(uses="tenant")) == ["orders/create"]
+        assert _paths(catalog.find(uses="user_id")) == ["users/get"]
+        assert _paths(catalog.find(defines="tenant")) == ["orders/create"]
+        assert _paths(catalog.find(extracts="order_id")) == ["orders/create"]
+        assert _paths(catalog.find(header="x-api-key")) == ["orders/create"]
+        assert _paths(catalog.find(header="Accept")) == ["orders/list"]
+        assert _paths(catalog.find(command="INCLUDE")) == ["orders/create"]
+        assert _paths(catalog.find(include="*.json")) == ["orders/create"]
+        assert _paths(catalog.find(errors=True)) == ["broken"]
+
+        (entry,) = catalog.find(uses="user_id")
+        assert entry.method == "GET"
+        assert entry.url == "https://api.example.com/v1/users/${user_id}"
+
+
+def test_incremental_update(tmp_path):
+    _write_files(tmp_path, FILES)
+    with Catalog(str(tmp_path / "index.db")) as catalog:
+        catalog.update(str(tmp_path))
+
+        stats = catalog.update(str(tmp_path))
+        assert (stats.added, stats.updated, stats.unchanged) == (0, 0, 4)
+
+        # Touched, but not modified: not parsed again
+        path = tmp_path / "users/get"
+        st = path.stat()
+        os.utime(path, ns=(st.st_atime_ns, st.st_mtime_ns + 1_000_000_000))
+        stats = catalog.update(str(tmp_path))
+        assert (stats.updated, stats.unchanged) == (0, 4)
+
+        (tmp_path / "orders/list").write_text("DELETE https://example.com/v2/x\n")
+        (tmp_path / "broken").unlink()
+        stats = catalog.update(str(tmp_path))
+        assert (stats.updated, stats.removed, stats.unchanged) == (1, 1, 2)
+
+        assert _paths(catalog.find(method="DELETE")) == ["orders/list"]
+        assert catalog.find(header="accept") == []
+        assert len(catalog) == 3
+
+
+def test_cli(tmp_path):
+    _write_files(tmp_path, FILES)
+    runner = CliRunner()
+
+    result = runner.invoke(main, ["index", str(tmp_path), "-j", "1"])
+    assert result.exit_code == 0, result.output
+
+    result = runner.invoke(main, ["find", str(tmp_path), "--uses", "tenant"])
+    assert result.exit_code == 0, result.output
+    assert result.output.splitlines() == [str(tmp_path / "orders/create")]
+
+    result = runner.invoke(main, ["find", str(tmp_path), "--method", "PATCH"])
+    assert result.exit_code == 1
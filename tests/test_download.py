@@ -0,0 +1,177 @@
+import json
+import os
+import re
+import time
+from http.server import BaseHTTPRequestHandler
+
+import pytest
+from urllib3.exceptions import ProtocolError
+
+from requestfile.builder.request import Request
+from requestfile.download import MIN_PART_SIZE, STATE_SUFFIX, download
+
+DATA = os.urandom(3 * MIN_PART_SIZE + 123)
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self):
+        server = self.server
+        server.ranges.append(self.headers.get("Range"))
+        mo = re.fullmatch(r"bytes=(\d+)-(\d+)", self.headers.get("Range") or "")
+        if mo is None or not server.accept_ranges:
+            self._send(200, server.data)
+            return
+
+        start, end = int(mo.group(1)), int(mo.group(2)) + 1
+        headers = {"Content-Range": f"bytes {start}-{end - 1}/{len(server.data)}"}
+        body = server.data[start:end]
+        if server.fail_after is not None and len(body) > server.fail_after:
+            # Send part of the range, then drop the connection
+            server.fail_after = None
+            self._send(206, body, headers, truncate=len(body) // 2)
+            return
+        self._send(206, body, headers)
+
+    def _send(self, status, body, headers=None, truncate=None):
+        self.send_response(status)
+        self.send_header("Content-Length", str(len(body)))
+        self.send_header("ETag", self.server.etag)
+        for key, value in (headers or {}).items():
+            self.send_header(key, value)
+        self.end_headers()
+        if truncate is not None:
+            self.wfile.write(body[:truncate])
+            self.close_connection = True
+            return
+        if self.server.delay:
+            # Slow download, a piece at a time
+            for start in range(0, len(body), 16 * 1024):
+                self.wfile.write(body[start : start + 16 * 1024])
+                time.sleep(self.server.delay)
+            return
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def http_server(http_server_factory):
+    return http_server_factory(
+        _Handler,
+        # Wait for handlers to finish when closing, so no threads are left
+        daemon_threads=False,
+        data=DATA,
+        etag='"v1"',
+        accept_ranges=True,
+        fail_after=None,
+        delay=0,
+        ranges=[],
+    )
+
+
+def _request(server):
+    port = server.server_address[1]
+    return Request(method="GET", url=f"http://127.0.0.1:{port}/file")
+
+
+def test_download_ranges(http_server, tmp_path):
+    path = str(tmp_path / "file")
+    result = download(_request(http_server), path, parts=3)
+
+    assert result.parts == 3
+    assert result.size == len(DATA)
+    assert open(path, "rb").read() == DATA
+    assert not os.path.exists(path + STATE_SUFFIX)
+    # The first byte, to find the size, then the ranges
+    assert http_server.ranges[0] == "bytes=0-0"
+    assert len(http_server.ranges) == 4
+
+
+def test_download_small(http_server, tmp_path):
+    # Not split into ranges smaller than MIN_PART_SIZE
+    http_server.data = b"hello"
+    result = download(_request(http_server), str(tmp_path / "file"), parts=8)
+    assert result.parts == 1
+    assert open(tmp_path / "file", "rb").read() == b"hello"
+
+
+def test_download_no_ranges(http_server, tmp_path):
+    http_server.accept_ranges = False
+    path = str(tmp_path / "file")
+    result = download(_request(http_server), path, parts=3)
+
+    assert result.parts == 0
+    assert open(path, "rb").read() == DATA
+    assert len(http_server.ranges) == 1
+
+
+def test_download_retry(http_server, tmp_path):
+    http_server.fail_after = MIN_PART_SIZE // 2
+    path = str(tmp_path / "file")
+    result = download(_request(http_server), path, parts=3, retries=1)
+
+    assert open(path, "rb").read() == DATA
+    assert result.resumed == 0
+    # The failed range is retried from where it stopped
+    assert len(http_server.ranges) == 5
+    start, end = re.fullmatch(r"bytes=(\d+)-(\d+)", http_server.ranges[-1]).groups()
+    assert int(end) - int(start) + 1 < MIN_PART_SIZE
+
+
+def test_download_resume(http_server, tmp_path):
+    http_server.fail_after = MIN_PART_SIZE // 2
+    path = str(tmp_path / "file")
+    with pytest.raises(ProtocolError):
+        download(_request(http_server), path, parts=3, retries=0)
+
+    # Progress was saved
+    with open(path + STATE_SUFFIX) as fp:
+        state = json.load(fp)
+    done = sum(done for _, _, done in state["ranges"])
+    assert 0 < done < len(DATA)
+
+    result = download(_request(http_server), path, parts=3)
+    assert result.resumed == done
+    assert open(path, "rb").read() == DATA
+    assert not os.path.exists(path + STATE_SUFFIX)
+
+
+def test_download_resume_changed(http_server, tmp_path):
+    http_server.fail_after = MIN_PART_SIZE // 2
+    path = str(tmp_path / "file")
+    with pytest.raises(ProtocolError):
+        download(_request(http_server), path, parts=3, retries=0)
+
+    # The resource changed: start over
+    http_server.etag = '"v2"'
+    http_server.data = DATA[::-1]
+    result = download(_request(http_server), path, parts=3)
+    assert result.resumed == 0
+    assert open(path, "rb").read() == DATA[::-1]
+
+
+def test_download_error_stops_ranges(http_server, tmp_path):
+    # The other ranges would take over 3s to finish
+    http_server.fail_after = MIN_PART_SIZE // 2
+    http_server.delay = 0.05
+    path = str(tmp_path / "file")
+
+    started = time.monotonic()
+    with pytest.raises(ProtocolError):
+        download(_request(http_server), path, parts=3, retries=0)
+    assert time.monotonic() - started < 1.5
+
+    with open(path + STATE_SUFFIX) as fp:
+        state = json.load(fp)
+    assert sum(done for _, _, done in state["ranges"]) < len(DATA)
+
+
+def test_download_over_larger_file(http_server, tmp_path):
+    path = tmp_path / "file"
+    path.write_bytes(b"x" * (len(DATA) + 10000))
+
+    download(_request(http_server), str(path), parts=3)
+    assert path.read_bytes() == DATA
@@ -0,0 +1,137 @@
+import time
+from functools import partial
+from http.server import BaseHTTPRequestHandler
+
+import pytest
+
+from requestfile.builder.request import Request
+from requestfile.eventstream import (
+    SSEParser,
+    StreamEvent,
+    StreamTimeout,
+    iter_events,
+    iter_lines,
+)
+from requestfile.ext.requests import send as send_request
+
+
+def test_iter_lines():
+    chunks = [b"\xef\xbb\xbfone\r", b"\ntwo\rthree\n\n", b"f\xc3", b"\xbcnf\r", b"six"]
+    assert list(iter_lines(chunks)) == ["one", "two", "three", "", "fünf", "six"]
+
+
+def test_sse_parser():
+    parser = SSEParser()
+    lines = [
+        ": keep-alive",
+        "event: update",
+        "data: first",
+        "data:second",
+        "id: 42",
+        "retry: 1500",
+        "",
+        "",
+        "data",
+        "",
+    ]
+    events = [event for line in lines if (event := parser.feed(line))]
+    assert events == [
+        StreamEvent("first\nsecond", event="update", id="42"),
+        StreamEvent("", id="42"),
+    ]
+    assert parser.retry == 1.5
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self):
+        server = self.server
+        server.last_event_ids.append(self.headers.get("Last-Event-ID"))
+        self.send_response(server.status)
+        self.send_header("Content-Type", server.content_type)
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+        for chunk in server.chunks:
+            if isinstance(chunk, float):
+                time.sleep(chunk)
+                continue
+            self.wfile.write(b"%x\r\n%s\r\n" % (len(chunk), chunk))
+            self.wfile.flush()
+        self.wfile.write(b"0\r\n\r\n")
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def http_server(http_server_factory):
+    return http_server_factory(
+        _Handler,
+        # Wait for handlers to finish when closing, so no threads are left
+        daemon_threads=False,
+        status=200,
+        content_type="text/event-stream",
+        chunks=[],
+        last_event_ids=[],
+    )
+
+
+def _iter_events(server, **kwargs):
+    port = server.server_address[1]
+    request = Request(method="GET", url=f"http://127.0.0.1:{port}/events")
+    return iter_events(request, partial(send_request, stream=True), **kwargs)
+
+
+def test_sse_incremental(http_server):
+    http_server.chunks = [b"data: one\n\n", 0.5, b"data: two\n\n"]
+    events = _iter_events(http_server)
+
+    # The first event arrives before the stream ends
+    first = next(events)
+    assert first.data == "one"
+    assert first.elapsed < 0.4
+    assert next(events).data == "two"
+    assert next(events, None) is None
+
+
+def test_sse_reconnect(http_server):
+    http_server.chunks = [b"retry: 10\nid: 1\ndata: one\n\n", b"data: incomplete\n"]
+    events = list(_iter_events(http_server, reconnect=True, max_reconnects=2))
+
+    assert [(e.data, e.id, e.connection) for e in events] == [
+        ("one", "1", 1),
+        ("one", "1", 2),
+        ("one", "1", 3),
+    ]
+    assert http_server.last_event_ids == [None, "1", "1"]
+
+
+def test_ndjson(http_server):
+    http_server.content_type = "application/x-ndjson"
+    http_server.chunks = [b'{"a": 1}\n{"a"', b": 2}\n\n[3]"]
+    events = list(_iter_events(http_server))
+    assert [event.value for event in events] == [{"a": 1}, {"a": 2}, [3]]
+
+
+def test_idle_timeout(http_server):
+    http_server.chunks = [b"data: one\n\n", 1.0]
+    events = _iter_events(http_server, idle_timeout=0.2)
+    assert next(events).data == "one"
+    with pytest.raises(StreamTimeout, match="No data"):
+        next(events)
+
+
+def test_total_timeout(http_server):
+    http_server.chunks = [b"data: one\n\n", 0.1] * 20
+    started = time.monotonic()
+    with pytest.raises(StreamTimeout, match="over 0.5s"):
+        for _ in _iter_events(http_server, total_timeout=0.5, reconnect=True):
+            pass
+    assert time.monotonic() - started < 1.0
+
+
+def test_no_content(http_server):
+    # 204 stops reconnecting
+    http_server.status = 204
+    assert list(_iter_events(http_server, reconnect=True)) == []
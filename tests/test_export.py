@@ -0,0 +1,112 @@
+import io
+import json
+from textwrap import dedent
+
+from click.testing import CliRunner
+
+from requestfile.cli import main
+from requestfile.export import CurlWriter, HarWriter, export_requestfiles
+
+FILES = {
+    "create": """\
+        POST "https://api.example.com/items?tenant=${tenant}"|interpolate
+        Content-Type: application/json
+        %COOKIE: session abc
+
+        {"name": "it's"}
+        """,
+    "upload": """\
+        PUT https://api.example.com/upload
+
+        %INCLUDE: <data.bin
+        """,
+}
+
+
+def _write_files(root):
+    paths = []
+    for name, text in FILES.items():
+        (root / name).write_text(dedent(text))
+        paths.append(str(root / name))
+    (root / "data.bin").write_bytes(bytes(range(256)) * 4)
+    return paths
+
+
+def _export(tmp_path, writer_class, **kwargs):
+    paths = _write_files(tmp_path)
+    stream = io.StringIO()
+    with writer_class(stream) as writer:
+        count = export_requestfiles(
+            paths,
+            writer,
+            body_dir=str(tmp_path / "bodies"),
+            base_dir=str(tmp_path),
+            inline_limit=100,
+            **kwargs,
+        )
+    return count, stream.getvalue()
+
+
+def test_export_har(tmp_path):
+    count, output = _export(
+        tmp_path, HarWriter, variable_sets=[{"tenant": "a"}, {"tenant": "b"}]
+    )
+    assert count == 4
+
+    entries = json.loads(output)["log"]["entries"]
+    names = [entry["comment"].rpartition("/")[2] for entry in entries]
+    assert names == ["create[1]", "create[2]", "upload[1]", "upload[2]"]
+
+    request = entries[0]["request"]
+    assert request["url"] == "https://api.example.com/items?tenant=a"
+    assert request["queryString"] == [{"name": "tenant", "value": "a"}]
+    assert request["cookies"] == [{"name": "session", "value": "abc"}]
+    assert request["postData"] == {
+        "mimeType": "application/json",
+        "text": '{"name": "it\'s"}\n',
+    }
+    assert entries[1]["request"]["url"].endswith("?tenant=b")
+
+    # Binary body, written to a file
+    post_data = entries[2]["request"]["postData"]
+    assert post_data["text"] == ""
+    assert post_data["_file"] == "bodies/00003-upload-1.body"
+    body = (tmp_path / post_data["_file"]).read_bytes()
+    assert body == bytes(range(256)) * 4
+    assert entries[2]["request"]["bodySize"] == 1024
+
+
+def test_export_parallel(tmp_path):
+    _, expected = _export(tmp_path, CurlWriter, variable_sets=[{"tenant": "a"}])
+    _, output = _export(
+        tmp_path, CurlWriter, variable_sets=[{"tenant": "a"}], max_workers=2
+    )
+    assert output == expected
+
+
+def test_export_curl(tmp_path):
+    _write_files(tmp_path)
+    result = CliRunner().invoke(
+        main,
+        [
+            "export",
+            str(tmp_path / "create"),
+            str(tmp_path / "upload"),
+            "-a",
+            "tenant=a",
+            "-f",
+            "curl",
+            "-o",
+            str(tmp_path / "export.sh"),
+            "-j",
+            "1",
+        ],
+    )
+    assert result.exit_code == 0, result.output
+
+    script = (tmp_path / "export.sh").read_text()
+    assert "curl -X POST 'https://api.example.com/items?tenant=a' \\\n" in script
+    assert "  -H 'Cookie: session=abc' \\\n" in script
+    assert '  --data-raw \'{"name": "it\'"\'"\'s"}\n\'\n' in script
+    assert "  --data-binary @export.sh.bodies/00002-upload.body\n" in script
+    assert "Content-Length" not in script
@@ -0,0 +1,113 @@
+import asyncio
+import json
+import threading
+from textwrap import dedent
+
+import pytest
+
+from requestfile.builder import build_request
+from requestfile.ext.asgi import send_asgi
+from requestfile.parser import parse_requestfile
+
+
+def _build(text, **variables):
+    lines = dedent(text).lstrip().splitlines(keepends=True)
+    return build_request(parse_requestfile(lines), variables=variables)
+
+
+async def echo_app(scope, receive, send):
+    body = b""
+    while True:
+        message = await receive()
+        body += message.get("body", b"")
+        if not message.get("more_body"):
+            break
+
+    data = {
+        "method": scope["method"],
+        "path": scope["path"],
+        "query": scope["query_string"].decode(),
+        "headers": {k.decode(): v.decode() for k, v in scope["headers"]},
+        "body": body.decode(),
+    }
+    await send(
+        {
+            "type": "http.response.start",
+            "status": 200,
+            "headers": [(b"content-type", b"application/json")],
+        }
+    )
+    await send({"type": "http.response.body", "body": json.dumps(data).encode()})
+
+
+def test_send_request():
+    request = _build(
+        """
+        POST "http://example.com/some%20path?a=1"
+        X-Hello: World
+
+        hello
+        """
+    )
+    response = send_asgi(request, echo_app)
+    data = response.json()
+
+    assert response.status_code == 200
+    assert response.reason == "OK"
+    assert data["method"] == "POST"
+    assert data["path"] == "/some path"
+    assert data["query"] == "a=1"
+    assert data["headers"]["host"] == "example.com"
+    assert data["headers"]["x-hello"] == "World"
+    assert data["body"] == "hello\n"
+
+
+def test_send_multipart():
+    request = _build(
+        """
+        POST http://example.com/upload
+
+        %PART: myfile "hello.txt" "text/plain" "Hello World"
+        """
+    )
+    data = send_asgi(request, echo_app).json()
+
+    assert data["headers"]["content-type"].startswith("multipart/form-data")
+    assert "Hello World" in data["body"]
+
+
+def test_streamed_response():
+    produced = []
+    resume = threading.Event()
+
+    async def app(scope, receive, send):
+        await send({"type": "http.response.start", "status": 200, "headers": []})
+        for i in range(3):
+            await asyncio.to_thread(resume.wait)
+            produced.append(i)
+            body = f"chunk {i}\n".encode()
+            await send({"type": "http.response.body", "body": body, "more_body": True})
+        await send({"type": "http.response.body", "body": b""})
+
+    response = send_asgi(_build("GET http://example.com/\n"), app, stream=True)
+    assert response.status_code == 200
+    assert produced == []
+
+    resume.set()
+    assert list(response.iter_lines()) == [b"chunk 0", b"chunk 1", b"chunk 2"]
+
+
+def test_app_error():
+    async def app(scope, receive, send):
+        raise ValueError("Boom")
+
+    with pytest.raises(ValueError, match="Boom"):
+        send_asgi(_build("GET http://example.com/\n"), app)
+
+
+def test_bytes_header_value():
+    # As read from an included file
+    request = _build("GET http://example.com/\n")
+    request.headers["X-B"] = b"abc"
+    response = send_asgi(request, echo_app)
+    assert response.json()["headers"]["x-b"] == "abc"
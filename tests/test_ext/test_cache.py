@@ -0,0 +1,134 @@
+import pytest
+from requests import Response
+
+from requestfile.builder.fingerprint import fingerprint_request
+from requestfile.builder.request import Request
+from requestfile.ext import cache as cache_module
+from requestfile.ext.cache import HttpCache, send_cached
+
+
+def _make_response(status=200, body=b"", headers=None):
+    response = Response()
+    response.status_code = status
+    response.reason = "OK"
+    response.url = "http://example.com/data"
+    response._content = body
+    response.headers.update(headers or {})
+    return response
+
+
+@pytest.fixture
+def sent(monkeypatch):
+    sent = []
+    responses = []
+
+    def _send(request, **kwargs):
+        sent.append(request)
+        return responses.pop(0)
+
+    monkeypatch.setattr(cache_module, "send_request", _send)
+    return sent, responses
+
+
+def _make_request(**kwargs):
+    request = Request(method="GET", url="http://example.com/data")
+    request.headers.update(kwargs)
+    return request
+
+
+def test_fingerprint_ignores_headers():
+    first = _make_request(**{"X-Request-Id": "1", "Accept": "text/plain"})
+    second = _make_request(**{"X-Request-Id": "2", "Accept": "text/plain"})
+    third = _make_request(**{"X-Request-Id": "2", "Accept": "text/html"})
+
+    assert fingerprint_request(first) != fingerprint_request(second)
+    ignore = ["x-request-id"]
+    assert fingerprint_request(first, ignore) == fingerprint_request(second, ignore)
+    assert fingerprint_request(second, ignore) != fingerprint_request(third, ignore)
+
+
+def test_serves_fresh_responses_from_cache(tmp_path, sent):
+    sent, responses = sent
+    cache = HttpCache(str(tmp_path))
+    responses.append(
+        _make_response(body=b"hello", headers={"Cache-Control": "max-age=60"})
+    )
+
+    first = send_cached(_make_request(), cache)
+    second = send_cached(_make_request(), cache)
+
+    assert len(sent) == 1
+    assert not first.from_cache
+    assert second.from_cache
+    assert second.content == b"hello"
+    assert second.headers["Cache-Control"] == "max-age=60"
+
+
+def test_revalidates_stale_responses(tmp_path, sent):
+    sent, responses = sent
+    cache = HttpCache(str(tmp_path))
+    responses.append(_make_response(body=b"hello", headers={"ETag": '"v1"'}))
+    responses.append(_make_response(status=304))
+
+    send_cached(_make_request(), cache)
+    response = send_cached(_make_request(), cache)
+
+    assert len(sent) == 2
+    assert sent[1].headers["If-None-Match"] == '"v1"'
+    assert response.from_cache
+    assert response.status_code == 200
+    assert response.content == b"hello"
+
+
+def test_evicts_least_recently_used(tmp_path, sent):
+    sent, responses = sent
+    cache = HttpCache(str(tmp_path), max_bytes=10)
+
+    for path in ("/a", "/b", "/c"):
+        responses.append(_make_response(body=b"12345", headers={"ETag": path}))
+        request = Request(method="GET", url=f"http://example.com{path}")
+        send_cached(request, cache)
+
+    assert len(list(tmp_path.glob("*.json"))) == 2
+
+
+def test_stores_decoded_body_headers(tmp_path, sent):
+    # The body is stored decoded: encoding headers no longer apply
+    sent, responses = sent
+    cache = HttpCache(str(tmp_path))
+    responses.append(
+        _make_response(
+            body=b"hello",
+            headers={
+                "Cache-Control": "max-age=60",
+                "Content-Encoding": "gzip",
+                "Content-Length": "25",
+            },
+        )
+    )
+
+    send_cached(_make_request(), cache)
+    response = send_cached(_make_request(), cache)
+
+    assert response.from_cache
+    assert response.content == b"hello"
+    assert "Content-Encoding" not in response.headers
+    assert response.headers["Content-Length"] == "5"
+
+
+def test_custom_send(tmp_path, sent):
+    sent, _ = sent
+    custom = []
+
+    def _send(request):
+        custom.append(request)
+        return _make_response(body=b"hello", headers={"Cache-Control": "max-age=60"})
+
+    cache = HttpCache(str(tmp_path))
+    send_cached(_make_request(), cache, send=_send)
+    response = send_cached(_make_request(), cache, send=_send)
+
+    assert response.from_cache
+    assert response.content == b"hello"
+    assert len(custom) == 1
+    assert sent == []
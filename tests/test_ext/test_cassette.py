@@ -0,0 +1,105 @@
+import pytest
+from requests import Response
+
+from requestfile.builder.request import Request
+from requestfile.ext import cassette as cassette_module
+from requestfile.ext.cassette import MODE_AUTO, MODE_RECORD, MODE_REPLAY, Cassette
+
+
+def _make_response(status=200, body=b""):
+    response = Response()
+    response.status_code = status
+    response.reason = "OK"
+    response.url = "http://example.com/data"
+    response._content = body
+    response.headers.update({"Content-Type": "text/plain"})
+    return response
+
+
+@pytest.fixture
+def sent(monkeypatch):
+    sent = []
+
+    def _send(request, **kwargs):
+        sent.append(request)
+        return _make_response(body=f"response {len(sent)}".encode())
+
+    monkeypatch.setattr(cassette_module, "send_request", _send)
+    return sent
+
+
+def _make_request(url="http://example.com/data", **headers):
+    request = Request(method="GET", url=url)
+    request.headers.update(headers)
+    return request
+
+
+def test_record_then_replay(tmp_path, sent):
+    path = str(tmp_path / "cassette.db")
+
+    with Cassette(path, MODE_RECORD) as cassette:
+        cassette.send(_make_request())
+        cassette.send(_make_request(url="http://example.com/other"))
+        assert len(cassette) == 2
+
+    with Cassette(path, MODE_REPLAY) as cassette:
+        response = cassette.send(_make_request())
+        assert response.status_code == 200
+        assert response.content == b"response 1"
+        assert response.headers["content-type"] == "text/plain"
+
+        with pytest.raises(KeyError):
+            cassette.send(_make_request(url="http://example.com/missing"))
+
+    assert len(sent) == 2
+
+
+def test_replay_ignores_headers(tmp_path, sent):
+    path = str(tmp_path / "cassette.db")
+    ignore = ["X-Request-Id"]
+
+    with Cassette(path, MODE_RECORD, ignore_headers=ignore) as cassette:
+        cassette.send(_make_request(**{"X-Request-Id": "1"}))
+
+    with Cassette(path, MODE_REPLAY, ignore_headers=ignore) as cassette:
+        response = cassette.send(_make_request(**{"X-Request-Id": "2"}))
+        assert response.content == b"response 1"
+
+
+def test_auto_mode_records_missing(tmp_path, sent):
+    with Cassette(str(tmp_path / "cassette.db"), MODE_AUTO) as cassette:
+        first = cassette.send(_make_request())
+        second = cassette.send(_make_request())
+
+    assert first.content == second.content == b"response 1"
+    assert len(sent) == 1
+
+
+def test_custom_send(tmp_path, sent):
+    custom = []
+
+    def _send(request):
+        custom.append(request)
+        return _make_response(body=b"custom")
+
+    with Cassette(str(tmp_path / "cassette.db"), MODE_AUTO) as cassette:
+        cassette.send(_make_request(), send=_send)
+        response = cassette.send(_make_request(), send=_send)
+
+    assert response.content == b"custom"
+    assert len(custom) == 1
+    assert sent == []
+
+
+def test_records_decoded_body_headers(tmp_path):
+    response = _make_response(body=b"hello")
+    response.headers.update({"Content-Encoding": "gzip", "Content-Length": "25"})
+
+    with Cassette(str(tmp_path / "cassette.db"), MODE_RECORD) as cassette:
+        cassette.record(cassette.get_key(_make_request()), _make_request(), response)
+        replayed = cassette.lookup(cassette.get_key(_make_request()))
+
+    assert replayed.content == b"hello"
+    assert "Content-Encoding" not in replayed.headers
+    assert replayed.headers["Content-Length"] == "5"
+    assert replayed.headers["Content-Type"] == "text/plain"
@@ -0,0 +1,130 @@
+import io
+import threading
+import time
+
+import pytest
+from requests import ConnectionError, Response
+
+from requestfile.builder.request import Request
+from requestfile.ext.policy import (
+    DeadlineExceeded,
+    HedgePolicy,
+    RetryPolicy,
+    SendOutcome,
+    get_retry_after,
+    send_with_policy,
+)
+
+
+def _make_response(status=200, headers=None):
+    response = Response()
+    response.status_code = status
+    response.headers.update(headers or {})
+    response.raw = io.BytesIO()
+    return response
+
+
+def _make_request(method="GET"):
+    return Request(method=method, url="http://example.com/")
+
+
+def _fail_then_succeed(failures):
+    calls = []
+
+    def send(request):
+        calls.append(request)
+        if len(calls) <= failures:
+            raise ConnectionError("Connection refused")
+        return _make_response(200)
+
+    return send, calls
+
+
+def test_retry_after_errors():
+    send, calls = _fail_then_succeed(2)
+    response = send_with_policy(
+        _make_request(), retry=RetryPolicy(max_attempts=3, backoff=0), send=send
+    )
+    assert response.status_code == 200
+    assert len(calls) == 3
+    assert response.outcome.attempts == 3
+    assert response.outcome.retries == 2
+    assert len(response.outcome.errors) == 2
+
+
+def test_retry_gives_up():
+    send, calls = _fail_then_succeed(5)
+    with pytest.raises(ConnectionError):
+        send_with_policy(
+            _make_request(), retry=RetryPolicy(max_attempts=2, backoff=0), send=send
+        )
+    assert len(calls) == 2
+
+
+def test_retry_statuses():
+    statuses = iter([503, 500])
+    response = send_with_policy(
+        _make_request(),
+        retry=RetryPolicy(max_attempts=5, backoff=0),
+        send=lambda request: _make_response(next(statuses)),
+    )
+    # 500 is not retried
+    assert response.status_code == 500
+    assert response.outcome.retries == 1
+
+
+def test_no_retry_non_idempotent():
+    send, calls = _fail_then_succeed(1)
+    with pytest.raises(ConnectionError):
+        send_with_policy(_make_request("POST"), retry=RetryPolicy(backoff=0), send=send)
+    assert len(calls) == 1
+
+
+def test_deadline():
+    def send(request):
+        time.sleep(0.5)
+        return _make_response(200)
+
+    outcome = SendOutcome()
+    start = time.monotonic()
+    with pytest.raises(DeadlineExceeded):
+        send_with_policy(_make_request(), deadline=0.05, send=send, outcome=outcome)
+    assert time.monotonic() - start < 0.4
+    assert outcome.deadline_exceeded
+
+
+def test_hedge():
+    calls = []
+    lock = threading.Lock()
+
+    def send(request):
+        with lock:
+            calls.append(request)
+            first = len(calls) == 1
+        # The first request is stuck; the hedge completes quickly
+        time.sleep(1 if first else 0)
+        return _make_response(200 if first else 201)
+
+    hedge = HedgePolicy(initial_delay=0.05)
+    start = time.monotonic()
+    response = send_with_policy(_make_request(), hedge=hedge, send=send)
+    assert time.monotonic() - start < 0.5
+    assert response.status_code == 201
+    assert response.outcome.hedged
+    assert response.outcome.hedge_won
+    assert response.outcome.attempts == 2
+
+
+def test_hedge_delay_from_latencies():
+    hedge = HedgePolicy(percentile=50, min_samples=3, min_delay=0.001)
+    assert hedge.get_delay() is None
+    for seconds in (0.1, 0.1, 0.1):
+        hedge.record(seconds)
+    assert hedge.get_delay() == pytest.approx(0.1, rel=0.01)
+
+
+def test_retry_after_http_date():
+    response = _make_response(429, {"Retry-After": "Wed, 21 Oct 2015 07:28:00 GMT"})
+    assert get_retry_after(response) == 0
+    assert get_retry_after(_make_response(429, {"Retry-After": "120"})) == 120
+    assert get_retry_after(_make_response(429)) is None
@@ -0,0 +1,78 @@
+import io
+
+from requests import Response
+
+from requestfile.ext.requests import (
+    dump_response_head,
+    make_response,
+    write_response_body,
+)
+
+
+class _Raw(io.RawIOBase):
+    """Response body arriving in chunks, logging each read"""
+
+    def __init__(self, chunks, log):
+        self.chunks = list(chunks)
+        self.log = log
+
+    def readable(self):
+        return True
+
+    def read(self, size=-1):
+        if not self.chunks:
+            return b""
+        self.log.append("read")
+        return self.chunks.pop(0)
+
+
+class _Output(io.BytesIO):
+    def __init__(self, log):
+        super().__init__()
+        self.log = log
+
+    def write(self, data):
+        self.log.append("write")
+        return super().write(data)
+
+
+def _streamed_response(chunks, log):
+    response = Response()
+    response.status_code = 200
+    response.raw = _Raw(chunks, log)
+    return response
+
+
+def test_write_response_body_streams_chunks():
+    log = []
+    chunks = [b"a" * 10, b"b" * 10, b"c" * 5]
+    output = _Output(log)
+    progress = []
+
+    total = write_response_body(
+        _streamed_response(chunks, log),
+        output,
+        chunk_size=10,
+        on_progress=progress.append,
+    )
+
+    assert output.getvalue() == b"".join(chunks)
+    assert total == 25
+    assert progress == [10, 10, 5]
+    # Each chunk is written before the next one is read
+    assert log == ["read", "write"] * 3
+
+
+def test_dump_response_head_without_raw():
+    response = make_response(
+        "http://example.com/",
+        404,
+        "Not Found",
+        [("Content-Type", "text/plain"), ("X-Id", "1")],
+        b"body",
+    )
+    head = bytes(dump_response_head(response))
+    assert head.startswith(b"HTTP/1.1 404 Not Found\r\n")
+    assert b"Content-Type: text/plain\r\n" in head
+    assert b"X-Id: 1\r\n" in head
+    assert b"body" not in head
@@ -0,0 +1,111 @@
+import json
+from textwrap import dedent
+
+import pytest
+
+from requestfile.builder import build_request
+from requestfile.ext.wsgi import send_wsgi
+from requestfile.parser import parse_requestfile
+
+
+def _build(text, **variables):
+    lines = dedent(text).lstrip().splitlines(keepends=True)
+    return build_request(parse_requestfile(lines), variables=variables)
+
+
+def echo_app(environ, start_response):
+    body = environ["wsgi.input"].read(int(environ.get("CONTENT_LENGTH") or 0))
+    data = {
+        "method": environ["REQUEST_METHOD"],
+        "path": environ["PATH_INFO"],
+        "query": environ["QUERY_STRING"],
+        "host": environ["HTTP_HOST"],
+        "content_type": environ.get("CONTENT_TYPE"),
+        "headers": {k: v for k, v in environ.items() if k.startswith("HTTP_")},
+        "body": body.decode(),
+    }
+    start_response(
+        "201 Created",
+        [("Content-Type", "application/json"), ("Set-Cookie", "session=abc")],
+    )
+    return [json.dumps(data).encode()]
+
+
+def test_send_request():
+    request = _build(
+        """
+        POST "http://example.com/some%20path?a=1"
+        X-Hello: World
+
+        hello
+        """
+    )
+    response = send_wsgi(request, echo_app)
+    data = response.json()
+
+    assert response.status_code == 201
+    assert response.reason == "Created"
+    assert response.cookies["session"] == "abc"
+    assert data["method"] == "POST"
+    assert data["path"] == "/some path"
+    assert data["query"] == "a=1"
+    assert data["host"] == "example.com"
+    assert data["headers"]["HTTP_X_HELLO"] == "World"
+    assert data["body"] == "hello\n"
+
+
+def test_send_multipart():
+    request = _build(
+        """
+        POST http://example.com/upload
+
+        %PART: myfile filename="hello.txt" mimetype="text/plain" "Hello World"
+        """
+    )
+    data = send_wsgi(request, echo_app).json()
+
+    assert data["content_type"].startswith("multipart/form-data; boundary=")
+    assert 'filename="hello.txt"' in data["body"]
+    assert "Hello World" in data["body"]
+
+
+def test_streamed_response():
+    produced = []
+    closed = []
+
+    class Body:
+        def __iter__(self):
+            for i in range(3):
+                produced.append(i)
+                yield f"chunk {i}\n".encode()
+
+        def close(self):
+            closed.append(True)
+
+    def app(environ, start_response):
+        start_response("200 OK", [("Content-Type", "text/plain")])
+        return Body()
+
+    response = send_wsgi(_build("GET http://example.com/\n"), app, stream=True)
+    assert produced == [0]
+
+    lines = list(response.iter_lines())
+    assert lines == [b"chunk 0", b"chunk 1", b"chunk 2"]
+    response.close()
+    assert closed == [True]
+
+
+def test_app_without_response():
+    def app(environ, start_response):
+        return []
+
+    with pytest.raises(RuntimeError):
+        send_wsgi(_build("GET http://example.com/\n"), app)
+
+
+def test_bytes_header_value():
+    # As read from an included file
+    request = _build("GET http://example.com/\n")
+    request.headers["X-B"] = b"abc"
+    response = send_wsgi(request, echo_app)
+    assert response.json()["headers"]["HTTP_X_B"] == "abc"
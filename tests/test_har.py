@@ -0,0 +1,219 @@
+import base64
+import io
+import json
+import os
+
+from click.testing import CliRunner
+
+from requestfile.builder import build_request
+from requestfile.cli import main
+from requestfile.formatting import format_requestfile
+from requestfile.har import har_entry_to_requestfile, iter_har_entries
+from requestfile.parser import parse_requestfile
+from requestfile.utils.jsonstream import JsonStreamReader
+
+ENTRIES = [
+    {
+        "startedDateTime": "2024-05-01T10:00:00.000Z",
+        "request": {
+            "method": "GET",
+            "url": "https://api.example.com/v1/users?page=2&q=a%20b",
+            "headers": [
+                {"name": ":authority", "value": "api.example.com"},
+                {"name": "Accept", "value": "application/json"},
+                {"name": "Cookie", "value": "session=abc"},
+                {"name": "X-Padded", "value": " padded "},
+            ],
+            "cookies": [{"name": "session", "value": "abc"}],
+        },
+        "response": {"status": 200, "statusText": "OK"},
+    },
+    {
+        "request": {
+            "method": "POST",
+            "url": "https://api.example.com/v1/login",
+            "headers": [
+                {"name": "Content-Type", "value": "application/x-www-form-urlencoded"},
+                {"name": "Content-Length", "value": "27"},
+            ],
+            "postData": {
+                "mimeType": "application/x-www-form-urlencoded",
+                "text": "user=admin&password=p%40ss",
+            },
+        },
+    },
+    {
+        "request": {
+            "method": "PUT",
+            "url": "https://api.example.com/v1/users/1",
+            "headers": [{"name": "Content-Type", "value": "application/json"}],
+            "postData": {
+                "mimeType": "application/json",
+                "text": '{\n  "name": "EOF"\n}\n',
+            },
+        },
+    },
+    {
+        "request": {
+            "method": "POST",
+            "url": "https://api.example.com/v1/upload",
+            "headers": [
+                {"name": "Content-Type", "value": "multipart/form-data; boundary=x"}
+            ],
+            "postData": {
+                "mimeType": "multipart/form-data; boundary=x",
+                "params": [
+                    {"name": "title", "value": "Hello"},
+                    {
+                        "name": "file",
+                        "fileName": "data.txt",
+                        "contentType": "text/plain",
+                        "value": "x" * 100,
+                    },
+                ],
+            },
+        },
+    },
+    {
+        "request": {
+            "method": "POST",
+            "url": "https://api.example.com/v1/blob",
+            "headers": [],
+            "postData": {
+                "mimeType": "application/octet-stream",
+                "text": base64.b64encode(bytes(range(256))).decode(),
+                "encoding": "base64",
+            },
+        },
+    },
+]
+
+HAR = json.dumps(
+    {
+        "log": {
+            "version": "1.2",
+            "creator": {"name": "test", "version": "1.0"},
+            "entries": ENTRIES,
+            "pages": [],
+        }
+    },
+    indent=2,
+)
+
+
+def test_json_stream_reader_small_chunks():
+    text = '{"a": [1, 22, {"b": "c"}], "d": 12345, "e": []}'
+    reader = JsonStreamReader(io.StringIO(text), chunk_size=3)
+    result = {}
+    for key in reader.iter_object():
+        if key == "a":
+            result[key] = [reader.read_value() for _ in reader.iter_array()]
+        else:
+            result[key] = reader.read_value()
+    assert result == json.loads(text)
+    assert reader.peek() == ""
+
+
+def test_iter_har_entries():
+    entries = list(iter_har_entries(io.StringIO(HAR), chunk_size=7))
+    assert entries == ENTRIES
+
+
+def _build(requestfile):
+    return build_request(requestfile, variables={})
+
+
+def test_entry_to_requestfile():
+    [get, login, put, upload, blob] = [
+        _build(har_entry_to_requestfile(entry, inline_limit=50)) for entry in ENTRIES
+    ]
+
+    assert get.url == "https://api.example.com/v1/users"
+    assert list(get.params.items()) == [("page", "2"), ("q", "a b")]
+    assert list(get.headers.items()) == [
+        ("Accept", "application/json"),
+        ("X-Padded", " padded "),
+    ]
+    assert dict(get.cookies) == {"session": "abc"}
+
+    assert dict(login.fields) == {"user": "admin", "password": "p@ss"}
+    assert "Content-Type" not in login.headers
+    assert "Content-Length" not in login.headers
+
+    assert put.raw_body == '{\n  "name": "EOF"\n}\n'
+    assert put.headers["Content-Type"] == "application/json"
+
+    assert dict(upload.fields) == {}
+    assert upload.files["title"].body == "Hello"
+    assert upload.files["file"].filename == "data.txt"
+    assert upload.files["file"].mimetype == "text/plain"
+
+    assert blob.raw_body == bytes(range(256))
+
+
+def test_entry_to_requestfile_escapes():
+    entry = {
+        "request": {
+            "method": "POST",
+            "url": "https://api.example.com/search?q=%22x%22&path=C:%5Cdir%5C",
+            "headers": [
+                {"name": "Content-Type", "value": "application/json"},
+                {"name": "X-Quoted", "value": ' "a\\" '},
+            ],
+            "postData": {
+                "mimeType": "application/json",
+                "text": '{\n\t"a": "b\\\\"\n}\n',
+            },
+        },
+    }
+
+    # Written out and parsed again, like import-har does
+    buf = io.StringIO()
+    format_requestfile(har_entry_to_requestfile(entry), buf)
+    request = _build(parse_requestfile(io.StringIO(buf.getvalue())))
+
+    assert list(request.params.items()) == [("q", '"x"'), ("path", "C:\\dir\\")]
+    assert request.headers["X-Quoted"] == ' "a\\" '
+    assert request.raw_body == '{\n\t"a": "b\\\\"\n}\n'
+
+
+def test_import_har(tmp_path):
+    harfile = tmp_path / "capture.har"
+    harfile.write_text(HAR)
+    output_dir = tmp_path / "requests"
+
+    result = CliRunner().invoke(
+        main, ["import-har", str(harfile), str(output_dir), "--inline-limit", "50"]
+    )
+    assert result.exit_code == 0, result.output
+
+    assert sorted(os.listdir(output_dir)) == [
+        "00001-get-api-example-com-v1-users",
+        "00002-post-api-example-com-v1-login",
+        "00003-put-api-example-com-v1-users-1",
+        "00004-post-api-example-com-v1-upload",
+        "00004-post-api-example-com-v1-upload.part2",
+        "00005-post-api-example-com-v1-blob",
+        "00005-post-api-example-com-v1-blob.body",
+    ]
+
+    path = output_dir / "00001-get-api-example-com-v1-users"
+    assert path.read_text().startswith(
+        "# Recorded at 2024-05-01T10:00:00.000Z\n"
+        "# Response: 200 OK\n"
+        "\n"
+        "GET https://api.example.com/v1/users\n"
+    )
+
+    for name, expected in [
+        ("00004-post-api-example-com-v1-upload", None),
+        ("00005-post-api-example-com-v1-blob", bytes(range(256))),
+    ]:
+        path = output_dir / name
+        with path.open() as fp:
+            requestfile = parse_requestfile(fp, filename=str(path))
+        request = _build(requestfile)
+        if expected is not None:
+            assert request.raw_body == expected
+        else:
+            assert request.files["file"].body == b"x" * 100
@@ -0,0 +1,46 @@
+import random
+
+import pytest
+
+from requestfile.utils.histogram import Histogram
+
+
+def test_percentiles_within_relative_error():
+    rnd = random.Random(0)
+    values = sorted(int(rnd.lognormvariate(8, 2)) for _ in range(10_000))
+    histogram = Histogram()
+    for value in values:
+        histogram.record(value)
+
+    assert histogram.count == len(values)
+    assert histogram.min == values[0]
+    assert histogram.max == values[-1]
+    for percent in (1, 50, 90, 99, 99.9):
+        expected = values[round(len(values) * percent / 100) - 1]
+        assert histogram.percentile(percent) == pytest.approx(expected, rel=0.01)
+
+
+def test_merge_is_lossless():
+    rnd = random.Random(1)
+    values = [rnd.randrange(0, 10_000_000) for _ in range(5000)]
+
+    combined = Histogram()
+    parts = [Histogram() for _ in range(4)]
+    for index, value in enumerate(values):
+        combined.record(value)
+        parts[index % 4].record(value)
+
+    merged = Histogram()
+    for part in parts:
+        merged.merge(part)
+
+    assert merged == combined
+
+
+def test_empty_histogram():
+    histogram = Histogram()
+    assert histogram.percentile(99) == 0
+    assert histogram.mean == 0.0
+
+    with pytest.raises(ValueError):
+        histogram.record(-1)
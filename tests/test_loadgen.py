@@ -0,0 +1,151 @@
+import asyncio
+import os
+from http.server import BaseHTTPRequestHandler
+
+import pytest
+from aiohttp import web
+
+from requestfile.builder import resource_loader
+from requestfile.builder.request import Request, RequestContentType
+from requestfile.loadgen import iter_schedule, run_load_async, run_load_processes
+from requestfile.parser import parse_requestfile
+
+
+def test_constant_schedule():
+    schedule = list(iter_schedule(100, 2))
+    assert len(schedule) == 200
+    assert schedule[1] == pytest.approx(0.01)
+    assert schedule[-1] < 2
+
+
+def test_ramping_schedule():
+    schedule = list(iter_schedule(100, 2, end_rate=300))
+    assert len(schedule) == 400
+
+    # Rate increases over time: intervals between sends get shorter
+    first_half = sum(1 for offset in schedule if offset < 1)
+    assert first_half == 150
+
+
+def test_schedule_invalid():
+    for duration in (0, -1):
+        with pytest.raises(ValueError, match="Duration must be positive"):
+            list(iter_schedule(100, duration, end_rate=200))
+
+
+async def _serve(handler):
+    app = web.Application()
+    app.router.add_route("*", "/", handler)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    site = web.TCPSite(runner, "127.0.0.1", 0)
+    await site.start()
+    port = site._server.sockets[0].getsockname()[1]
+    return runner, f"http://127.0.0.1:{port}/"
+
+
+def test_run_load():
+    received = []
+
+    async def handler(request):
+        received.append(await request.read())
+        await asyncio.sleep(0.01)
+        return web.Response(text="ok")
+
+    async def _run():
+        runner, url = await _serve(handler)
+        try:
+            request = Request(
+                method="POST",
+                url=url,
+                raw_body="hello",
+                content_type=RequestContentType.TEXT,
+            )
+            intervals = []
+            stats = await run_load_async(
+                request, 100, 0.5, interval=0.2, on_interval=intervals.append
+            )
+        finally:
+            await runner.cleanup()
+        return stats, intervals
+
+    stats, intervals = asyncio.run(_run())
+
+    assert stats.sent == 50
+    assert stats.statuses == {200: 50}
+    assert stats.latency.count == 50
+    assert stats.latency.min >= 10_000
+    assert sum(interval.completed for interval in intervals) == 50
+    assert received[0] == b"hello"
+
+
+def test_run_load_records_dropped():
+    async def handler(request):
+        await asyncio.sleep(0.3)
+        return web.Response(text="ok")
+
+    async def _run():
+        runner, url = await _serve(handler)
+        try:
+            request = Request(method="GET", url=url)
+            return await run_load_async(request, 100, 0.1, max_in_flight=2, timeout=5.0)
+        finally:
+            await runner.cleanup()
+
+    stats = asyncio.run(_run())
+
+    assert stats.sent == 2
+    assert stats.dropped == 8
+    # Dropped requests count as timing out, in the latency distribution
+    assert stats.latency.count == 10
+    assert stats.latency.percentile(50) >= 5_000_000
+
+
+class _Handler(BaseHTTPRequestHandler):
+    def do_POST(self):
+        body = self.rfile.read(int(self.headers["Content-Length"]))
+        self.server.received.append(body)
+        self.send_response(200)
+        self.send_header("Content-Length", "0")
+        self.end_headers()
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def http_server(http_server_factory):
+    return http_server_factory(_Handler, received=[])
+
+
+# The test server runs in a thread of this process
+@pytest.mark.filterwarnings("ignore:.*use of fork\\(\\) may lead to deadlocks")
+def test_run_load_processes(http_server):
+    loader = resource_loader.TestingResourceLoader()
+    loader.files["payload.bin"] = os.urandom(100_000)
+    port = http_server.server_address[1]
+    requestfile = parse_requestfile(
+        [
+            f"POST http://127.0.0.1:{port}/\n",
+            "Content-Type: application/octet-stream\n",
+            "\n",
+            "%INCLUDE: <payload.bin\n",
+        ]
+    )
+
+    intervals = []
+    stats = run_load_processes(
+        requestfile,
+        processes=2,
+        rate=40,
+        duration=0.5,
+        resource_loader=loader,
+        interval=0.2,
+        on_interval=intervals.append,
+    )
+
+    assert stats.sent == 20
+    assert stats.statuses == {200: 20}
+    assert stats.latency.count == 20
+    assert sum(interval.completed for interval in intervals) == 20
+    assert http_server.received == [loader.files["payload.bin"]] * 20
@@ -0,0 +1,171 @@
+import json
+import threading
+import time
+from urllib.parse import parse_qs, urlencode, urlsplit
+
+import pytest
+
+from requestfile.builder.request import Request
+from requestfile.ext.requests import make_response
+from requestfile.pagination import (
+    PAGINATION_OFFSET,
+    PaginationRule,
+    paginate,
+    parse_pagination_rule,
+)
+
+ITEMS = list(range(10))
+
+
+def _json_response(url, data, status=200, headers=()):
+    return make_response(url, status, "OK", list(headers), json.dumps(data).encode())
+
+
+def _get_url(request):
+    if not request.params:
+        return request.url
+    separator = "&" if urlsplit(request.url).query else "?"
+    return f"{request.url}{separator}{urlencode(list(request.params.items()))}"
+
+
+def _pages(pages):
+    return [json.loads(page.response.content) for page in pages]
+
+
+def test_parse_pagination_rule():
+    assert parse_pagination_rule("offset:skip=50,100", items="$.data") == (
+        PaginationRule(PAGINATION_OFFSET, "skip", start=100, step=50, items="$.data")
+    )
+    assert parse_pagination_rule("page:p").start == 1
+    for text in ("link:x", "next", "cursor:after", "offset:skip", "page:p=x", "x"):
+        with pytest.raises(ValueError, match="Invalid pagination rule"):
+            parse_pagination_rule(text)
+
+
+def test_link():
+    def send(request):
+        query = parse_qs(urlsplit(request.url).query)
+        start = int(query.get("start", ["0"])[0])
+        headers = []
+        if start + 3 < len(ITEMS):
+            headers.append(("Link", f'</items?start={start + 3}>; rel="next"'))
+        return _json_response(
+            _get_url(request), ITEMS[start : start + 3], headers=headers
+        )
+
+    request = Request(method="GET", url="http://example.com/items")
+    pages = list(paginate(request, parse_pagination_rule("link"), send))
+    assert _pages(pages) == [[0, 1, 2], [3, 4, 5], [6, 7, 8], [9]]
+    assert pages[1].request.url == "http://example.com/items?start=3"
+
+
+def test_cursor():
+    def send(request):
+        start = int(request.params.get("after", 0))
+        data = {"data": ITEMS[start : start + 4], "next": None}
+        if start + 4 < len(ITEMS):
+            data["next"] = start + 4
+        return _json_response(_get_url(request), data)
+
+    request = Request(method="GET", url="http://example.com/items")
+    rule = parse_pagination_rule("cursor:after=$.next")
+    pages = list(paginate(request, rule, send))
+    assert [page["data"] for page in _pages(pages)] == [
+        [0, 1, 2, 3],
+        [4, 5, 6, 7],
+        [8, 9],
+    ]
+
+    pages = list(paginate(request, rule, send, max_pages=2))
+    assert len(pages) == 2
+
+
+def test_cursor_loop():
+    def send(request):
+        return _json_response(request.url, {"next": "same"})
+
+    request = Request(method="GET", url="http://example.com/items")
+    with pytest.raises(ValueError, match="Pagination loop"):
+        list(paginate(request, parse_pagination_rule("cursor:c=$.next"), send))
+
+
+@pytest.mark.parametrize("prefetch", [1, 4])
+def test_page_numbers(prefetch):
+    lock = threading.Lock()
+    in_flight = 0
+    max_in_flight = 0
+
+    def send(request):
+        nonlocal in_flight, max_in_flight
+        with lock:
+            in_flight += 1
+            max_in_flight = max(max_in_flight, in_flight)
+        time.sleep(0.01)
+        with lock:
+            in_flight -= 1
+        page = int(request.params["page"])
+        if page > 4:
+            return make_response(request.url, 404, "Not Found", [], b"")
+        return _json_response(request.url, {"items": ITEMS[(page - 1) * 3 :][:3]})
+
+    request = Request(method="GET", url="http://example.com/items")
+    request.params.add("page", "x")
+    rule = parse_pagination_rule("page:page", items="$.items")
+    pages = list(paginate(request, rule, send, prefetch=prefetch))
+    assert [page["items"] for page in _pages(pages)] == [
+        [0, 1, 2],
+        [3, 4, 5],
+        [6, 7, 8],
+        [9],
+    ]
+    assert [page.request.params["page"] for page in pages] == ["1", "2", "3", "4"]
+    assert max_in_flight == prefetch
+
+
+def test_offset_short_page():
+    sent = []
+
+    def send(request):
+        offset = int(request.params["offset"])
+        sent.append(offset)
+        return _json_response(request.url, ITEMS[offset : offset + 4])
+
+    request = Request(method="GET", url="http://example.com/items")
+    rule = parse_pagination_rule("offset:offset=4", items="$")
+    pages = list(paginate(request, rule, send, prefetch=1))
+    assert _pages(pages) == [[0, 1, 2, 3], [4, 5, 6, 7], [8, 9]]
+    assert sent == [0, 4, 8]
+
+
+def test_stop_on_error():
+    def send(request):
+        if request.params.get("page") == "2":
+            return make_response(request.url, 500, "Server Error", [], b"")
+        return _json_response(request.url, [1])
+
+    request = Request(method="GET", url="http://example.com/items")
+    pages = list(
+        paginate(request, parse_pagination_rule("page:page"), send, prefetch=1)
+    )
+    assert [page.ok for page in pages] == [True, False]
+
+
+@pytest.mark.parametrize("prefetch", [1, 4])
+def test_page_number_in_url(prefetch):
+    def send(request):
+        query = parse_qs(urlsplit(_get_url(request)).query)
+        assert query["limit"] == ["3"]
+        [page] = query["page"]
+        items = ITEMS[(int(page) - 1) * 3 :][:3]
+        return _json_response(_get_url(request), {"items": items})
+
+    request = Request(method="GET", url="http://example.com/items?page=1&limit=3")
+    rule = parse_pagination_rule("page:page", items="$.items")
+    pages = list(paginate(request, rule, send, max_pages=10, prefetch=prefetch))
+    assert [page["items"] for page in _pages(pages)] == [
+        [0, 1, 2],
+        [3, 4, 5],
+        [6, 7, 8],
+        [9],
+    ]
+    assert pages[1].request.url == "http://example.com/items?limit=3"
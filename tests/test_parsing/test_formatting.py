@@ -0,0 +1,21 @@
+import io
+from pathlib import Path
+
+import pytest
+
+from requestfile.formatting import format_requestfile
+from requestfile.parser import parse_requestfile
+
+SAMPLES_DIR = Path(__file__).parent.parent.parent / "samples"
+
+
+@pytest.mark.parametrize(
+    "path", sorted(SAMPLES_DIR.iterdir()), ids=lambda path: path.name
+)
+def test_format_roundtrip(path):
+    with path.open() as fp:
+        requestfile = parse_requestfile(fp)
+
+    buf = io.StringIO()
+    format_requestfile(requestfile, buf)
+    assert parse_requestfile(io.StringIO(buf.getvalue())) == requestfile
@@ -0,0 +1,127 @@
+import random
+from textwrap import dedent
+
+import pytest
+
+from requestfile.ast import Command, Header, RawData
+from requestfile.parser import IncrementalParser, parse_requestfile
+
+SOURCE = dedent("""\
+    %SET: name "value"
+    # Comment
+
+    POST http://example.com
+    Accept: application/json
+    %HEADER: X-Data <<EOF
+    one
+    two
+    EOF
+    # Another comment
+
+    first line
+    %FIELD: name "value"
+    second line
+    """).splitlines()
+
+
+def _get_positions(requestfile):
+    nodes = [
+        *requestfile.preamble,
+        requestfile.requestline,
+        *requestfile.headers,
+        *requestfile.body,
+    ]
+    return [(node.line, node.end_line) for node in nodes if node is not None]
+
+
+def _check(parser):
+    expected = parse_requestfile(parser.lines)
+    assert parser.requestfile == expected
+    assert _get_positions(parser.requestfile) == _get_positions(expected)
+
+
+def test_positions():
+    requestfile = parse_requestfile(SOURCE)
+    assert requestfile.requestline.line == 4
+    assert [(node.line, node.end_line) for node in requestfile.headers] == [
+        (5, 5),
+        (6, 9),
+        (10, 10),
+    ]
+    assert [node.line for node in requestfile.body] == [12, 13, 14]
+
+
+def test_edit_reuses_nodes():
+    parser = IncrementalParser(SOURCE)
+    requestfile = parser.requestfile
+    last = requestfile.body[-1]
+
+    parser.edit(5, 6, ["Accept: text/plain", "X-Other: value"])
+    _check(parser)
+    assert parser.requestfile is requestfile
+    assert requestfile.headers[0] == Header("Accept", "text/plain")
+    # Nodes after the edit are kept, and shifted
+    assert requestfile.body[-1] is last
+    assert last.line == 15
+
+
+def test_edit_heredoc():
+    parser = IncrementalParser(SOURCE)
+
+    # Removing the marker makes the heredoc run to the end of file
+    parser.edit(9, 10, [])
+    _check(parser)
+    assert parser.requestfile.body == []
+
+    parser.edit(9, 9, ["EOF"])
+    _check(parser)
+    assert parser.requestfile.body[0] == RawData("first line")
+
+
+def test_edit_section_boundary():
+    parser = IncrementalParser(SOURCE)
+
+    # Removing the blank line turns the body into headers
+    parser.edit(11, 12, [])
+    assert [d.line for d in parser.diagnostics] == [11, 13]
+
+    parser.edit(11, 11, [""])
+    _check(parser)
+    assert parser.diagnostics == []
+
+
+def test_diagnostics():
+    parser = IncrementalParser(["POST http://example.com", "bad header"])
+    (diagnostic,) = parser.diagnostics
+    assert diagnostic.line == 2
+    assert "Invalid header line" in diagnostic.message
+
+    parser.edit(2, 3, ["%HEADER: X-Name value"])
+    assert parser.diagnostics == []
+    assert parser.requestfile.headers[0].name == "header"
+    assert isinstance(parser.requestfile.headers[0], Command)
+
+
+def test_append_to_empty():
+    parser = IncrementalParser()
+    assert [d.message for d in parser.diagnostics] == ["Missing request line"]
+    parser.edit(1, 1, ["GET http://example.com"])
+    _check(parser)
+
+
+@pytest.mark.parametrize("seed", range(20))
+def test_random_edits(seed):
+    rnd = random.Random(seed)
+    parser = IncrementalParser(SOURCE)
+    for _ in range(10):
+        start = rnd.randint(1, len(parser.lines) + 1)
+        end = rnd.randint(start, min(start + 3, len(parser.lines) + 1))
+        lines = rnd.sample(SOURCE, rnd.randint(0, 3))
+        parser.edit(start, end, lines)
+
+        fresh = IncrementalParser(parser.lines)
+        assert parser.requestfile == fresh.requestfile
+        assert _get_positions(parser.requestfile) == _get_positions(fresh.requestfile)
+        assert [(d.line, d.message) for d in parser.diagnostics] == [
+            (d.line, d.message) for d in fresh.diagnostics
+        ]
@@ -1,4 +1,4 @@
-from requestfile.parser import unquote_value
+from requestfile.parser import quote_value, unquote_value
 
 
 def test_unquote_plain():
@@ -23,3 +23,8 @@ def test_unquote_unicode_2():
 
 def test_unquote_unicode_4():
     assert unquote_value('"\\U0001F91F"') == "\U0001f91f"
+
+
+def test_quote_roundtrip():
+    for text in ['say "hi"', "trailing\\", '\\"', "tab\tnewline\n"]:
+        assert unquote_value(quote_value(text)) == text
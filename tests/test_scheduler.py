@@ -0,0 +1,212 @@
+import threading
+import time
+import weakref
+
+import pytest
+from requests import Response
+
+from requestfile.builder.request import Request
+from requestfile.scheduler import (
+    Scheduler,
+    SchedulerConfig,
+    TokenBucket,
+    run_batch,
+)
+
+
+def _make_response(status=200, headers=None):
+    response = Response()
+    response.status_code = status
+    response.headers.update(headers or {})
+    return response
+
+
+def _make_request(url):
+    return Request(method="GET", url=url)
+
+
+def test_token_bucket():
+    bucket = TokenBucket(rate=10, burst=2)
+    now = bucket.updated
+    assert bucket.get_delay(now) == 0
+    bucket.take(now)
+    bucket.take(now)
+    assert bucket.get_delay(now) == pytest.approx(0.1)
+    assert bucket.get_delay(now + 0.1) == pytest.approx(0)
+
+
+def test_priorities():
+    sent = []
+    started = threading.Event()
+    gate = threading.Event()
+
+    def send(request):
+        sent.append(request.url)
+        if request.url.endswith("/first"):
+            # Hold the only worker, so all other requests get queued
+            started.set()
+            gate.wait()
+        return _make_response()
+
+    requests = [
+        ("low", _make_request("http://example.com/low"), 0),
+        ("high", _make_request("http://example.com/high"), 10),
+        ("mid", _make_request("http://example.com/mid"), 5),
+    ]
+
+    with Scheduler(SchedulerConfig(max_workers=1), send=send) as scheduler:
+        scheduler.submit(_make_request("http://example.com/first"))
+        started.wait()
+        futures = [
+            scheduler.submit(request, priority=priority, name=name)
+            for name, request, priority in requests
+        ]
+        gate.set()
+        results = [future.result() for future in futures]
+
+    assert sent == [
+        "http://example.com/first",
+        "http://example.com/high",
+        "http://example.com/mid",
+        "http://example.com/low",
+    ]
+    assert [result.name for result in results] == ["low", "high", "mid"]
+
+
+def test_host_max_in_flight():
+    lock = threading.Lock()
+    in_flight = {}
+    max_seen = {}
+
+    def send(request):
+        host = request.url.split("/")[2]
+        with lock:
+            in_flight[host] = in_flight.get(host, 0) + 1
+            max_seen[host] = max(max_seen.get(host, 0), in_flight[host])
+        time.sleep(0.01)
+        with lock:
+            in_flight[host] -= 1
+        return _make_response()
+
+    requests = [
+        (str(i), _make_request(f"http://host{i % 2}.example.com/{i}"), 0)
+        for i in range(20)
+    ]
+    config = SchedulerConfig(max_workers=8, host_max_in_flight=2)
+    results = run_batch(requests, config=config, send=send)
+
+    assert all(result.ok for result in results)
+    assert max_seen == {"host0.example.com": 2, "host1.example.com": 2}
+
+
+def test_rate_limit():
+    requests = [(str(i), _make_request(f"http://example.com/{i}"), 0) for i in range(5)]
+    config = SchedulerConfig(rate=50, max_workers=4)
+
+    start = time.monotonic()
+    run_batch(requests, config=config, send=lambda request: _make_response())
+
+    # First request is sent straight away, then one every 20ms
+    assert time.monotonic() - start >= 0.08
+
+
+def test_backoff_and_retry():
+    responses = [
+        _make_response(429, {"Retry-After": "0"}),
+        _make_response(503),
+        _make_response(200),
+    ]
+    sent_at = []
+
+    def send(request):
+        sent_at.append(time.monotonic())
+        return responses.pop(0)
+
+    config = SchedulerConfig(backoff=0.05)
+    [result] = run_batch(
+        [("a", _make_request("http://example.com/"), 0)], config=config, send=send
+    )
+
+    assert result.ok
+    assert result.attempts == 3
+    # No Retry-After on the 503: backoff doubles after the 429
+    assert sent_at[2] - sent_at[1] >= 0.1
+
+
+def test_give_up_after_max_retries():
+    config = SchedulerConfig(backoff=0, max_retries=2)
+    [result] = run_batch(
+        [("a", _make_request("http://example.com/"), 0)],
+        config=config,
+        send=lambda request: _make_response(429),
+    )
+    assert not result.ok
+    assert result.attempts == 3
+    assert result.response.status_code == 429
+
+
+def test_max_pending():
+    pending = 0
+    max_seen = 0
+    lock = threading.Lock()
+
+    def send(request):
+        nonlocal pending
+        time.sleep(0.005)
+        with lock:
+            pending -= 1
+        return _make_response()
+
+    def generate():
+        nonlocal pending, max_seen
+        for i in range(20):
+            with lock:
+                pending += 1
+                max_seen = max(max_seen, pending)
+            yield str(i), _make_request(f"http://example.com/{i}"), 0
+
+    results = run_batch(
+        generate(), config=SchedulerConfig(max_workers=2), send=send, max_pending=3
+    )
+    assert [result.name for result in results] == [str(i) for i in range(20)]
+    assert max_seen <= 3
+
+
+def test_run_batch_variables():
+    # Results carry their own variables, even with the same name
+    requests = [
+        ("same", _make_request("http://example.com/1"), 0, {"id": "1"}),
+        ("same", _make_request("http://example.com/2"), 0, {"id": "2"}),
+        ("other", _make_request("http://example.com/3"), 0),
+    ]
+    results = run_batch(requests, send=lambda request: _make_response())
+    assert [result.variables for result in results] == [{"id": "1"}, {"id": "2"}, None]
+
+
+def test_run_batch_without_collecting():
+    alive = weakref.WeakSet()
+    max_alive = 0
+
+    def send(request):
+        response = _make_response()
+        alive.add(response)
+        return response
+
+    def on_result(result):
+        nonlocal max_alive
+        max_alive = max(max_alive, len(alive))
+
+    requests = (
+        (str(i), _make_request(f"http://example.com/{i}"), 0) for i in range(50)
+    )
+    results = run_batch(
+        requests,
+        config=SchedulerConfig(max_workers=2),
+        send=send,
+        on_result=on_result,
+        max_pending=4,
+        collect=False,
+    )
+    assert results == []
+    # Responses are released once handled
+    assert max_alive <= 6
@@ -0,0 +1,181 @@
+from http.server import BaseHTTPRequestHandler
+
+import pytest
+from click.testing import CliRunner
+
+from requestfile.cli import main
+from requestfile.cli import send as send_module
+from requestfile.ext.requests import write_response_body
+
+# Larger than the chunks written at once
+BODY = bytes(range(256)) * 1024
+
+
+class _Handler(BaseHTTPRequestHandler):
+    def do_POST(self):
+        if self.headers.get("Transfer-Encoding") == "chunked":
+            body = b""
+            while size := int(self.rfile.readline().strip(), 16):
+                body += self.rfile.read(size)
+                self.rfile.readline()
+            self.rfile.readline()
+        else:
+            body = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        self.server.received.append(body)
+
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain")
+        self.send_header("Content-Length", str(len(self.server.response)))
+        self.end_headers()
+        self.wfile.write(self.server.response)
+
+    def do_GET(self):
+        status = self.server.statuses.pop(0) if self.server.statuses else 200
+        self.send_response(status)
+        self.send_header("Content-Length", str(len(self.server.response)))
+        self.end_headers()
+        self.wfile.write(self.server.response)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def http_server(http_server_factory):
+    return http_server_factory(_Handler, received=[], response=b"hello\n", statuses=[])
+
+
+def _write_requestfile(server, tmp_path):
+    port = server.server_address[1]
+    (tmp_path / "body.txt").write_bytes(b"INCLUDED BODY")
+    path = tmp_path / "request"
+    path.write_text(f"POST http://127.0.0.1:{port}/\n\n%INCLUDE: <body.txt\n")
+    return str(path)
+
+
+def test_send_verbose_shows_included_body(http_server, tmp_path):
+    path = _write_requestfile(http_server, tmp_path)
+
+    result = CliRunner().invoke(main, ["send", "-v", path])
+
+    assert result.exit_code == 0, result.output
+    assert "INCLUDED BODY" in result.output
+    assert "not a string-like" not in result.output
+    assert http_server.received == [b"INCLUDED BODY"]
+
+
+@pytest.fixture
+def writes(monkeypatch):
+    """Sizes of the chunks written by write_response_body, and progress"""
+    writes = {"chunks": [], "progress": []}
+
+    class _Output:
+        def __init__(self, output):
+            self.output = output
+
+        def write(self, data):
+            writes["chunks"].append(len(data))
+            return self.output.write(data)
+
+        def flush(self):
+            self.output.flush()
+
+    def _write_response_body(response, output, on_progress=None, **kwargs):
+        def _on_progress(size):
+            writes["progress"].append(size)
+            if on_progress is not None:
+                on_progress(size)
+
+        return write_response_body(
+            response, _Output(output), on_progress=_on_progress, **kwargs
+        )
+
+    monkeypatch.setattr(send_module, "write_response_body", _write_response_body)
+    return writes
+
+
+def test_send_streams_to_stdout(http_server, tmp_path, writes):
+    http_server.response = BODY
+    path = _write_requestfile(http_server, tmp_path)
+
+    result = CliRunner().invoke(main, ["send", path])
+
+    assert result.exit_code == 0, result.output
+    assert result.stdout_bytes == BODY
+    # Written one chunk at a time, not as a whole
+    assert len(writes["chunks"]) > 1
+    assert sum(writes["chunks"]) == len(BODY)
+
+
+def test_send_streams_to_output_file(http_server, tmp_path, writes):
+    http_server.response = BODY
+    path = _write_requestfile(http_server, tmp_path)
+    output = tmp_path / "output"
+
+    result = CliRunner().invoke(main, ["send", path, "-o", str(output), "--progress"])
+
+    assert result.exit_code == 0, result.output
+    assert output.read_bytes() == BODY
+    assert len(writes["chunks"]) > 1
+    # Progress is reported for every chunk
+    assert writes["progress"] == writes["chunks"]
+
+
+def test_send_show_headers(http_server, tmp_path):
+    path = _write_requestfile(http_server, tmp_path)
+
+    result = CliRunner().invoke(main, ["send", "-i", path])
+
+    assert result.exit_code == 0, result.output
+    head, _, body = result.stdout_bytes.partition(b"\r\n\r\n")
+    assert head.startswith(b"HTTP/1.0 200 OK\r\n")
+    assert b"Content-Type: text/plain" in head
+    assert body == b"hello\n"
+
+
+def test_send_watch_streams(http_server, tmp_path, writes, monkeypatch):
+    http_server.response = BODY
+    path = _write_requestfile(http_server, tmp_path)
+
+    def _wait(self):
+        raise KeyboardInterrupt
+
+    monkeypatch.setattr(send_module.RequestfileWatcher, "wait", _wait)
+    result = CliRunner().invoke(main, ["send", "--watch", "--retries", "1", path])
+
+    assert result.exit_code == 0, result.output
+    # Between the status lines printed by the console
+    assert BODY in result.stdout_bytes
+    assert len(writes["chunks"]) > 1
+    assert http_server.received == [b"INCLUDED BODY"]
+
+
+@pytest.mark.parametrize(
+    "args",
+    [["-o", "output"], ["--progress"], ["--cache", "cache"], ["--replay", "request"]],
+)
+def test_send_watch_unsupported(tmp_path, args, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    (tmp_path / "request").write_text("GET http://127.0.0.1:1/\n")
+
+    result = CliRunner().invoke(main, ["send", "--watch", "request", *args])
+
+    assert result.exit_code == 2
+    assert "can't be used with --watch" in result.output
+
+
+@pytest.mark.parametrize("option", ["--cache", "--record"])
+def test_send_policy_with_cache(http_server, tmp_path, option):
+    http_server.statuses = [503]
+    port = http_server.server_address[1]
+    path = tmp_path / "request"
+    path.write_text(f"GET http://127.0.0.1:{port}/\n")
+
+    result = CliRunner().invoke(
+        main, ["send", str(path), option, str(tmp_path / "cache"), "--retries", "1"]
+    )
+
+    # Retried after the 503
+    assert result.exit_code == 0, result.output
+    assert result.stdout_bytes == b"hello\n"
+    assert http_server.statuses == []
@@ -0,0 +1,88 @@
+import gzip
+import io
+import json
+
+import pytest
+from requests import ConnectionError, Response
+
+from requestfile.builder.request import Request
+from requestfile.sink import BODY_FULL, BODY_NONE, ResultSink
+
+
+def _make_response(status=200, body=b"", headers=None):
+    response = Response()
+    response.status_code = status
+    response.reason = "OK"
+    response.headers.update(headers or {})
+    response.raw = io.BytesIO(body)
+    return response
+
+
+def _read_records(path):
+    opener = gzip.open if str(path).endswith(".gz") else open
+    with opener(path, "rt") as fp:
+        return [json.loads(line) for line in fp]
+
+
+def test_write_records(tmp_path):
+    path = tmp_path / "results.jsonl"
+    request = Request(method="GET", url="http://example.com/")
+    with ResultSink(str(path), headers=["Content-Type", "X-Missing"]) as sink:
+        sink.write(
+            "a.req",
+            request=request,
+            response=_make_response(
+                200, b"hello", {"Content-Type": "text/plain", "Server": "test"}
+            ),
+            elapsed=0.5,
+            variables={"id": "1"},
+        )
+        sink.write("b.req", request=request, error=ConnectionError("refused"))
+
+    first, second = _read_records(path)
+    assert first["name"] == "a.req"
+    assert first["method"] == "GET"
+    assert first["url"] == "http://example.com/"
+    assert first["status"] == 200
+    assert first["elapsed"] == 0.5
+    assert first["variables"] == {"id": "1"}
+    assert first["headers"] == {"Content-Type": "text/plain"}
+    assert first["size"] == 5
+    assert first["sha256"] == (
+        "2cf24dba5fb0a30e26e83b2ac5b9e29e1b161e5c1fa7425e73043362938b9824"
+    )
+    assert "body" not in first
+
+    assert "status" not in second
+    assert second["error"] == "ConnectionError: refused"
+
+
+@pytest.mark.parametrize(
+    "body, expected",
+    [
+        (b"hello", {"body": "hello"}),
+        (b"\xff\x00", {"body_base64": "/wA="}),
+    ],
+)
+def test_full_body(tmp_path, body, expected):
+    path = tmp_path / "results.jsonl"
+    with ResultSink(str(path), body=BODY_FULL) as sink:
+        sink.write("a.req", response=_make_response(body=body))
+    (record,) = _read_records(path)
+    assert {key: record[key] for key in expected} == expected
+    assert record["size"] == len(body)
+
+
+def test_compressed_append(tmp_path):
+    path = tmp_path / "results.jsonl.gz"
+    for name in ("a.req", "b.req"):
+        with ResultSink(str(path), body=BODY_NONE) as sink:
+            sink.write(name, response=_make_response())
+    assert [record["name"] for record in _read_records(path)] == ["a.req", "b.req"]
+
+
+def test_periodic_flush(tmp_path):
+    path = tmp_path / "results.jsonl"
+    with ResultSink(str(path), flush_interval=0) as sink:
+        sink.write("a.req")
+        assert len(_read_records(path)) == 1
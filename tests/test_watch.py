@@ -0,0 +1,70 @@
+import os
+
+from requestfile.builder import build_request
+from requestfile.watch import RequestfileWatcher
+
+
+def _write(path, text):
+    # Make sure the change is noticed, even within mtime granularity
+    stat = os.stat(path) if path.exists() else None
+    path.write_text(text)
+    if stat is not None:
+        os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+
+
+def _build(watcher):
+    return build_request(
+        watcher.requestfile,
+        resource_loader=watcher.get_resource_loader(),
+        prefetch=False,
+    )
+
+
+def test_watch_requestfile(tmp_path):
+    path = tmp_path / "test.req"
+    _write(path, "POST http://example.com\n\n%INCLUDE: <body.txt\n")
+    _write(tmp_path / "body.txt", "hello")
+
+    watcher = RequestfileWatcher(str(path))
+    assert watcher.error is None
+    assert _build(watcher).raw_body == b"hello"
+    assert not watcher.poll()
+
+    _write(tmp_path / "body.txt", "world")
+    requestfile = watcher.requestfile
+    assert watcher.poll()
+    # Only the include changed: the Requestfile is not parsed again
+    assert watcher.requestfile is requestfile
+    assert _build(watcher).raw_body == b"world"
+
+    _write(path, "POST http://example.com/other\n\n%INCLUDE: <body.txt\n")
+    assert watcher.poll()
+    assert watcher.requestfile is not requestfile
+    assert _build(watcher).url == "http://example.com/other"
+
+
+def test_watch_errors(tmp_path):
+    path = tmp_path / "test.req"
+    _write(path, "POST http://example.com\n\n%INCLUDE: <missing.txt\n")
+
+    watcher = RequestfileWatcher(str(path))
+    assert isinstance(watcher.error, FileNotFoundError)
+    assert not watcher.poll()
+    assert isinstance(watcher.error, FileNotFoundError)
+
+    _write(tmp_path / "missing.txt", "hello")
+    assert watcher.poll()
+    assert watcher.error is None
+    assert watcher.watched_paths == [str(path), str(tmp_path / "missing.txt")]
+
+
+def test_watch_include_variable(tmp_path):
+    path = tmp_path / "test.req"
+    _write(path, "POST http://example.com\n\n%INCLUDE: <$body\n")
+    _write(tmp_path / "body.txt", "hello")
+
+    watcher = RequestfileWatcher(str(path), variables={"body": "body.txt"})
+    assert watcher.watched_paths == [str(path), str(tmp_path / "body.txt")]
+
+    _write(tmp_path / "body.txt", "world")
+    assert watcher.poll()
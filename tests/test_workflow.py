@@ -0,0 +1,118 @@
+import io
+import json
+import threading
+from textwrap import dedent
+
+import pytest
+from requests import Response
+
+from requestfile.parser import parse_requestfile
+from requestfile.workflow import get_json_path, plan_workflow, run_workflow
+
+
+def _parse(text):
+    return parse_requestfile(io.StringIO(dedent(text)))
+
+
+def _make_response(status=200, body=b"", headers=None):
+    response = Response()
+    response.status_code = status
+    response._content = body
+    response.headers.update(headers or {})
+    return response
+
+
+LOGIN = _parse("""\
+POST http://example.com/login
+%EXTRACT: token json="$.auth.token"
+%EXTRACT: session header=X-Session
+""")
+
+PROFILE = _parse("""\
+GET http://example.com/profile
+%HEADER: authorization "Bearer ${token}"|interpolate
+%EXTRACT: user_id regex="id=([0-9]+)"
+""")
+
+ORDERS = _parse("""\
+GET http://example.com/orders
+%HEADER: x-session $session
+%PARAM: user $user_id
+""")
+
+STATUS = _parse("""\
+GET http://example.com/status
+""")
+
+
+def test_plan_workflow_dependencies():
+    steps = plan_workflow(
+        {"login": LOGIN, "profile": PROFILE, "orders": ORDERS, "status": STATUS}
+    )
+    deps = {step.name: step.dependencies for step in steps}
+    assert deps == {
+        "login": set(),
+        "profile": {"login"},
+        "orders": {"login", "profile"},
+        "status": set(),
+    }
+
+
+def test_plan_workflow_detects_cycles():
+    first = _parse("""\
+    GET $b
+    %EXTRACT: a header=x-a
+    """)
+    second = _parse("""\
+    GET $a
+    %EXTRACT: b header=x-b
+    """)
+    with pytest.raises(ValueError, match="Circular dependency"):
+        plan_workflow({"first": first, "second": second})
+
+
+def test_run_workflow_passes_extracted_values():
+    sent = []
+    lock = threading.Lock()
+
+    def _send(request):
+        with lock:
+            sent.append(request)
+        match request.url:
+            case "http://example.com/login":
+                body = json.dumps({"auth": {"token": "T0K3N"}}).encode()
+                return _make_response(body=body, headers={"X-Session": "S3SS"})
+            case "http://example.com/profile":
+                return _make_response(body=b"<p>id=42</p>")
+            case _:
+                return _make_response()
+
+    results = run_workflow(
+        {"login": LOGIN, "profile": PROFILE, "orders": ORDERS, "status": STATUS},
+        send=_send,
+    )
+
+    assert [r.ok for r in results] == [True, True, True, True]
+    assert results[0].extracted == {"token": "T0K3N", "session": "S3SS"}
+    assert results[1].request.headers["authorization"] == "Bearer T0K3N"
+    assert results[2].request.headers["x-session"] == "S3SS"
+    assert results[2].request.params["user"] == "42"
+    assert len(sent) == 4
+
+
+def test_run_workflow_skips_dependents_of_failed_steps():
+    def _send(request):
+        return _make_response(status=401)
+
+    results = run_workflow({"login": LOGIN, "profile": PROFILE}, send=_send)
+
+    assert not results[0].ok
+    assert results[1].skipped
+
+
+def test_get_json_path():
+    data = {"data": {"items": [{"id": 1}, {"id": 2}]}}
+    assert get_json_path(data, "$.data.items[1].id") == 2
+    assert get_json_path(data, "data.items[-1]") == {"id": 2}
+    with pytest.raises(ValueError):
+        get_json_path(data, "$.data.missing")